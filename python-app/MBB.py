@@ -67,8 +67,14 @@ import webbrowser
 from translated_logs import Translated_Logs
 from font_manager import FontSettings, initialize_font_manager
 from asset_manager import AssetManager
-from dalamud_bridge import DalamudBridge
+from dalamud_bridge import create_dalamud_bridge
 from dalamud_immediate_handler import create_dalamud_immediate_handler
+from dalamud_async import AsyncDalamudHandler, create_async_dalamud_bridge, create_async_dalamud_handler
+from dalamud_events import TOPIC_FILTERED, TOPIC_TRANSLATED
+from dalamud_trace import configure_tracer, get_tracer
+from dalamud_filters import configure_chat_filter
+from translation_cache import INVALIDATE_MODEL, configure_translation_cache, get_translation_cache
+from gemini_guard import configure_gemini_guard
 
 # --- TranslationPolicy removed ---
 
@@ -553,6 +559,8 @@ class MagicBabelApp:
 
         # 5. Initialize core components
         self.settings = Settings()
+        configure_translation_cache(self.settings.get("translation_cache"))
+        configure_gemini_guard(self.settings.get("gemini_client"))
         # *** เพิ่ม: ตัวแปรสำหรับ Checkbutton ของ Guide ***
         self.show_guide_var = BooleanVar()
         self.show_guide_var.set(
@@ -607,7 +615,7 @@ class MagicBabelApp:
             )
 
         # 7. Initialize Dalamud Bridge
-        self.dalamud_bridge = DalamudBridge()
+        self.dalamud_bridge = self._create_dalamud_bridge()
         self.dalamud_mode = True  # HARDCODE: MBB Dalamud Bridge ALWAYS uses Text Hook
         self.dalamud_text_queue = []
 
@@ -4199,6 +4207,8 @@ class MagicBabelApp:
                         self.logging_manager.log_info(
                             f"Translator type unchanged: {new_class}"
                         )
+                    if params.get("model") != getattr(translator_before, "model_name", None):
+                        get_translation_cache().invalidate(INVALIDATE_MODEL)
 
                 del translator_before  # คืนหน่วยความจำ
 
@@ -4208,7 +4218,10 @@ class MagicBabelApp:
 
             # Initialize Dalamud Bridge for real-time text hook
             try:
-                self.dalamud_bridge = DalamudBridge()
+                # ปิดไฟล์บันทึกของ bridge เดิมก่อนสร้างใหม่
+                if getattr(self, "dalamud_bridge", None):
+                    self.dalamud_bridge.stop_recording()
+                self.dalamud_bridge = self._create_dalamud_bridge()
                 self.dalamud_mode = True  # HARDCODE: MBB Dalamud Bridge ALWAYS uses Text Hook  # Use consistent setting name
                 self.last_text_hook_data = None  # For duplicate prevention
 
@@ -4218,11 +4231,7 @@ class MagicBabelApp:
                 # 🔧 CREATE DALAMUD HANDLER: Following Guardian Agent analysis
                 if self.dalamud_mode and self.translator:
                     try:
-                        self.dalamud_handler = create_dalamud_immediate_handler(
-                            translator=self.translator,
-                            ui_updater=None,  # Will be set in _setup_dalamud_handler
-                            main_app=self
-                        )
+                        self.dalamud_handler = self._create_dalamud_handler()
                         self._setup_dalamud_handler()  # Configure dependencies immediately
                         self.logging_manager.log_info("✅ Dalamud handler initialized with filtering")
                     except Exception as e:
@@ -4341,6 +4350,14 @@ class MagicBabelApp:
 
         # Previous dialog hotkey functionality removed - replaced by right-click system
 
+        if (self.settings.get("dalamud_tracing") or {}).get("enabled"):
+            if "latency_panel" in self.hotkeys:
+                keyboard.remove_hotkey(self.hotkeys["latency_panel"])
+            self.hotkeys["latency_panel"] = keyboard.add_hotkey(
+                self.settings.get_shortcut("latency_panel", "ctrl+alt+l"),
+                lambda: self.root.after(0, self.toggle_latency_panel),
+            )
+
         if self.settings.get("enable_wasd_auto_hide"):
             try:
                 # Use scan codes for reliable key detection across keyboard layouts
@@ -5654,6 +5671,58 @@ class MagicBabelApp:
         # All message processing is now handled by self.dalamud_handler
         pass
 
+    def _is_async_dalamud_pipeline(self):
+        """ตรวจสอบว่าตั้งค่าให้ใช้ pipeline แบบ asyncio หรือไม่"""
+        pipeline = self.settings.get("dalamud_pipeline") or {}
+        return pipeline.get("mode", "threaded") == "asyncio"
+
+    def _create_dalamud_bridge(self):
+        """สร้าง Dalamud Bridge ตาม dalamud_pipeline (threaded หรือ asyncio)"""
+        configure_tracer(self.settings.get("dalamud_tracing"))
+        configure_chat_filter(self.settings.get("dalamud_filter"))
+        if self._is_async_dalamud_pipeline():
+            return create_async_dalamud_bridge(
+                self.settings.get("dalamud_transport"),
+                self.settings.get("dalamud_recording"),
+            )
+        return create_dalamud_bridge(
+            self.settings.get("dalamud_transport"),
+            self.settings.get("dalamud_recording"),
+            self.settings.get("dalamud_ingress"),
+        )
+
+    def _create_dalamud_handler(self):
+        """สร้าง Dalamud handler ตาม dalamud_pipeline (threaded หรือ asyncio)"""
+        if self._is_async_dalamud_pipeline():
+            pipeline = self.settings.get("dalamud_pipeline") or {}
+            return create_async_dalamud_handler(
+                translator=self.translator,
+                ui_updater=None,  # Will be set in _setup_dalamud_handler
+                main_app=self,
+                concurrency=pipeline.get("concurrency", 4),
+                queue_size=pipeline.get("queue_size", 16),
+                latest_wins=pipeline.get("latest_wins", True),
+                ordered_cutscenes=pipeline.get("ordered_cutscenes", True),
+                reorder_window=pipeline.get("reorder_window", 8),
+                scheduler=pipeline.get("scheduler"),
+                dedup=self.settings.get("dalamud_dedup"),
+                streaming=pipeline.get("streaming", True),
+            )
+        pipeline = self.settings.get("dalamud_pipeline") or {}
+        return create_dalamud_immediate_handler(
+            translator=self.translator,
+            ui_updater=None,  # Will be set in _setup_dalamud_handler
+            main_app=self,
+            concurrency=pipeline.get("workers", 2),
+            queue_size=pipeline.get("queue_size", 16),
+            latest_wins=pipeline.get("latest_wins", True),
+            ordered_cutscenes=pipeline.get("ordered_cutscenes", True),
+            reorder_window=pipeline.get("reorder_window", 8),
+            scheduler=pipeline.get("scheduler"),
+            dedup=self.settings.get("dalamud_dedup"),
+            streaming=pipeline.get("streaming", True),
+        )
+
     def _setup_dalamud_handler(self):
         """Setup the message handler with proper dependencies"""
         if hasattr(self, 'dalamud_handler'):
@@ -5682,8 +5751,15 @@ class MagicBabelApp:
                     self.root.update()
                     logging.info("[UI FORCED] Tkinter update forced after text update")
 
+            # คำแปลบางส่วนระหว่าง stream - ไม่ลง history (คำแปลเต็มตามมาทาง ui_updater เสมอ)
+            def partial_updater(partial_text):
+                if self.translated_ui and self.is_translating:
+                    self.translated_ui.update_text_partial(partial_text)
+                    self.root.update_idletasks()
+
             # Pass the UI updater WITH root reference
             ui_updater.root = self.root  # Attach root for handler to use
+            ui_updater.partial = partial_updater
             self.dalamud_handler.set_ui_updater(ui_updater)
 
             # *** TEXT HOOK INTEGRATION: เชื่อมต่อ translated_logs กับ dalamud_handler ***
@@ -5691,7 +5767,45 @@ class MagicBabelApp:
                 self.dalamud_handler.set_translated_logs(self.translated_logs_instance)
                 self.logging_manager.log_info("✅ Translated logs integrated with text hook")
 
+            self._subscribe_dalamud_sinks()
+
             self.dalamud_handler.start()
+
+    def _subscribe_dalamud_sinks(self):
+        """Subscribe status line, Previous Dialog history และ TUI auto-show กับ message bus ของ handler"""
+        bus = self.dalamud_handler.bus
+        for subscription in getattr(self, '_dalamud_bus_subscriptions', []):
+            bus.unsubscribe(subscription)
+
+        def add_history(event):
+            # *** ADD TO HISTORY: เพิ่มข้อความแปลจริงลงใน history สำหรับ Previous Dialog ***
+            speaker = event.message.speaker or 'Unknown'
+            self.add_to_dialog_history(
+                original_text=event.message_text,
+                translated_text=event.translated_text,
+                speaker=speaker,
+                chat_type=event.message.chat_type
+            )
+            logging.info(f"📄 [REAL HISTORY] Added real translation for '{speaker}'")
+
+        def show_original(event):
+            self.update_original_text_display(event.message_text)
+
+        sinks = [
+            (TOPIC_FILTERED, show_original, "original_text_display"),
+            (TOPIC_TRANSLATED, add_history, "dialog_history"),
+            (TOPIC_TRANSLATED, lambda event: self._trigger_tui_auto_show(), "tui_auto_show"),
+        ]
+        if isinstance(self.dalamud_handler, AsyncDalamudHandler):
+            # asyncio mode: ทุกอย่างที่แตะ Tk ต้องผ่าน TkResultChannel เดียวของ handler
+            # (subscribe แบบ inline - publisher แค่ post งานเข้าคิวของ channel ไม่รอ Tk)
+            ui_channel = self.dalamud_handler.ui_channel
+            self._dalamud_bus_subscriptions = [
+                bus.subscribe(topic, lambda event, sink=sink: ui_channel.post(sink, event), name=name, inline=True)
+                for topic, sink, name in sinks
+            ]
+        else:
+            self._dalamud_bus_subscriptions = [bus.subscribe(topic, sink, name=name) for topic, sink, name in sinks]
     
     def _display_original_with_state(self, message_text, is_translating=True):
         """แสดงข้อความต้นฉบับพร้อมสถานะการแปลแบบ dual-state"""
@@ -8922,8 +9036,67 @@ class MagicBabelApp:
                 if hasattr(self, "hide_loading_indicator"):
                     self.hide_loading_indicator()
 
+    def toggle_latency_panel(self):
+        """แสดง/ซ่อน debug panel สรุป latency ต่อ stage ของ Dalamud text hook"""
+        panel = getattr(self, "latency_panel_window", None)
+        if panel is not None and panel.winfo_exists():
+            panel.destroy()
+            self.latency_panel_window = None
+            return
+
+        panel = tk.Toplevel(self.root)
+        panel.title("Dalamud Latency (p50 / p95 / p99)")
+        panel.attributes("-topmost", True)
+        panel.configure(bg="#1a1a1a")
+        self.latency_panel_window = panel
+
+        text = tk.Text(panel, width=70, height=16, bg="#1a1a1a", fg="#e0e0e0",
+                       font=("Consolas", 10), relief="flat")
+        text.pack(fill="both", expand=True, padx=8, pady=(8, 4))
+
+        buttons = tk.Frame(panel, bg="#1a1a1a")
+        buttons.pack(fill="x", padx=8, pady=(0, 8))
+
+        def export():
+            try:
+                path = get_tracer().export()
+                self.logging_manager.log_info(f"Latency traces exported: {path}")
+            except Exception as e:
+                self.logging_manager.log_error(f"Latency export failed: {e}")
+
+        tk.Button(buttons, text="Export", command=export).pack(side="left")
+        tk.Button(buttons, text="Reset", command=get_tracer().reset).pack(side="left", padx=4)
+
+        def refresh():
+            if not panel.winfo_exists():
+                return
+            text.configure(state="normal")
+            text.delete("1.0", "end")
+            text.insert("1.0", get_tracer().format_summary())
+            text.configure(state="disabled")
+            panel.after(1000, refresh)
+
+        refresh()
+
     def exit_program(self):
+        tracer = get_tracer()
+        if tracer.enabled and tracer.traces:
+            try:
+                tracer.export()
+            except Exception as e:
+                self.logging_manager.log_error(f"Latency export failed: {e}")
+
+        # หยุดการแปลและ Dalamud handler/bridge ก่อน แล้วจึงปิด cache
+        # (งานแปลที่ยังค้างอยู่จะไม่เขียนลง SQLite ที่ปิดแล้ว)
         self.stop_translation()
+        for component in (getattr(self, "dalamud_handler", None), getattr(self, "dalamud_bridge", None)):
+            if component is not None:
+                try:
+                    component.stop()
+                except Exception as e:
+                    self.logging_manager.log_error(f"Error stopping {type(component).__name__}: {e}")
+        get_translation_cache().close()
+
         self.hide_show_area()
         self.remove_all_hotkeys()
         try:
@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+Dalamud Bridge Microbenchmarks
+วัดประสิทธิภาพส่วนรับข้อความของ DalamudBridge โดยไม่ต้องเปิดเกม
+
+Usage:
+    python bridge_benchmark.py framing [--messages N] [--message-size BYTES] [--chunk-size BYTES]
+    python bridge_benchmark.py decode [--messages N]
+    python bridge_benchmark.py batch [--lines N] [--batch-size N] [--latency-ms MS] [--drop-rate P] [--live]
+    python bridge_benchmark.py keywords [--entries N] [--lines N]
+    python bridge_benchmark.py resilience [--requests N] [--error-rate P] [--rpm N] [--daily-quota N]
+    python bridge_benchmark.py hedge [--requests N] [--latency-ms MS] [--tail-rate P] [--tail-ms MS] [--hedge-ms MS]
+    python bridge_benchmark.py routing [--lines N] [--lite-error-rate P]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+# Add current directory to path
+sys.path.append(os.path.dirname(__file__))
+
+from dalamud_framing import FramedReader, encode_frame, FRAMING_NEWLINE, FRAMING_LENGTH_PREFIXED
+from dalamud_message import TextHookData, available_backends, make_decoder
+from translation_batch import translate_in_batches
+from keyword_index import KeywordIndex
+from gemini_guard import GeminiGuard
+from gemini_hedge import HedgedModel, HedgeTracker, served_model_scope
+from model_router import DEFAULT_MODEL_ROUTING_CONFIG, ModelRouter, RoutingModel, route_scope
+from fake_gemini_server import EndpointModel, FakeGeminiBehaviour, FakeGeminiServer
+
+
+def make_cutscene_message(index: int, message_size: int) -> str:
+    """สร้าง JSON ข้อความ cutscene ความยาวประมาณ message_size bytes"""
+    sentence = "The crystal's light fades as the Warrior of Light steps forward. "
+    body = (sentence * (message_size // len(sentence) + 1))[:message_size]
+    return json.dumps(
+        {
+            "Type": "cutscene",
+            "Speaker": "Alphinaud",
+            "Message": f"[{index}] {body}",
+            "Timestamp": 1700000000 + index,
+            "ChatType": 71,
+        },
+        ensure_ascii=False,
+    )
+
+
+def make_decode_payloads(messages: int):
+    """ข้อความตัวอย่างแต่ละประเภท: dialogue, cutscene, choice"""
+    samples = {
+        "dialogue": lambda i: {
+            "Type": "dialogue", "Speaker": "Y'shtola",
+            "Message": f"[{i}] We must make haste to the Crystarium before the light consumes all.",
+            "Timestamp": 1700000000 + i, "ChatType": 61,
+        },
+        "cutscene": lambda i: {
+            "Type": "cutscene", "Speaker": "Alphinaud",
+            "Message": f"[{i}] " + "The crystal's light fades as the Warrior of Light steps forward. " * 4,
+            "Timestamp": 1700000000 + i, "ChatType": 71,
+        },
+        "choice": lambda i: {
+            "Type": "choice", "Speaker": "",
+            "Message": f"[{i}] What will you say?\nI am ready.\nGive me a moment.\nTell me more about the Ascians.",
+            "Timestamp": 1700000000 + i, "ChatType": 0,
+        },
+    }
+    return {kind: [json.dumps(make(i), ensure_ascii=False) for i in range(messages)]
+            for kind, make in samples.items()}
+
+
+@dataclass
+class LegacyTextHookData:
+    """TextHookData แบบ dataclass เดิม (ก่อนย้ายไป dalamud_message.py)"""
+    type: str
+    speaker: str
+    message: str
+    timestamp: int
+    chat_type: int
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LegacyTextHookData':
+        return cls(
+            type=data.get('Type', 'unknown'),
+            speaker=data.get('Speaker', ''),
+            message=data.get('Message', ''),
+            timestamp=data.get('Timestamp', 0),
+            chat_type=data.get('ChatType', 0)
+        )
+
+
+def legacy_decode(payloads):
+    """วิธีเดิม: json.loads -> dict, สร้าง dataclass, แล้ว handler อ่าน dict ซ้ำด้วย .get()/str()"""
+    results = []
+    for raw in payloads:
+        data = json.loads(raw)
+        record = LegacyTextHookData.from_dict(data)
+        speaker = str(data.get('Speaker', '')).strip()[:100]
+        message = str(data.get('Message', '')).strip()[:5000]
+        results.append((record, data.get('ChatType', 0), speaker, message))
+    return results
+
+
+def fast_decode(decode, payloads):
+    """decode ครั้งเดียวเป็น TextHookData แล้วอ่าน attribute ตรงๆ"""
+    results = []
+    for raw in payloads:
+        text_data = decode(raw)
+        results.append((text_data, text_data.chat_type, text_data.speaker[:100], text_data.message[:5000]))
+    return results
+
+
+def chunk_stream(stream: bytes, chunk_size: int):
+    """แบ่ง stream เป็น chunk เหมือนการอ่านจาก pipe ทีละ chunk_size bytes"""
+    return [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+
+def legacy_split_reader(chunks):
+    """วิธีเดิมของ _read_messages: buffer += data แล้ว split ทีละบรรทัด"""
+    buffer = b""
+    frames = []
+    for data in chunks:
+        buffer += data
+        while b'\n' in buffer:
+            line, buffer = buffer.split(b'\n', 1)
+            if line.strip():
+                try:
+                    decoded_line = line.decode('utf-8-sig')
+                except UnicodeDecodeError:
+                    decoded_line = line.decode('utf-8', errors='ignore')
+                frames.append(decoded_line)
+    return frames
+
+
+def framed_reader(chunks, mode=FRAMING_NEWLINE):
+    reader = FramedReader(mode)
+    frames = []
+    for data in chunks:
+        frames.extend(reader.feed(data))
+    return frames
+
+
+def time_it(func, *args, repeat=5):
+    """คืนเวลาที่ดีที่สุด (วินาที) จากการรันหลายรอบ"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_framing_benchmark(messages: int, message_size: int, chunk_size: int):
+    print("=" * 60)
+    print("📦 Framing benchmark: legacy split vs FramedReader")
+    print(f"   messages={messages} message_size≈{message_size}B chunk_size={chunk_size}B")
+    print("=" * 60)
+
+    payloads = [make_cutscene_message(i, message_size) for i in range(messages)]
+
+    for label, mode in (("newline", FRAMING_NEWLINE), ("length_prefixed", FRAMING_LENGTH_PREFIXED)):
+        stream = b"".join(encode_frame(p, mode) for p in payloads)
+        chunks = chunk_stream(stream, chunk_size)
+
+        framed_time, framed_frames = time_it(framed_reader, chunks, mode)
+        assert framed_frames == payloads, f"FramedReader ({label}) produced wrong frames"
+
+        line = f"{'FramedReader[' + label + ']':<30}: {framed_time * 1000:8.2f} ms"
+        line += f"  ({len(stream) / framed_time / 1e6:7.1f} MB/s)"
+
+        if mode == FRAMING_NEWLINE:
+            legacy_time, legacy_frames = time_it(legacy_split_reader, chunks)
+            assert legacy_frames == payloads, "legacy reader produced wrong frames"
+            print(f"{'legacy split':<30}: {legacy_time * 1000:8.2f} ms"
+                  f"  ({len(stream) / legacy_time / 1e6:7.1f} MB/s)")
+            line += f"  speedup x{legacy_time / framed_time:.1f}"
+
+        print(line)
+
+    print("-" * 60)
+
+
+def run_decode_benchmark(messages: int):
+    print("=" * 60)
+    print("🧩 Decode benchmark: json.loads + dict.get vs single-step TextHookData")
+    print(f"   messages={messages} backends={', '.join(available_backends())}")
+    print("=" * 60)
+
+    for kind, payloads in make_decode_payloads(messages).items():
+        legacy_time, _ = time_it(legacy_decode, payloads)
+        print(f"{kind:<9} {'legacy dict':<20}: {legacy_time / messages * 1e6:7.2f} µs/msg")
+
+        for backend in available_backends():
+            decode = make_decoder(backend)
+            fast_time, results = time_it(fast_decode, decode, payloads)
+            assert all(type(r[0]) is TextHookData for r in results), f"{backend} produced wrong records"
+            print(f"{kind:<9} {'TextHookData[' + backend + ']':<20}: {fast_time / messages * 1e6:7.2f} µs/msg"
+                  f"  speedup x{legacy_time / fast_time:.2f}")
+
+    print("-" * 60)
+
+
+def make_batch_lines(lines: int):
+    """บทพูดตัวอย่างสำหรับวัด batch translation"""
+    speakers = ("Y'shtola", "Alphinaud", "Alisaie", "")
+    return [
+        (f"{speakers[i % len(speakers)]}: " if speakers[i % len(speakers)] else "")
+        + f"[{i}] We must make haste to the Crystarium before the light consumes all."
+        for i in range(lines)
+    ]
+
+
+class SimulatedGemini:
+    """
+    จำลอง round-trip ของ Gemini: latency คงที่ต่อ request + เวลาต่อบรรทัด
+    drop_rate = โอกาสที่แต่ละบรรทัดใน batch หายจากผลลัพธ์ (ทดสอบการส่งซ้ำเฉพาะบรรทัด)
+    """
+
+    def __init__(self, latency_ms: float, per_line_ms: float, drop_rate: float, seed: int = 1):
+        self.latency_s = latency_ms / 1000.0
+        self.per_line_s = per_line_ms / 1000.0
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def send(self, items):
+        self.requests += 1
+        time.sleep(self.latency_s + self.per_line_s * len(items))
+        kept = [item for item in items if len(items) == 1 or self.random.random() >= self.drop_rate]
+        return json.dumps([{"id": item["id"], "translation": f"TH {item['text']}"} for item in kept],
+                          ensure_ascii=False)
+
+
+def run_batch_benchmark(lines: int, batch_size: int, latency_ms: float, per_line_ms: float,
+                        drop_rate: float, live: bool):
+    print("=" * 60)
+    print("🧮 Batch translation benchmark: per-line requests vs JSON-array batches")
+    print(f"   lines={lines} batch_size={batch_size} "
+          + ("model=live Gemini" if live else f"latency={latency_ms}ms per_line={per_line_ms}ms drop_rate={drop_rate}"))
+    print("=" * 60)
+
+    texts = make_batch_lines(lines)
+
+    if live:
+        from settings import Settings
+        from translator_factory import TranslatorFactory
+        from translation_cache import REGION_DIALOGUE
+
+        translator = TranslatorFactory.create_translator(Settings())
+        cache = translator.translation_cache
+
+        cache.clear_region(REGION_DIALOGUE)
+        start = time.perf_counter()
+        for text in texts:
+            translator.translate(text)
+        single_time = time.perf_counter() - start
+
+        cache.clear_region(REGION_DIALOGUE)
+        start = time.perf_counter()
+        results = translator.batch_translate(texts, batch_size=batch_size)
+        batch_time = time.perf_counter() - start
+        failed = sum(1 for r in results if not r or r.startswith("[Error"))
+        detail = f"failed={failed}"
+    else:
+        items = {i: {"id": i, "text": text} for i, text in enumerate(texts)}
+
+        single = SimulatedGemini(latency_ms, per_line_ms, drop_rate)
+        start = time.perf_counter()
+        for item in items.values():
+            single.send([item])
+        single_time = time.perf_counter() - start
+
+        batched = SimulatedGemini(latency_ms, per_line_ms, drop_rate)
+        start = time.perf_counter()
+        results, missing, stats = translate_in_batches(items, batched.send, batch_size)
+        for line_id in missing:  # เหมือน batch_translate: ที่เหลือแปลทีละบรรทัด
+            batched.send([items[line_id]])
+        batch_time = time.perf_counter() - start
+        detail = (f"requests={batched.requests} re-requested={stats['rerequested']} "
+                  f"single-line fallback={len(missing)}")
+
+    print(f"{'per-line translate':<24}: {lines / single_time:8.2f} lines/s  ({single_time:.2f}s)")
+    print(f"{'batch_translate':<24}: {lines / batch_time:8.2f} lines/s  ({batch_time:.2f}s)"
+          f"  speedup x{single_time / batch_time:.1f}")
+    print(f"   {detail}")
+    print("-" * 60)
+
+
+def make_npc_keywords(entries: int):
+    """ชื่อ NPC และศัพท์ lore สังเคราะห์ (ครึ่งหนึ่งเป็นชื่อ ครึ่งหนึ่งเป็นศัพท์) ขนาดประมาณ NPC.json จริง"""
+    rng = random.Random(7)
+    syllables = ("ka", "lo", "mi", "ra", "zen", "tha", "gul", "ja", "sha", "vel", "or", "ith", "ne", "dra")
+
+    def word():
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).capitalize()
+
+    names = {word() if i % 3 else f"{word()} {word()}" for i in range(entries // 2)}
+    lore = {f"{word()} {rng.choice(('Crystal', 'Order', 'Sanctum', 'Blade', 'Tempest'))}"
+            for _ in range(entries - len(names))}
+    return sorted(names), {term: f"คำอธิบาย {term}" for term in sorted(lore)}
+
+
+def legacy_keyword_scan(names, lore, text):
+    """วิธีเดิมของ get_relevant_names / get_relevant_lore_terms: substring scan ทุก entry"""
+    text_lower = text.lower()
+    found_names = [name for name in names if name.lower() in text_lower]
+    found_terms = [term for term in lore if term.lower() in text_lower]
+    return found_names, found_terms
+
+
+def run_keyword_benchmark(entries: int, lines: int):
+    print("=" * 60)
+    print("🔎 Keyword benchmark: substring scan vs Aho-Corasick KeywordIndex")
+    print(f"   entries={entries} lines={lines}")
+    print("=" * 60)
+
+    names, lore = make_npc_keywords(entries)
+    rng = random.Random(11)
+    filler = "We must make haste before the light consumes all, for the path ahead is long."
+    texts = [f"{rng.choice(names)} says: {filler} The {rng.choice(list(lore))} awaits. {filler}"
+             for _ in range(lines)]
+
+    start = time.perf_counter()
+    name_index, lore_index = KeywordIndex(names), KeywordIndex(lore)
+    build_time = time.perf_counter() - start
+    print(f"{'index build (per load)':<24}: {build_time * 1000:8.2f} ms")
+
+    def legacy_all():
+        return [legacy_keyword_scan(names, lore, text) for text in texts]
+
+    def indexed_all():
+        return [(name_index.find(text), lore_index.find(text)) for text in texts]
+
+    legacy_time, legacy_results = time_it(legacy_all, repeat=3)
+    indexed_time, indexed_results = time_it(indexed_all, repeat=3)
+    for (legacy_names, legacy_terms), (found_names, found_terms) in zip(legacy_results, indexed_results):
+        # index เคารพขอบคำ - ทุกผลของ index ต้องอยู่ในผลของ substring scan
+        assert set(found_names) <= set(legacy_names) and set(found_terms) <= set(legacy_terms)
+
+    print(f"{'substring scan':<24}: {legacy_time / lines * 1e6:8.1f} µs/line")
+    print(f"{'KeywordIndex':<24}: {indexed_time / lines * 1e6:8.1f} µs/line"
+          f"  speedup x{legacy_time / indexed_time:.1f}")
+    print("-" * 60)
+
+
+def run_resilience_benchmark(requests: int, workers: int, latency_ms: float, error_rate: float,
+                             rpm: int, daily_quota: int):
+    import logging
+    from concurrent.futures import ThreadPoolExecutor
+
+    logging.getLogger('GeminiGuard').setLevel(logging.ERROR)  # retry ทุกครั้งไม่ต้องขึ้นจอ
+    print("=" * 60)
+    print("🛡️ Gemini resilience benchmark: direct calls vs GeminiGuard (local fake endpoint)")
+    print(f"   requests={requests} workers={workers} latency={latency_ms}ms error_rate={error_rate} "
+          f"server_rpm={rpm or '-'} daily_quota={daily_quota or '-'}")
+    print("=" * 60)
+
+    # delay สั้นกว่าค่าใน settings เพื่อให้ benchmark จบเร็ว - นโยบายเดียวกัน
+    guard_config = {"requests_per_min": rpm or 6000, "max_wait_s": 60.0, "max_attempts": 4,
+                    "base_delay_s": 0.05, "max_delay_s": 2.0, "quota_cooldown_s": 60.0}
+
+    for label, guarded in (("direct", False), ("GeminiGuard", True)):
+        behaviour = FakeGeminiBehaviour(latency_ms, error_rate, rpm, daily_quota, seed=3)
+        server = FakeGeminiServer(behaviour).start()
+        model = EndpointModel(server.url)
+        guard = GeminiGuard(guard_config)
+
+        def send(index):
+            prompt = f"Text to translate: line {index}"
+            try:
+                if guarded:
+                    guard.call(model.generate_content, prompt, tokens=8)
+                else:
+                    model.generate_content(prompt)
+                return True
+            except Exception:
+                return False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            succeeded = sum(pool.map(send, range(requests)))
+        elapsed = time.perf_counter() - start
+        server.stop()
+
+        server_stats = behaviour.stats
+        print(f"{label:<14}: ok {succeeded}/{requests}  server requests={server_stats['requests']} "
+              f"503={server_stats['unavailable']} 429={server_stats['rate_limited'] + server_stats['quota_exhausted']}"
+              f"  ({elapsed:.2f}s)")
+        if guarded:
+            stats = guard.get_stats()
+            print(f"{'':<14}  retries={stats['retries']} failed_fast={stats['failed_fast']} "
+                  f"limiter_wait={stats['limiter_wait_s']}s breaker={stats['breaker_state']} "
+                  f"errors={stats['errors']}")
+    print("-" * 60)
+
+
+class TailLatencyModel:
+    """
+    model จำลองที่ช้าเป็นบางครั้ง (tail_rate ของ request ใช้เวลา tail_ms)
+    request ช้าสุ่มตำแหน่งแบบแบ่งช่วง: ทุก 1/tail_rate request มีช้าหนึ่งตัว - สัดส่วนคงที่ทุกช่วงของการวัด
+    """
+
+    def __init__(self, name: str, latency_ms: float, tail_rate: float = 0.0, tail_ms: float = 0.0, seed: int = 5):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.tail_ms = tail_ms
+        self.block = max(1, round(1 / tail_rate)) if tail_rate else 0
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._schedule = deque()
+        self.requests = 0
+
+    def _next_is_slow(self) -> bool:
+        if not self.block:
+            return False
+        with self._lock:
+            if not self._schedule:
+                block = [False] * self.block
+                block[self.rng.randrange(self.block)] = True
+                self._schedule.extend(block)
+            return self._schedule.popleft()
+
+    def generate_content(self, contents, **kwargs):
+        self.requests += 1
+        base = self.tail_ms if self._next_is_slow() else self.latency_ms
+        time.sleep(base * self.rng.uniform(0.8, 1.2) / 1000)
+        return self.name
+
+
+def run_hedge_benchmark(requests: int, workers: int, latency_ms: float, tail_rate: float,
+                        tail_ms: float, hedge_ms: float):
+    import logging
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("=" * 60)
+    print("🪃 Hedged request benchmark: primary model vs primary + hedge at p90")
+    print(f"   requests={requests} workers={workers} primary={latency_ms}ms "
+          f"(tail {tail_rate:.0%} at {tail_ms}ms) hedge={hedge_ms}ms")
+    print("=" * 60)
+
+    logging.getLogger('GeminiHedge').setLevel(logging.WARNING)
+    primary = TailLatencyModel("primary", latency_ms, tail_rate, tail_ms)
+    lite = TailLatencyModel("flash-lite", hedge_ms, seed=9)
+    warmup = 20
+    # window ครอบทุก request - percentile คำนวณจากทั้งรอบ ไม่ใช่แค่ 200 ตัวหลังสุด
+    tracker = HedgeTracker({"min_samples": warmup, "min_delay_ms": 0, "window": warmup + requests})
+    model = HedgedModel(primary, lite, lite.name, tracker)
+
+    served_by = {"primary": 0, "flash-lite": 0}
+
+    def send(index):
+        with served_model_scope() as served:
+            model.generate_content(f"line {index}")
+        served_by[served.model or "primary"] += 1
+
+    # warm-up: ยังไม่ hedge จนกว่าจะมี latency ของ model หลักครบ min_samples - ไม่นับในผล
+    for index in range(warmup):
+        model.generate_content(f"warmup {index}")
+    tracker.reset_stats()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - start
+    time.sleep(tail_ms * 1.3 / 1000)  # ให้ request ที่ถูกทิ้งจบ - latency ของ model หลักครบ
+
+    stats = tracker.get_stats()
+    print(f"{'primary only':<16}: p50 {stats['primary_p50_ms']:>7} ms  p90 {stats['primary_p90_ms']:>7} ms  "
+          f"p99 {stats['primary_p99_ms']:>7} ms")
+    print(f"{'hedged':<16}: p50 {stats['observed_p50_ms']:>7} ms  p90 {stats['observed_p90_ms']:>7} ms  "
+          f"p99 {stats['observed_p99_ms']:>7} ms")
+    print(f"   p99 improvement={stats['p99_improvement_ms']} ms  extra_request_rate={stats['extra_request_rate']:.1%}  "
+          f"hedge_wins={stats['hedge_wins']} served_by={served_by}  ({elapsed:.2f}s)")
+    print(f"   losers: cancelled={stats['cancelled']} abandoned={stats['abandoned']} "
+          f"unhedged_busy={stats['unhedged_busy']}")
+    print("-" * 60)
+
+
+ROUTING_SAMPLES = [
+    ("battle", "Hmph."),
+    ("battle", "You'll pay for that!"),
+    ("battle", "Now, feel the wrath of the Crystal! None shall stand against the light of Hydaelyn!"),
+    ("other", "Ugh..."),
+    ("choice", "What will you say?\nI'm ready.\nNot yet."),
+    ("story", "Alphinaud: Indeed."),
+    ("story", "Alphinaud: We have little time. The Ascians will not wait for us to gather our strength, "
+              "and every moment we tarry is another life lost in Ul'dah."),
+    ("cutscene", "Y'shtola: The aether here is thin, as though something had drained the very lifeblood "
+                 "of the land. We must tread carefully, lest we share its fate."),
+]
+
+
+class LengthLatencyModel:
+    """model จำลองที่ใช้เวลาตามความยาวข้อความ (base + ms ต่อตัวอักษร) และ error ตามสัดส่วนที่ตั้ง"""
+
+    def __init__(self, name: str, base_ms: float, per_char_ms: float, error_rate: float = 0.0, seed: int = 11):
+        self.name = name
+        self.base_ms = base_ms
+        self.per_char_ms = per_char_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def generate_content(self, contents, **kwargs):
+        self.calls += 1
+        time.sleep((self.base_ms + self.per_char_ms * len(contents)) / 1000)
+        if self.rng.random() < self.error_rate:
+            raise RuntimeError(f"{self.name}: 503 The model is overloaded")
+        return contents
+
+
+def run_routing_benchmark(lines: int, workers: int, lite_error_rate: float):
+    from concurrent.futures import ThreadPoolExecutor
+
+    quality_name = "gemini-2.5-flash"
+    print("=" * 60)
+    print(f"🧭 Model routing benchmark: every line -> {quality_name} vs length/class-aware routes")
+    print(f"   lines={lines} workers={workers} lite_error_rate={lite_error_rate}")
+    print("=" * 60)
+
+    rng = random.Random(21)
+    samples = [ROUTING_SAMPLES[rng.randrange(len(ROUTING_SAMPLES))] for _ in range(lines)]
+
+    def run(routed: bool):
+        quality = LengthLatencyModel(quality_name, 120, 1.5)
+        simulated = {
+            "gemini-2.0-flash-lite": LengthLatencyModel("gemini-2.0-flash-lite", 30, 0.4, lite_error_rate),
+            "gemini-2.0-flash": LengthLatencyModel("gemini-2.0-flash", 60, 0.8),
+        }
+        router = ModelRouter({**DEFAULT_MODEL_ROUTING_CONFIG, "enabled": True})
+        model = RoutingModel(quality, quality_name, router, simulated.__getitem__)
+        latency = {}
+        errors = 0
+
+        def send(sample):
+            nonlocal errors
+            message_class, text = sample
+            route = router.choose(text, message_class, quality_name) if routed else None
+            start = time.perf_counter()
+            try:
+                with route_scope(route):
+                    model.generate_content(text)
+            except RuntimeError:
+                errors += 1
+                return
+            latency.setdefault(message_class, []).append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(send, samples))
+        return latency, errors, time.perf_counter() - start, router.get_stats()
+
+    baseline, _, baseline_time, _ = run(False)
+    routed, errors, routed_time, stats = run(True)
+
+    print(f"{'class':<10} {'lines':>6} {'quality only':>14} {'routed':>10}")
+    for message_class in sorted(baseline):
+        before = baseline[message_class]
+        after = routed.get(message_class, [])
+        mean_after = f"{sum(after) / len(after):>7.1f} ms" if after else "-"
+        print(f"{message_class:<10} {len(before):>6} {sum(before) / len(before):>11.1f} ms {mean_after:>10}")
+    print(f"   total: quality only {baseline_time:.2f}s, routed {routed_time:.2f}s ({errors} errors)")
+    print(f"   routes: quality={stats['quality']} {stats['routed']} skipped_unhealthy={stats['skipped_unhealthy']}")
+    for name, health in stats['models'].items():
+        print(f"   {name:<24} calls={health['calls']:<4} error_rate={health['error_rate']:<6} "
+              f"p90={health['p90_ms']} ms healthy={health['healthy']}")
+    print("-" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dalamud Bridge microbenchmarks")
+    subparsers = parser.add_subparsers(dest="command")
+
+    framing = subparsers.add_parser("framing", help="compare line framing implementations")
+    framing.add_argument("--messages", type=int, default=500)
+    framing.add_argument("--message-size", type=int, default=2000)
+    framing.add_argument("--chunk-size", type=int, default=65536)
+
+    decode = subparsers.add_parser("decode", help="compare message decode paths per payload type")
+    decode.add_argument("--messages", type=int, default=5000)
+
+    batch = subparsers.add_parser("batch", help="compare per-line vs batched translation throughput")
+    batch.add_argument("--lines", type=int, default=60)
+    batch.add_argument("--batch-size", type=int, default=10)
+    batch.add_argument("--latency-ms", type=float, default=400.0, help="simulated round-trip per request")
+    batch.add_argument("--per-line-ms", type=float, default=40.0, help="simulated generation time per line")
+    batch.add_argument("--drop-rate", type=float, default=0.05, help="simulated chance a line is missing from a batch")
+    batch.add_argument("--live", action="store_true", help="call the real Gemini API (uses settings.json/.env)")
+
+    keywords = subparsers.add_parser("keywords", help="compare name/lore lookup against a large NPC.json")
+    keywords.add_argument("--entries", type=int, default=5000)
+    keywords.add_argument("--lines", type=int, default=500)
+
+    resilience = subparsers.add_parser("resilience", help="rate limit / retry / circuit breaker against a fake endpoint")
+    resilience.add_argument("--requests", type=int, default=60)
+    resilience.add_argument("--workers", type=int, default=4)
+    resilience.add_argument("--latency-ms", type=float, default=20)
+    resilience.add_argument("--error-rate", type=float, default=0.2)
+    resilience.add_argument("--rpm", type=int, default=0)
+    resilience.add_argument("--daily-quota", type=int, default=40)
+
+    hedge = subparsers.add_parser("hedge", help="tail latency with hedged requests to a faster model")
+    hedge.add_argument("--requests", type=int, default=300)
+    hedge.add_argument("--workers", type=int, default=8)
+    hedge.add_argument("--latency-ms", type=float, default=120)
+    hedge.add_argument("--tail-rate", type=float, default=0.05)
+    hedge.add_argument("--tail-ms", type=float, default=1500)
+    hedge.add_argument("--hedge-ms", type=float, default=80)
+
+    routing = subparsers.add_parser("routing", help="per-line model routing by length / message class")
+    routing.add_argument("--lines", type=int, default=400)
+    routing.add_argument("--workers", type=int, default=8)
+    routing.add_argument("--lite-error-rate", type=float, default=0.0)
+
+    args = parser.parse_args()
+
+    if args.command == "framing":
+        run_framing_benchmark(args.messages, args.message_size, args.chunk_size)
+    elif args.command == "decode":
+        run_decode_benchmark(args.messages)
+    elif args.command == "batch":
+        run_batch_benchmark(args.lines, args.batch_size, args.latency_ms, args.per_line_ms,
+                            args.drop_rate, args.live)
+    elif args.command == "keywords":
+        run_keyword_benchmark(args.entries, args.lines)
+    elif args.command == "resilience":
+        run_resilience_benchmark(args.requests, args.workers, args.latency_ms, args.error_rate,
+                                 args.rpm, args.daily_quota)
+    elif args.command == "hedge":
+        run_hedge_benchmark(args.requests, args.workers, args.latency_ms, args.tail_rate,
+                            args.tail_ms, args.hedge_ms)
+    elif args.command == "routing":
+        run_routing_benchmark(args.lines, args.workers, args.lite_error_rate)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,578 @@
+"""
+MBB Dalamud Asyncio Pipeline - bridge และ handler แบบ asyncio
+Asyncio variant of DalamudBridge + DalamudImmediateHandler
+
+ทุก stage ทำงานบน event loop เดียวใน background thread:
+
+    stream reader -> FramedReader -> handler._incoming (asyncio.Queue)
+        -> filter/cache stage -> _translate_jobs (PriorityJobQueue: story > choice > battle > other)
+        -> N translate workers -> TkResultChannel -> Tk main thread
+
+ไม่มีการสร้าง thread ต่อข้อความ - การแปลแบบ sync ใช้ ThreadPoolExecutor ขนาดคงที่
+ส่วน translator ที่มี translate_async() จะถูก await โดยตรงบน loop
+"""
+
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from dalamud_bridge import DalamudBridge
+from dalamud_framing import FRAMING_NEWLINE
+from dalamud_immediate_handler import (
+    DalamudImmediateHandler, is_ordered_message, message_route_class, MODE_LATEST_WINS, MODE_ORDERED,
+)
+from dalamud_ingress import message_priority
+from dalamud_workers import PriorityJobQueue, TranslationJob
+from dalamud_message import TextHookData
+from dalamud_events import MessageBus
+from dalamud_trace import activate as activate_trace, deactivate as deactivate_trace, STAGE_TK_DISPATCHED
+from dalamud_transport import READ_CHUNK_SIZE, merge_transport_config, resolve_transport_type
+from translation_cache import TieredTranslationCache
+from gemini_hedge import served_model_scope
+from model_router import CLASS_CUTSCENE, message_class_scope
+
+
+class AsyncLoopThread:
+    """Event loop เดียวที่รันใน background thread (ใช้ร่วมกันระหว่าง bridge และ handler)"""
+
+    def __init__(self, name: str = "DalamudAsyncLoop"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        if self.thread and self.thread.is_alive():
+            return self.loop
+        self._ready.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self.thread.start()
+        self._ready.wait()
+        return self.loop
+
+    def _run(self):
+        # Windows: ค่าเริ่มต้นเป็น ProactorEventLoop ซึ่งรองรับ named pipe
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def submit(self, coro):
+        """รัน coroutine บน loop จาก thread ใดก็ได้ - คืน concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.start())
+
+    def call_soon(self, callback: Callable, *args):
+        self.start().call_soon_threadsafe(callback, *args)
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self.thread and self.thread.is_alive())
+
+
+_shared_loop = AsyncLoopThread()
+
+
+def get_shared_loop() -> AsyncLoopThread:
+    """Event loop ที่ AsyncDalamudBridge และ AsyncDalamudHandler ใช้ร่วมกัน"""
+    return _shared_loop
+
+
+class TkResultChannel:
+    """
+    ช่องทางเดียวสำหรับส่งงานจาก background ไปยัง Tk main thread
+
+    ทุกงานเข้า SimpleQueue และ root.after(0, drain) ถูกจองเพียงครั้งเดียวต่อ burst
+    ถ้าไม่มี root (headless / benchmark) งานจะถูกรันทันทีใน thread ที่เรียก post()
+    """
+
+    def __init__(self, root=None):
+        self.root = root
+        self.logger = logging.getLogger('TkResultChannel')
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self.stats = {'posted': 0, 'drains': 0}
+
+    def post(self, func: Callable, *args):
+        self._queue.put((func, args))
+        self.stats['posted'] += 1
+
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        if self.root is None:
+            self.drain()
+            return
+        try:
+            self.root.after(0, self.drain)
+        except Exception as e:
+            self.logger.error(f"Cannot schedule Tk drain: {e}")
+            with self._lock:
+                self._scheduled = False
+
+    def drain(self):
+        """รันงานที่ค้างทั้งหมด (เรียกบน Tk main thread)"""
+        with self._lock:
+            self._scheduled = False
+        self.stats['drains'] += 1
+
+        while True:
+            try:
+                func, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                self.logger.error(f"UI task error: {e}")
+
+
+class AsyncDalamudBridge(DalamudBridge):
+    """
+    DalamudBridge ที่อ่าน stream ด้วย asyncio
+
+    API เหมือน DalamudBridge (start/stop/stats/set_text_callback) เพื่อให้ MBB สลับใช้ได้
+    text_callback ถูกเรียกบน event loop โดยตรง - ไม่มี reader/dispatcher thread, BridgeTransport
+    หรือ IngressQueue (backpressure อยู่ที่ asyncio.Queue ของ handler)
+    """
+
+    def __init__(self, transport_config: Optional[Dict[str, Any]] = None, framing: str = FRAMING_NEWLINE,
+                 loop_thread: Optional[AsyncLoopThread] = None):
+        self.transport_config = merge_transport_config(transport_config)
+        self._init_state(self.transport_config["pipe_name"], framing)
+        del self.stats['idle_wakeups']  # stream reader ตื่นเฉพาะเมื่อมีข้อมูลหรือ connection ปิด
+        self.stats['frames_dispatched'] = 0
+        self.loop_thread = loop_thread or get_shared_loop()
+        self._main_future = None
+        self._connection_closer = None
+        self.logger = logging.getLogger('AsyncDalamudBridge')
+
+    def start(self) -> bool:
+        """เริ่มการเชื่อมต่อกับ Dalamud plugin บน event loop"""
+        if self.is_running:
+            self.logger.warning("Bridge กำลังทำงานอยู่แล้ว")
+            return False
+
+        self.is_running = True
+        self._main_future = self.loop_thread.submit(self._connection_loop_async())
+        self.logger.info("Async Dalamud Bridge started")
+        return True
+
+    def stop(self):
+        """หยุดการเชื่อมต่อ"""
+        self.is_running = False
+        self.is_connected = False
+
+        if self._main_future is not None:
+            self.loop_thread.call_soon(self._main_future.cancel)
+            self._main_future = None
+
+        self.stop_recording()
+        self.logger.info("Async Dalamud Bridge stopped")
+
+    def get_ingress_stats(self) -> Dict[str, Any]:
+        """ไม่มี ingress queue - frame ถูกส่งให้ text_callback บน loop ทันที"""
+        return {}
+
+    def _read_path_stats(self, uptime: float) -> Dict[str, Any]:
+        """สถิติของ asyncio stream reader"""
+        return {
+            'transport': self._describe_transport(),
+            'read_mode': 'asyncio',
+            'frames_dispatched': self.stats['frames_dispatched'],
+        }
+
+    def _describe_transport(self) -> str:
+        transport_type = resolve_transport_type(self.transport_config["type"])
+        if transport_type == "unix_socket":
+            return f"{transport_type}:{self.transport_config['unix_socket_path']}"
+        if transport_type == "tcp":
+            return f"{transport_type}:{self.transport_config['tcp_host']}:{self.transport_config['tcp_port']}"
+        return f"{transport_type}:{self.transport_config['pipe_name']}"
+
+    def inject_message(self, message_str: str):
+        """ส่งข้อความ raw เข้า pipeline บน event loop (ใช้กับ replay)"""
+        self.loop_thread.call_soon(self._process_message, message_str)
+
+    def _process_message(self, message_str: str):
+        """บันทึก raw frame, แปลง JSON แล้วเรียก callback ทันทีบน loop (ไม่มี dispatcher thread)"""
+        self._record_frame(message_str)
+        message_data = self._decode_message(message_str)
+        if message_data is None:
+            return
+        if self.text_callback:
+            self.stats['frames_dispatched'] += 1
+            try:
+                self.text_callback(message_data)
+            except Exception as e:
+                self.logger.error(f"text_callback error: {e}")
+        else:
+            self.logger.warning(f"⚠️ DEBUG: No text_callback set - callback is None")
+
+    async def _open_connection(self):
+        """เปิด stream ตามชนิด transport - คืน (StreamReader, object ที่มี close())"""
+        transport_type = resolve_transport_type(self.transport_config["type"])
+        timeout = float(self.transport_config["connect_timeout"])
+
+        if transport_type == "unix_socket":
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_unix_connection(self.transport_config["unix_socket_path"]), timeout
+            )
+            return reader, writer
+        if transport_type == "tcp":
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.transport_config["tcp_host"], int(self.transport_config["tcp_port"])),
+                timeout,
+            )
+            return reader, writer
+        if transport_type == "named_pipe":
+            loop = asyncio.get_running_loop()
+            reader = asyncio.StreamReader()
+            protocol = asyncio.StreamReaderProtocol(reader)
+            pipe_transport, _ = await asyncio.wait_for(
+                loop.create_pipe_connection(lambda: protocol, self.transport_config["pipe_name"]), timeout
+            )
+            return reader, pipe_transport
+        raise ValueError(f"Unknown Dalamud transport type: {transport_type}")
+
+    async def _connection_loop_async(self):
+        """Connection loop พร้อม backoff เดียวกับ DalamudBridge"""
+        try:
+            while self.is_running:
+                self.stats['connection_attempts'] += 1
+                try:
+                    reader, closer = await self._open_connection()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.is_connected = False
+                    self._on_connection_failure(e)
+                    self._update_connection_health()
+                    await asyncio.sleep(self._get_retry_delay())
+                    continue
+
+                self._connection_closer = closer
+                self.is_connected = True
+                self._on_connection_success()
+                try:
+                    await self._read_stream(reader)
+                finally:
+                    self.is_connected = False
+                    closer.close()
+                    self._connection_closer = None
+
+                if self.is_running:
+                    await asyncio.sleep(self._get_retry_delay())
+        except asyncio.CancelledError:
+            pass
+
+    async def _read_stream(self, reader: asyncio.StreamReader):
+        """อ่าน chunk จาก stream แล้วแยก frame - ตื่นเฉพาะเมื่อมีข้อมูล"""
+        self.reader.reset()
+        while self.is_running:
+            try:
+                data = await reader.read(READ_CHUNK_SIZE)
+            except (ConnectionError, OSError) as e:
+                self.logger.error(f"Error reading from stream: {e}")
+                return
+
+            if not data:
+                self.logger.info("Connection to Dalamud lost")
+                return
+
+            self.stats['chunks_received'] += 1
+            self.stats['bytes_received'] += len(data)
+            for decoded_line in self.reader.feed(data):
+                self._process_message(decoded_line)
+
+
+class AsyncDalamudHandler(DalamudImmediateHandler):
+    """
+    DalamudImmediateHandler แบบ asyncio stages
+
+    process_message() เรียกได้จากทุก thread - ข้อความถูกส่งเข้า asyncio.Queue บน loop
+    ผลลัพธ์ทั้งหมดถูกส่งไป Tk ผ่าน TkResultChannel เดียว
+    """
+
+    def __init__(self, translator=None, ui_updater=None, main_app=None, concurrency: int = 4,
+                 queue_size: int = 64, loop_thread: Optional[AsyncLoopThread] = None,
+                 bus: Optional[MessageBus] = None, latest_wins: bool = True,
+                 ordered_cutscenes: bool = True, reorder_window: int = 8,
+                 translation_cache: Optional[TieredTranslationCache] = None,
+                 scheduler: Optional[Dict[str, Any]] = None, dedup: Optional[Dict[str, Any]] = None,
+                 streaming: bool = True):
+        super().__init__(translator, ui_updater, main_app, bus=bus, latest_wins=latest_wins,
+                         ordered_cutscenes=ordered_cutscenes, reorder_window=reorder_window,
+                         translation_cache=translation_cache, dedup=dedup, streaming=streaming)
+        self.scheduler = scheduler
+        self.logger = logging.getLogger('AsyncDalamudHandler')
+        self.concurrency = max(1, int(concurrency))
+        self.queue_size = max(1, int(queue_size))
+        self.loop_thread = loop_thread or get_shared_loop()
+        self.ui_channel = TkResultChannel(self._resolve_ui_root())
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="AsyncTranslate")
+
+        self._incoming: Optional[asyncio.Queue] = None
+        self._translate_jobs: Optional[PriorityJobQueue] = None   # ใช้บน loop thread เท่านั้น
+        self._jobs_ready: Optional[asyncio.Condition] = None
+        self._tasks = []
+
+        self.stats['queue_full_drops'] = 0
+
+    def _resolve_ui_root(self):
+        root = getattr(self.ui_updater, 'root', None)
+        if root is None and self.main_app_ref is not None:
+            root = getattr(self.main_app_ref, 'root', None)
+        return root
+
+    def set_ui_updater(self, ui_updater):
+        super().set_ui_updater(ui_updater)
+        self.ui_channel.root = self._resolve_ui_root()
+
+    def start(self):
+        """Start the handler and its asyncio stages"""
+        if self.is_running:
+            return
+        super().start()
+        self.ui_channel.root = self._resolve_ui_root()
+        self.loop_thread.submit(self._start_stages()).result()
+
+    def stop(self):
+        """Stop the handler and cancel its asyncio stages"""
+        super().stop()
+        if self.loop_thread.is_running:
+            self.loop_thread.submit(self._stop_stages()).result()
+
+    async def _start_stages(self):
+        self._incoming = asyncio.Queue(maxsize=self.queue_size)
+        self._translate_jobs = PriorityJobQueue(self.queue_size, self.scheduler)
+        self._jobs_ready = asyncio.Condition()
+        self._tasks = [asyncio.ensure_future(self._filter_stage())]
+        self._tasks += [asyncio.ensure_future(self._translate_worker(i)) for i in range(self.concurrency)]
+
+    async def _stop_stages(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def process_message(self, message_data: TextHookData):
+        """ส่งข้อความเข้า asyncio pipeline (thread-safe)"""
+        if not self.is_running:
+            # ยังเก็บข้อความต้นฉบับไว้ให้ Previous Dialog / สถานะ แม้ handler ยังไม่เริ่ม
+            self._prepare_message(message_data)
+            return
+        self.loop_thread.call_soon(self._enqueue, message_data)
+
+    def _enqueue(self, message_data: TextHookData):
+        try:
+            self._incoming.put_nowait(message_data)
+        except asyncio.QueueFull:
+            self.stats['queue_full_drops'] += 1
+            self.logger.warning("[ASYNC] incoming queue full - dropping message")
+
+    async def _filter_stage(self):
+        """Stage 1: filter + cache lookup + in-flight dedup"""
+        while True:
+            message_data = await self._incoming.get()
+            try:
+                prepared = self._prepare_message(message_data)
+                if prepared is None:
+                    continue
+                message_text, cache_key = prepared
+                priority = message_priority(message_data)
+                sequence = self._claim_sequence(priority)
+
+                if self.ordered_cutscenes and is_ordered_message(message_data):
+                    await self._enqueue_ordered(message_text, cache_key, message_data)
+                    continue
+
+                cached = self._lookup_cached(cache_key)
+                if cached is not None:
+                    self.logger.info(f"[CACHE HIT] แสดงคำแปลจาก cache ทันที!")
+                    self.stats['cache_hits'] += 1
+                    if message_data.trace is not None:
+                        message_data.trace.mark(STAGE_TK_DISPATCHED)
+                    self.ui_channel.post(self._show_immediately, cached, message_text, message_data, True)
+                    continue
+
+                if cache_key in self.translating_messages:
+                    self._job_sequence[cache_key] = (sequence, priority)
+                    self.logger.info(f"[กำลังแปล] ข้อความนี้กำลังแปลอยู่")
+                    continue
+
+                self.translating_messages.add(cache_key)
+                self._job_sequence[cache_key] = (sequence, priority)
+                if self.latest_wins:
+                    self._drop_jobs(self._translate_jobs.remove(
+                        lambda job: job.tag == MODE_LATEST_WINS and job.priority <= priority
+                    ))
+                await self._submit_job(
+                    (message_text, cache_key, message_data, None), priority, MODE_LATEST_WINS,
+                    lambda: self._cancel_async(cache_key, superseded=self._is_superseded(cache_key)),
+                )
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.error(f"Error processing message: {e}")
+
+    async def _enqueue_ordered(self, message_text: str, cache_key, message_data: TextHookData):
+        """Cutscene: จอง slot แล้วส่งเข้า translate queue - reorder buffer ทำงานบน Tk thread"""
+        slot = self._reserve_order_slot()
+
+        cached = self._lookup_cached(cache_key)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            self.ui_channel.post(self._complete_order_slot, slot, (message_text, message_data, cached, True))
+            return
+
+        if cache_key in self.translating_messages:
+            self.ui_channel.post(self._complete_order_slot, slot, None)
+            return
+
+        self.translating_messages.add(cache_key)
+        await self._submit_job(
+            (message_text, cache_key, message_data, slot), message_priority(message_data), MODE_ORDERED,
+            lambda: self._cancel_async(cache_key, slot),
+        )
+
+    async def _submit_job(self, item: tuple, priority: int, tag: str, on_drop: Callable[[], None]):
+        """เพิ่มงานเข้าคิว priority (ไม่บล็อก - คิวเต็มใช้กฎ preemption เดียวกับ worker pool)"""
+        self._drop_jobs(self._translate_jobs.push(TranslationJob(None, item, on_drop, tag, priority)))
+        async with self._jobs_ready:
+            self._jobs_ready.notify()
+
+    def _drop_jobs(self, jobs):
+        for job in jobs:
+            try:
+                job.on_drop()
+            except Exception as e:
+                self.logger.error(f"[ASYNC] on_drop error: {e}")
+
+    def _cancel_async(self, cache_key, slot: Optional[int] = None, superseded: bool = False):
+        """งานที่ถูกทิ้งจากคิวก่อนเรียก API - cleanup บน Tk thread เหมือนงานที่แปลเสร็จ"""
+        self.stats['api_calls_saved' if superseded else 'jobs_dropped'] += 1
+        if slot is not None:
+            self.ui_channel.post(self._complete_order_slot, slot, None)
+        self.ui_channel.post(self._finish_translation, cache_key)
+
+    async def _next_job(self) -> TranslationJob:
+        while True:
+            async with self._jobs_ready:
+                await self._jobs_ready.wait_for(lambda: len(self._translate_jobs) > 0)
+                job, expired = self._translate_jobs.pop()
+            self._drop_jobs(expired)
+            if job is not None:
+                return job
+
+    async def _translate_worker(self, worker_id: int):
+        """Stage 2: translate (หลาย worker ทำงานซ้อนกันบน loop เดียว)"""
+        while True:
+            job = await self._next_job()
+            message_text, cache_key, message_data, slot = job.args
+            if slot is not None:
+                await self._translate_ordered(message_text, cache_key, message_data, slot)
+                continue
+            try:
+                if self._is_superseded(cache_key):
+                    self.stats['api_calls_saved'] += 1
+                    self.logger.info(f"[SUPERSEDED] ข้ามการแปล - มีข้อความใหม่กว่าแล้ว")
+                    continue
+                translated_text = await self._translate_async(message_text, cache_key, message_data.trace,
+                                                              self._partial_sink(cache_key, message_data),
+                                                              message_route_class(message_data))
+                if message_data.trace is not None:
+                    message_data.trace.mark(STAGE_TK_DISPATCHED)
+                # ตรวจ stale อีกครั้งบน Tk thread ตอนจะแสดงจริง
+                self.ui_channel.post(self._deliver_if_current, cache_key, message_text, message_data, translated_text)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.error(f"Translation error: {e}")
+            finally:
+                # ปล่อย cache_key หลัง deliver (ui_channel เป็น FIFO) เพื่อให้ตรวจ sequence ได้ถูกต้อง
+                self.ui_channel.post(self._finish_translation, cache_key)
+
+    async def _translate_ordered(self, message_text: str, cache_key, message_data: TextHookData, slot: int):
+        result = None
+        try:
+            translated_text = await self._translate_async(message_text, cache_key, message_data.trace,
+                                                          self._partial_sink(cache_key, message_data, slot),
+                                                          CLASS_CUTSCENE)
+            result = (message_text, message_data, translated_text, False)
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.logger.error(f"Translation error: {e}")
+        finally:
+            self.ui_channel.post(self._complete_order_slot, slot, result)
+            self.ui_channel.post(self._finish_translation, cache_key)
+
+    async def _translate_async(self, message_text: str, cache_key, trace=None, partial=None,
+                               message_class: Optional[str] = None) -> str:
+        translate_async = getattr(self.translator, 'translate_async', None)
+        if translate_async is not None and asyncio.iscoroutinefunction(translate_async):
+            token = activate_trace(trace)
+            started = time.perf_counter()
+            try:
+                with served_model_scope() as served, message_class_scope(message_class):
+                    translated_text = await translate_async(message_text)
+            finally:
+                deactivate_trace(token)
+            self._record_api_time((time.perf_counter() - started) * 1000.0)
+            self._store_translation(cache_key, translated_text, served.model)
+            return translated_text
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._translate_message, message_text, cache_key,
+                                          trace, partial, message_class)
+
+    def _emit_partial(self, cache_key, message_data: TextHookData, slot: Optional[int], text: str):
+        """คำแปลบางส่วนจาก executor thread - ตรวจ stale และแสดงบน Tk thread ตามลำดับเดียวกับผลเต็ม"""
+        self.ui_channel.post(self._show_partial, cache_key, message_data, slot, text)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats.update({
+            'pipeline': 'asyncio',
+            'concurrency': self.concurrency,
+            'incoming_depth': self._incoming.qsize() if self._incoming else 0,
+            'translate_queue_depth': len(self._translate_jobs) if self._translate_jobs is not None else 0,
+            'translate_classes': self._translate_jobs.get_class_stats() if self._translate_jobs is not None else {},
+            'ui_channel': dict(self.ui_channel.stats),
+        })
+        return stats
+
+
+def create_async_dalamud_bridge(transport_config: Optional[Dict[str, Any]] = None,
+                                recording_config: Optional[Dict[str, Any]] = None) -> AsyncDalamudBridge:
+    """Create an AsyncDalamudBridge from the 'dalamud_transport' / 'dalamud_recording' settings"""
+    transport_config = transport_config or {}
+    bridge = AsyncDalamudBridge(transport_config, framing=transport_config.get("framing", FRAMING_NEWLINE))
+    if recording_config and recording_config.get("enabled"):
+        bridge.start_recording(recording_config.get("path", "logs/dalamud_stream.mbbrec"))
+    return bridge
+
+
+def create_async_dalamud_handler(translator=None, ui_updater=None, main_app=None,
+                                 concurrency: int = 4, queue_size: int = 64,
+                                 bus: Optional[MessageBus] = None,
+                                 latest_wins: bool = True, ordered_cutscenes: bool = True,
+                                 reorder_window: int = 8,
+                                 translation_cache: Optional[TieredTranslationCache] = None,
+                                 scheduler: Optional[Dict[str, Any]] = None,
+                                 dedup: Optional[Dict[str, Any]] = None,
+                                 streaming: bool = True
+                                 ) -> AsyncDalamudHandler:
+    """Create and configure an AsyncDalamudHandler instance"""
+    return AsyncDalamudHandler(translator, ui_updater, main_app, concurrency=concurrency,
+                               queue_size=queue_size, bus=bus,
+                               latest_wins=latest_wins, ordered_cutscenes=ordered_cutscenes,
+                               reorder_window=reorder_window, translation_cache=translation_cache,
+                               scheduler=scheduler, dedup=dedup, streaming=streaming)
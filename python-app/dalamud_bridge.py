@@ -2,49 +2,57 @@
 MBB Dalamud Bridge - Python Communication Module
 เชื่อมต่อระหว่าง Dalamud Plugin กับ MBB Python Application
 ใช้ Named Pipes สำหรับการรับข้อมูลจาก FFXIV text hook
+(transport เลือกได้จาก settings - ดู dalamud_transport.py)
 """
 
-import json
 import threading
 import time
-import win32pipe
-import win32file
-import win32api
 from typing import Optional, Dict, Any, Callable
 import logging
-from dataclasses import dataclass, asdict
 from collections import deque
+from dalamud_transport import BridgeTransport, create_transport, DEFAULT_PIPE_NAME
+from dalamud_framing import FramedReader, FRAMING_NEWLINE
+from dalamud_recorder import MessageRecorder
+from dalamud_ingress import IngressQueue, DEFAULT_INGRESS_CONFIG
+from dalamud_message import TextHookData, MessageDecodeError, decode_message, JSON_BACKEND
+from dalamud_trace import get_tracer
+
+# ข้อความ error ที่เกิดตามปกติระหว่างรอ Dalamud เปิด server (แยกตาม transport)
+EXPECTED_CONNECT_ERRORS = (
+    "cannot find the file specified",  # named pipe
+    "No such file or directory",       # unix socket
+    "Connection refused",              # unix socket / tcp
+)
+
+
+def _is_waiting_for_server_error(error) -> bool:
+    error_str = str(error)
+    return any(marker in error_str for marker in EXPECTED_CONNECT_ERRORS)
 
-@dataclass
-class TextHookData:
-    """Data structure for text received from Dalamud plugin"""
-    type: str           # "dialogue", "cutscene", "choice", "battle", "system"
-    speaker: str        # Character name (empty for narrative)
-    message: str        # The actual text content
-    timestamp: int      # Unix timestamp
-    chat_type: int      # Original XivChatType value
-
-    @classmethod
-    def from_dict(cls, data: dict) -> 'TextHookData':
-        """Create TextHookData from dictionary"""
-        return cls(
-            type=data.get('Type', 'unknown'),
-            speaker=data.get('Speaker', ''),
-            message=data.get('Message', ''),
-            timestamp=data.get('Timestamp', 0),
-            chat_type=data.get('ChatType', 0)
-        )
 
 class DalamudBridge:
-    def __init__(self, pipe_name: str = r'\\.\pipe\mbb_dalamud_bridge'):
+    def __init__(self, pipe_name: str = DEFAULT_PIPE_NAME, transport: Optional[BridgeTransport] = None,
+                 framing: str = FRAMING_NEWLINE, ingress_queue: Optional[IngressQueue] = None):
+        self._init_state(pipe_name, framing)
+        # Transport layer (named pipe / unix socket / tcp) - framing และ stats อยู่ใน bridge
+        self.transport = transport or create_transport({"pipe_name": pipe_name})
+        self.connection_thread = None
+
+        # Ingress queue: reader thread -> dispatcher thread (text_callback ไม่บล็อกการอ่าน pipe)
+        self.ingress = ingress_queue if ingress_queue is not None else IngressQueue(**DEFAULT_INGRESS_CONFIG)
+        self.dispatcher_thread = None
+        self.dispatcher_running = False
+
+    def _init_state(self, pipe_name: str, framing: str):
+        """state ที่ไม่ขึ้นกับวิธีอ่าน stream (ใช้ร่วมกับ AsyncDalamudBridge)"""
         self.pipe_name = pipe_name
-        self.pipe_handle = None
+        self.reader = FramedReader(framing)
         self.is_connected = False
         self.is_running = False
         self.text_callback: Optional[Callable] = None
-        self.connection_thread = None
+        self.recorder: Optional[MessageRecorder] = None  # บันทึก raw stream สำหรับ replay
 
-        # Message queue for buffering incoming messages
+        # Message queue for buffering incoming messages (สำหรับ get_latest_text / polling)
         self.message_queue = deque(maxlen=10)  # Keep last 10 messages
         self.latest_text: Optional[TextHookData] = None
         self.queue_lock = threading.Lock()
@@ -66,6 +74,10 @@ class DalamudBridge:
         # สถิติการเชื่อมต่อ
         self.stats = {
             'messages_received': 0,
+            'decode_errors': 0,
+            'chunks_received': 0,
+            'bytes_received': 0,
+            'idle_wakeups': 0,
             'connection_attempts': 0,
             'successful_connections': 0,
             'total_failures': 0,
@@ -75,11 +87,63 @@ class DalamudBridge:
         }
 
 
-    def set_text_callback(self, callback: Callable[[Dict[str, Any]], None]):
+    def set_text_callback(self, callback: Callable[[TextHookData], None]):
         """ตั้งค่า callback function สำหรับรับข้อความจาก Dalamud"""
         self.text_callback = callback
 
 
+    def start_dispatcher(self):
+        """เริ่ม dispatcher thread ที่เรียก text_callback (เรียกซ้ำได้)"""
+        if self.dispatcher_thread and self.dispatcher_thread.is_alive():
+            return
+        self.dispatcher_running = True
+        self.ingress.reopen()
+        self.dispatcher_thread = threading.Thread(
+            target=self._dispatch_loop, daemon=True, name="DalamudDispatcher"
+        )
+        self.dispatcher_thread.start()
+
+    def stop_dispatcher(self):
+        """หยุด dispatcher thread และล้างข้อความที่ค้างในคิว"""
+        self.dispatcher_running = False
+        self.ingress.close()
+        if self.dispatcher_thread and self.dispatcher_thread.is_alive():
+            self.dispatcher_thread.join(timeout=2.0)
+        self.ingress.clear()
+
+    def _dispatch_loop(self):
+        """ดึงข้อความจาก ingress queue แล้วส่งให้ text_callback"""
+        while self.dispatcher_running:
+            message_data = self.ingress.get(timeout=1.0)
+            if message_data is None:
+                continue
+
+            # เรียก callback function (if set)
+            if self.text_callback:
+                try:
+                    self.logger.debug(f"🔍 DEBUG: Calling text_callback with message_data: {message_data}")
+                    self.text_callback(message_data)
+                except Exception as e:
+                    self.logger.error(f"text_callback error: {e}")
+            else:
+                self.logger.warning(f"⚠️ DEBUG: No text_callback set - callback is None")
+
+    def start_recording(self, path: str):
+        """เริ่มบันทึกทุกบรรทัดที่ได้รับลงไฟล์ (append-only) สำหรับ replay"""
+        self.stop_recording()
+        self.recorder = MessageRecorder(path)
+
+    def stop_recording(self):
+        """หยุดบันทึก stream"""
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def inject_message(self, message_str: str):
+        """ส่งข้อความ raw เข้า pipeline เหมือนอ่านได้จาก transport (ใช้กับ replay)"""
+        self.start_dispatcher()
+        self._process_message(message_str)
+
     def start(self) -> bool:
         """เริ่มการเชื่อมต่อกับ Dalamud plugin"""
         if self.is_running:
@@ -87,6 +151,7 @@ class DalamudBridge:
             return False
 
         self.is_running = True
+        self.start_dispatcher()
         self.connection_thread = threading.Thread(target=self._connection_loop, daemon=True)
         self.connection_thread.start()
 
@@ -98,16 +163,14 @@ class DalamudBridge:
         self.is_running = False
         self.is_connected = False
 
-        if self.pipe_handle:
-            try:
-                win32file.CloseHandle(self.pipe_handle)
-            except:
-                pass
-            self.pipe_handle = None
+        self.transport.close()
 
         if self.connection_thread and self.connection_thread.is_alive():
             self.connection_thread.join(timeout=2.0)
 
+        self.stop_dispatcher()
+        self.stop_recording()
+
         self.logger.info("Dalamud Bridge stopped")
 
     def _connection_loop(self):
@@ -140,7 +203,7 @@ class DalamudBridge:
 
             except Exception as e:
                 # Only log error if it's not a "file not found" error during normal operation
-                if "cannot find the file specified" not in str(e) or self.consecutive_failures < 3:
+                if not _is_waiting_for_server_error(e) or self.consecutive_failures < 3:
                     self.logger.error(f"Connection error: {e}")
                 self.is_connected = False
                 self._on_connection_failure(e)
@@ -198,8 +261,7 @@ class DalamudBridge:
         self.last_connection_attempt = time.time()
 
         # 🔧 IMPROVEMENT: More intelligent logging - less spam for expected failures
-        error_str = str(error)
-        is_expected_error = "cannot find the file specified" in error_str
+        is_expected_error = _is_waiting_for_server_error(error)
 
         if is_expected_error and self.consecutive_failures > 5:
             # After 5 failed attempts, reduce log frequency for expected errors
@@ -213,23 +275,12 @@ class DalamudBridge:
             self.logger.warning(f"Connection failed: {error} (attempt {self.consecutive_failures}) - entering backoff mode")
 
     def _connect_to_pipe(self):
-        """เชื่อมต่อกับ named pipe"""
+        """เชื่อมต่อกับ Dalamud ผ่าน transport ที่เลือกไว้"""
         self.stats['connection_attempts'] += 1
 
         try:
-            # รอ pipe server จาก Dalamud - เพิ่ม timeout สำหรับ stability
-            win32pipe.WaitNamedPipe(self.pipe_name, 10000)  # Wait 10 seconds (improved)
-
-            # เปิดการเชื่อมต่อ
-            self.pipe_handle = win32file.CreateFile(
-                self.pipe_name,
-                win32file.GENERIC_READ,
-                0,
-                None,
-                win32file.OPEN_EXISTING,
-                0,
-                None
-            )
+            # รอ server จาก Dalamud (named pipe: WaitNamedPipe, socket: connect timeout)
+            self.transport.connect()
 
             self.is_connected = True
             # Connection success handling is done in _on_connection_success()
@@ -240,32 +291,29 @@ class DalamudBridge:
             raise e  # Re-raise to be handled by connection loop
 
     def _read_messages(self):
-        """อ่านข้อความจาก pipe"""
-        buffer = b""
+        """อ่านข้อความจาก transport"""
+        # เริ่ม buffer ใหม่ทุกครั้งที่เชื่อมต่อ - ไม่ต่อข้อมูลค้างจาก connection เก่า
+        self.reader.reset()
 
         while self.is_connected and self.is_running:
             try:
-                # อ่านข้อมูลจาก pipe
-                result, data = win32file.ReadFile(self.pipe_handle, 4096)
-
-                if result == 0 and data:  # สำเร็จ
-                    buffer += data
-                    self.stats['messages_received'] += 1
-
-                    # แยกข้อความที่สมบูรณ์ (คั่นด้วย \n)
-                    while b'\n' in buffer:
-                        line, buffer = buffer.split(b'\n', 1)
-                        if line.strip():
-                            # Handle UTF-8 BOM if present
-                            try:
-                                decoded_line = line.decode('utf-8-sig')  # Auto removes BOM
-                            except UnicodeDecodeError:
-                                decoded_line = line.decode('utf-8', errors='ignore')
-                            self._process_message(decoded_line)
-
-                elif result == 0 and not data:
-                    # ไม่มีข้อมูล - รอต่อ (ปรับปรุงความเร็ว: 0.1 → 0.01)
-                    time.sleep(0.01)  # Optimized: 10ms instead of 100ms for better response
+                # อ่านข้อมูลจาก transport
+                data = self.transport.read(4096)
+
+                if data:  # สำเร็จ
+                    self.stats['chunks_received'] += 1
+                    self.stats['bytes_received'] += len(data)
+
+                    # แยกข้อความที่สมบูรณ์ (newline หรือ length-prefixed)
+                    for decoded_line in self.reader.feed(data):
+                        self._process_message(decoded_line)
+
+                elif data is not None:
+                    # ไม่มีข้อมูล - event mode: transport รอจนครบ idle timeout แล้ว
+                    # poll mode: รอต่อ (ปรับปรุงความเร็ว: 0.1 → 0.01)
+                    self.stats['idle_wakeups'] += 1
+                    if not self.transport.event_driven:
+                        time.sleep(0.01)  # Optimized: 10ms instead of 100ms for better response
                     continue
 
                 else:
@@ -275,44 +323,54 @@ class DalamudBridge:
                     break
 
             except Exception as e:
-                self.logger.error(f"Error reading from pipe: {e}")
+                self.logger.error(f"Error reading from {self.transport.name}: {e}")
                 self.is_connected = False
                 break
 
         # ปิดการเชื่อมต่อ
-        if self.pipe_handle:
-            win32file.CloseHandle(self.pipe_handle)
-            self.pipe_handle = None
+        self.transport.close()
 
     def _process_message(self, message_str: str):
         """ประมวลผลข้อความที่ได้รับ"""
+        self._record_frame(message_str)
+        message_data = self._decode_message(message_str)
+        if message_data is not None:
+            # ส่งต่อให้ dispatcher thread - ไม่บล็อก reader แม้ callback จะช้า
+            self.ingress.put(message_data)
+
+    def _record_frame(self, message_str: str):
+        """บันทึก raw frame ลงไฟล์ replay (ถ้าเปิด recorder) - ก่อน decode เพื่อให้เก็บแม้ frame เสีย"""
+        recorder = self.recorder
+        if recorder:
+            recorder.record(message_str)
+
+    def _decode_message(self, message_str: str) -> Optional[TextHookData]:
+        """decode เป็น TextHookData และเก็บเป็นข้อความล่าสุด"""
         try:
-            message_data = json.loads(message_str)
+            text_data = decode_message(message_str)
+        except MessageDecodeError as e:
+            self.stats['decode_errors'] += 1
+            self.logger.error(f"JSON decode error: {e}")
+            return None
 
-            self.stats['messages_received'] += 1
-            self.stats['last_message_time'] = time.time()
+        get_tracer().start(text_data)
 
-            self.logger.debug(f"Received message: {message_data.get('Type', 'unknown')} - "
-                            f"{message_data.get('Speaker', '')}: {message_data.get('Message', '')[:50]}...")
+        self.stats['messages_received'] += 1
+        self.stats['last_message_time'] = time.time()
 
-            # Convert to TextHookData and store
-            text_data = TextHookData.from_dict(message_data)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Received message: {text_data.type} - "
+                              f"{text_data.speaker}: {text_data.message[:50]}...")
 
-            with self.queue_lock:
-                self.message_queue.append(text_data)
-                self.latest_text = text_data
+        with self.queue_lock:
+            self.message_queue.append(text_data)
+            self.latest_text = text_data
 
-            # เรียก callback function (if set)
-            if self.text_callback:
-                self.logger.debug(f"🔍 DEBUG: Calling text_callback with message_data: {message_data}")
-                self.text_callback(message_data)
-            else:
-                self.logger.warning(f"⚠️ DEBUG: No text_callback set - callback is None")
+        return text_data
 
-        except json.JSONDecodeError as e:
-            self.logger.error(f"JSON decode error: {e}")
-        except Exception as e:
-            self.logger.error(f"Message processing error: {e}")
+    def get_ingress_stats(self) -> Dict[str, Any]:
+        """สถิติของ ingress queue (enqueued / dropped / max depth / ข้อความที่ถูกทิ้งล่าสุด)"""
+        return self.ingress.get_stats()
 
     def get_status(self) -> Dict[str, Any]:
         """ได้รับสถานะปัจจุบันของการเชื่อมต่อ"""
@@ -357,9 +415,26 @@ class DalamudBridge:
             'messages_received': self.stats['messages_received'],
             'uptime_seconds': uptime,
             'last_message_time': self.stats['last_message_time'],
+            'framing': self.reader.mode,
+            'json_backend': JSON_BACKEND,
+            'decode_errors': self.stats['decode_errors'],
+            'chunks_received': self.stats['chunks_received'],
+            'bytes_received': self.stats['bytes_received'],
+            'max_buffered_bytes': self.reader.stats['max_buffered_bytes'],
+            **self._read_path_stats(uptime),
             'success_rate': (self.stats['successful_connections'] / max(self.stats['connection_attempts'], 1)) * 100
         }
 
+    def _read_path_stats(self, uptime: float) -> Dict[str, Any]:
+        """สถิติของ transport / reader thread / ingress queue"""
+        return {
+            'transport': self.transport.describe(),
+            'read_mode': 'event' if self.transport.event_driven else 'poll',
+            'idle_wakeups': self.stats['idle_wakeups'],
+            'idle_wakeups_per_minute': (self.stats['idle_wakeups'] / uptime * 60) if uptime > 0 else 0,
+            'ingress': self.ingress.get_stats(),
+        }
+
     def reset_connection_health(self):
         """🔧 Reset connection health for manual recovery"""
         self.consecutive_failures = 0
@@ -387,13 +462,28 @@ class DalamudBridge:
             self.latest_text = None
 
 
+def create_dalamud_bridge(transport_config: Optional[Dict[str, Any]] = None,
+                          recording_config: Optional[Dict[str, Any]] = None,
+                          ingress_config: Optional[Dict[str, Any]] = None) -> DalamudBridge:
+    """Create a DalamudBridge from the 'dalamud_transport' / 'dalamud_recording' / 'dalamud_ingress' settings"""
+    transport_config = transport_config or {}
+    bridge = DalamudBridge(
+        transport=create_transport(transport_config),
+        framing=transport_config.get("framing", FRAMING_NEWLINE),
+        ingress_queue=IngressQueue(**{**DEFAULT_INGRESS_CONFIG, **(ingress_config or {})}),
+    )
+    if recording_config and recording_config.get("enabled"):
+        bridge.start_recording(recording_config.get("path", "logs/dalamud_stream.mbbrec"))
+    return bridge
+
+
 def create_test_callback():
     """สร้าง callback function สำหรับทดสอบ"""
-    def test_callback(message_data):
-        print(f"[TEST] {message_data.get('Type', 'unknown').upper()}")
-        print(f"       Speaker: {message_data.get('Speaker', 'N/A')}")
-        print(f"       Message: {message_data.get('Message', 'N/A')}")
-        print(f"       Time: {message_data.get('Timestamp', 'N/A')}")
+    def test_callback(text_data):
+        print(f"[TEST] {text_data.type.upper()}")
+        print(f"       Speaker: {text_data.speaker or 'N/A'}")
+        print(f"       Message: {text_data.message or 'N/A'}")
+        print(f"       Time: {text_data.timestamp or 'N/A'}")
         print("-" * 50)
     return test_callback
 
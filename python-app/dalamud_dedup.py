@@ -0,0 +1,131 @@
+"""
+MBB Dalamud Dedup - ตัดบรรทัดซ้ำที่ plugin ส่งมาจากหลาย hook
+Duplicate-suppression index with a sliding time window
+
+Plugin ส่งบรรทัดเดียวกันได้จากหลายทาง (OnTalkAddonPreReceive, OnChatMessage,
+OnTalkSubtitleAddon, universal detectors) ห่างกันไม่กี่ ms - ถ้าไม่ตัดทิ้งจะเสียค่า API ซ้ำ
+
+Fingerprint คือ blake2b ของข้อความหลัง normalize (NFKC, ตัด zero-width/private-use glyph
+ของเกม, แปลง quote/ellipsis, ยุบ whitespace, casefold) จึงทนต่อความต่างของ format ระหว่าง hook
+Speaker ไม่อยู่ใน fingerprint เพราะบาง hook ไม่ส่งชื่อผู้พูดมา
+
+กติกา (ภายใน window_s วินาทีนับจากครั้งแรกที่เห็น):
+    Type ต่างกัน   -> ซ้ำเสมอ (hook อื่นส่งบรรทัดเดิม)
+    Type เดียวกัน  -> ซ้ำเฉพาะเมื่อเป็น fingerprint ล่าสุดของ Type นั้น (ส่งซ้ำติดกัน)
+                      NPC พูด "..." สองครั้งโดยมีบรรทัดอื่นคั่นยังถูกแปล/แสดงตามปกติ
+"""
+
+import re
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dalamud_message import TextHookData
+
+DEFAULT_DEDUP_CONFIG = {
+    "enabled": True,
+    "window_s": 1.5,
+    "max_entries": 256,
+}
+
+# zero-width, BOM และ private-use area (ไอคอน/สีของเกมที่ Dalamud แปลงเป็น glyph)
+_INVISIBLE_RE = re.compile("[\u200b-\u200f\u2060\ufeff\ue000-\uf8ff]")
+_PUNCT_TABLE = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "…": "...", "–": "-", "—": "-", "─": "-",
+})
+
+
+def fingerprint(text: str) -> bytes:
+    """Digest ของข้อความที่ normalize แล้ว"""
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _INVISIBLE_RE.sub("", text).translate(_PUNCT_TABLE)
+    text = " ".join(text.split()).casefold()
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+class DuplicateIndex:
+    """Index ของ fingerprint ในช่วงเวลาล่าสุด + ตัวนับต่อ Type"""
+
+    def __init__(self, window_s: float = 1.5, max_entries: int = 256):
+        self.window_s = float(window_s)
+        self.max_entries = max(1, int(max_entries))
+        self.logger = logging.getLogger('DuplicateIndex')
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()  # fingerprint -> (first_seen, type)
+        self._last_by_type: Dict[str, bytes] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.pairs: Dict[str, int] = {}  # "ต้นฉบับ->ซ้ำ" เช่น "dialogue->chat"
+
+    def is_duplicate(self, message_data: TextHookData) -> bool:
+        """บันทึกข้อความลง index - คืน True ถ้าเป็นบรรทัดซ้ำที่ควรตัดทิ้ง"""
+        digest = fingerprint(message_data.message)
+        message_type = message_data.type
+        now = time.monotonic()
+
+        with self._lock:
+            self._expire(now)
+            counters = self.stats.get(message_type)
+            if counters is None:
+                counters = self.stats[message_type] = {'seen': 0, 'duplicates': 0}
+            counters['seen'] += 1
+
+            entry = self._entries.get(digest)
+            if entry is not None:
+                first_type = entry[1]
+                if first_type != message_type or self._last_by_type.get(message_type) == digest:
+                    counters['duplicates'] += 1
+                    pair = f"{first_type}->{message_type}"
+                    self.pairs[pair] = self.pairs.get(pair, 0) + 1
+                    self._last_by_type[message_type] = digest
+                    return True
+                # Type เดิมพูดซ้ำหลังมีบรรทัดอื่นคั่น - ถือเป็นบรรทัดใหม่
+                del self._entries[digest]
+
+            self._entries[digest] = (now, message_type)
+            self._last_by_type[message_type] = digest
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return False
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_s
+        entries = self._entries
+        while entries:
+            digest, (seen_at, _) = next(iter(entries.items()))
+            if seen_at >= cutoff:
+                break
+            del entries[digest]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._last_by_type.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {}
+            self.pairs = {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_type = {message_type: dict(counters) for message_type, counters in self.stats.items()}
+            return {
+                'window_s': self.window_s,
+                'indexed': len(self._entries),
+                'duplicates': sum(counters['duplicates'] for counters in by_type.values()),
+                'by_type': by_type,
+                'pairs': dict(self.pairs),
+            }
+
+
+def create_duplicate_index(config: Optional[Dict[str, Any]] = None) -> Optional[DuplicateIndex]:
+    """สร้าง index จาก setting 'dalamud_dedup' (None ถ้าปิดไว้)"""
+    config = {**DEFAULT_DEDUP_CONFIG, **(config or {})}
+    if not config["enabled"]:
+        return None
+    return DuplicateIndex(config["window_s"], config["max_entries"])
@@ -0,0 +1,207 @@
+"""
+MBB Dalamud Events - publish/subscribe message bus ภายใน process
+In-process event bus between the Dalamud handler and its sinks
+
+Handler เพียงแค่ publish event ตาม topic - sink ต่างๆ (TUI auto-show, history,
+translated logs, status line, logger) subscribe เองโดยไม่ต้องแก้ handler
+
+    raw_received -> ข้อความจาก bridge ก่อนผ่าน filter
+    filtered     -> ข้อความที่ผ่าน ChatType filter แล้ว (พร้อม message_text)
+    translated   -> แปลเสร็จ (ไม่รวม cache hit)
+    displayed    -> คำแปลถูกแสดงบน TUI แล้ว (รวม cache hit)
+
+Subscriber แต่ละตัวมีคิวและ thread ของตัวเอง ดังนั้น sink ที่ช้า (เช่น Translated_Logs)
+ไม่สามารถหน่วง publisher หรือ subscriber อื่นได้ เมื่อคิวเต็มจะทิ้ง event เก่าสุดของ subscriber นั้น
+"""
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from dalamud_message import TextHookData
+
+TOPIC_RAW_RECEIVED = "raw_received"
+TOPIC_FILTERED = "filtered"
+TOPIC_TRANSLATED = "translated"
+TOPIC_DISPLAYED = "displayed"
+
+DEFAULT_SUBSCRIBER_QUEUE = 64
+
+
+@dataclass
+class RawReceivedEvent:
+    message: TextHookData
+
+
+@dataclass
+class FilteredEvent:
+    message: TextHookData
+    message_text: str       # "Speaker: Message" หลัง sanitize
+
+
+@dataclass
+class TranslatedEvent:
+    message: TextHookData
+    message_text: str
+    translated_text: str
+
+
+@dataclass
+class DisplayedEvent:
+    translated_text: str
+    message_text: Optional[str] = None          # None เมื่อไม่ทราบต้นฉบับ
+    message: Optional[TextHookData] = None
+    from_cache: bool = False
+
+
+# topic -> ชนิด event ที่ publish ได้
+TOPIC_TYPES = {
+    TOPIC_RAW_RECEIVED: RawReceivedEvent,
+    TOPIC_FILTERED: FilteredEvent,
+    TOPIC_TRANSLATED: TranslatedEvent,
+    TOPIC_DISPLAYED: DisplayedEvent,
+}
+
+
+class Subscription:
+    """Subscriber หนึ่งตัว: callback + คิวของตัวเอง + worker thread (หรือ inline)"""
+
+    def __init__(self, topic: str, callback: Callable[[Any], None], name: str,
+                 inline: bool = False, max_queue: int = DEFAULT_SUBSCRIBER_QUEUE):
+        self.topic = topic
+        self.callback = callback
+        self.name = name
+        self.inline = inline
+        self.logger = logging.getLogger('MessageBus')
+
+        self._items = deque()
+        self._max_queue = max(1, int(max_queue))
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            'delivered': 0,
+            'dropped': 0,
+            'errors': 0,
+            'max_depth': 0,
+        }
+
+    def deliver(self, event):
+        """รับ event จาก publisher - ไม่บล็อก (inline subscriber ถูกเรียกทันที)"""
+        if self.inline:
+            self._invoke(event)
+            return
+
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._items) >= self._max_queue:
+                self._items.popleft()
+                self.stats['dropped'] += 1
+            self._items.append(event)
+            depth = len(self._items)
+            if depth > self.stats['max_depth']:
+                self.stats['max_depth'] = depth
+            self._cond.notify()
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name=f"BusSubscriber-{self.name}")
+                self._thread.start()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._items.clear()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._items and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                event = self._items.popleft()
+            self._invoke(event)
+
+    def _invoke(self, event):
+        try:
+            self.callback(event)
+            self.stats['delivered'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.logger.error(f"[BUS] subscriber '{self.name}' error on {self.topic}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self.stats, 'topic': self.topic, 'inline': self.inline, 'depth': len(self._items)}
+
+
+class MessageBus:
+    """Publish/subscribe bus ที่มี topic แบบกำหนดชนิด event"""
+
+    def __init__(self, max_queue: int = DEFAULT_SUBSCRIBER_QUEUE):
+        self.max_queue = max_queue
+        self.logger = logging.getLogger('MessageBus')
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[Subscription]] = {topic: [] for topic in TOPIC_TYPES}
+        self.stats = {topic: 0 for topic in TOPIC_TYPES}
+
+    def subscribe(self, topic: str, callback: Callable[[Any], None], name: Optional[str] = None,
+                  inline: bool = False, max_queue: Optional[int] = None) -> Subscription:
+        """
+        ลงทะเบียน callback กับ topic
+
+        Args:
+            inline: เรียก callback ใน thread ของ publisher (ใช้กับ sink ที่เร็วมากเท่านั้น)
+            max_queue: ขนาดคิวของ subscriber นี้ (ค่าเริ่มต้นของ bus ถ้าไม่ระบุ)
+        """
+        if topic not in TOPIC_TYPES:
+            raise ValueError(f"Unknown topic: {topic}")
+        subscription = Subscription(topic, callback, name or getattr(callback, '__name__', 'subscriber'),
+                                    inline=inline, max_queue=max_queue or self.max_queue)
+        with self._lock:
+            # copy-on-write เพื่อให้ publish วนลูปได้โดยไม่ต้องถือ lock
+            self._subscribers[topic] = self._subscribers[topic] + [subscription]
+        self.logger.info(f"[BUS] '{subscription.name}' subscribed to {topic}")
+        return subscription
+
+    def unsubscribe(self, subscription: Optional[Subscription]):
+        if subscription is None:
+            return
+        with self._lock:
+            self._subscribers[subscription.topic] = [
+                s for s in self._subscribers[subscription.topic] if s is not subscription
+            ]
+        subscription.close()
+
+    def publish(self, topic: str, event):
+        """ส่ง event ให้ทุก subscriber ของ topic (ไม่บล็อกรอ subscriber แบบมีคิว)"""
+        expected = TOPIC_TYPES[topic]
+        if type(event) is not expected:
+            raise TypeError(f"{topic} expects {expected.__name__}, got {type(event).__name__}")
+        self.stats[topic] += 1
+        for subscription in self._subscribers[topic]:
+            subscription.deliver(event)
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._subscribers[topic])
+
+    def close(self):
+        """ปิด subscriber ทั้งหมด"""
+        with self._lock:
+            subscriptions = [s for subs in self._subscribers.values() for s in subs]
+            self._subscribers = {topic: [] for topic in TOPIC_TYPES}
+        for subscription in subscriptions:
+            subscription.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'published': dict(self.stats),
+            'subscribers': {
+                f"{s.topic}/{s.name}": s.get_stats() for subs in self._subscribers.values() for s in subs
+            },
+        }
@@ -0,0 +1,292 @@
+"""
+MBB Dalamud Filters - rules engine สำหรับตัดสินว่าข้อความจาก Text Hook ควรแปลหรือไม่
+Compiled, data-driven ChatType filter rules with per-rule hit counters
+
+กฎถูกโหลดจากไฟล์ JSON (ค่าเริ่มต้น config/chat_filter_rules.json) - ถ้ายังไม่มีไฟล์
+จะเขียนกฎเริ่มต้นลงไฟล์ให้แก้ไขต่อได้โดยไม่ต้องออก release ใหม่:
+
+    {
+      "default": "allow",
+      "rules": [
+        {"name": "combat_damage", "action": "block", "chat_types": [2857, 12457]},
+        {"name": "cutscene_type", "action": "allow", "types": ["cutscene"]},
+        {"name": "npc_barks", "action": "block", "speaker": "^Striking Dummy$", "message": "(?i)^you hit"}
+      ]
+    }
+
+เงื่อนไขทุกข้อในกฎต้องตรงทั้งหมด (chat_types, types, speaker regex, message regex)
+และกฎแรกที่ตรง (ตามลำดับในไฟล์) เป็นผู้ตัดสิน
+
+กฎถูก compile ครั้งเดียวเป็น dispatch table: กฎที่มีแค่ chat_types ถูก index ด้วย dict
+ส่วนกฎที่ต้องตรวจ regex/type ถูกจัดเป็นรายการต่อ ChatType แบบ lazy (cache ไว้ครั้งแรกที่เจอ)
+ทุกกฎนับ hit - กฎ block ที่ hit สูงคือกฎที่ประหยัด API call ได้มากที่สุด
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from dalamud_message import TextHookData
+
+ACTION_ALLOW = "allow"
+ACTION_BLOCK = "block"
+FILTER_ACTIONS = (ACTION_ALLOW, ACTION_BLOCK)
+
+DEFAULT_FILTER_CONFIG = {
+    "rules_path": "config/chat_filter_rules.json",
+    "auto_reload": True,        # โหลดกฎใหม่เมื่อไฟล์ถูกแก้ไข
+    "reload_check_s": 2.0,      # ตรวจ mtime ของไฟล์ไม่บ่อยกว่านี้
+}
+
+# กฎเริ่มต้น - ย้ายมาจาก BLOCKED_CHAT_TYPES / ALLOWED_CHAT_TYPES เดิมของ dalamud_immediate_handler
+DEFAULT_RULES = {
+    "default": ACTION_ALLOW,
+    "rules": [
+        {"name": "player_actions", "action": ACTION_BLOCK, "chat_types": [2092, 29],
+         "note": "You use a bowl of mesquite soup / other player emotes"},
+        {"name": "combat_damage", "action": ACTION_BLOCK,
+         "chat_types": [2857, 12457, 4777, 2729, 9001, 9002, 2874],
+         "note": "You hit X for Y damage, Critical!, immunity, victory"},
+        {"name": "casting", "action": ACTION_BLOCK, "chat_types": [4139, 10283, 12331],
+         "note": "begins casting / is interrupted"},
+        {"name": "status_effects", "action": ACTION_BLOCK,
+         "chat_types": [4398, 4400, 2735, 10929, 9007, 13105],
+         "note": "gains / loses / suffers / recovers from the effect of"},
+        {"name": "hp_recovery", "action": ACTION_BLOCK, "chat_types": [4269, 2221],
+         "note": "You recover / absorb X HP"},
+        {"name": "gear_changes", "action": ACTION_BLOCK, "chat_types": [2105, 57],
+         "note": "unequipped / Gear recommended for a viper equipped (71 is cutscene text - never block)"},
+        {"name": "hunt_party", "action": ACTION_BLOCK, "chat_types": [11],
+         "note": "Hunt board notifications and party status"},
+        {"name": "legacy_combat", "action": ACTION_BLOCK,
+         "chat_types": [2091, 2110, 2218, 2219, 2220, 2222, 2224, 2233, 2235, 2240, 2241, 2242,
+                        2265, 2266, 2267, 2283, 2284, 2285, 2317, 2318, 2730, 2731, 3001,
+                        8235, 8745, 8746, 8747, 8748, 8749, 8750, 8752, 8754,
+                        10409, 10410, 10411, 10412, 10413]},
+        {"name": "dialogue", "action": ACTION_ALLOW, "chat_types": [61]},
+        {"name": "cutscene_subtitle", "action": ACTION_ALLOW, "chat_types": [0x0047],
+         "note": "TalkSubtitle addon"},
+        {"name": "cutscene_type", "action": ACTION_ALLOW, "types": ["cutscene"]},
+    ],
+}
+
+
+class FilterRuleError(ValueError):
+    """ไฟล์กฎผิดรูปแบบ"""
+
+
+class FilterRule:
+    """กฎหนึ่งข้อที่ compile แล้ว"""
+
+    __slots__ = ("index", "name", "action", "allow", "chat_types", "types", "speaker", "message", "hits")
+
+    def __init__(self, index: int, spec: Dict[str, Any]):
+        self.index = index
+        self.name = str(spec.get("name") or f"rule_{index}")
+        self.action = spec.get("action", ACTION_BLOCK)
+        if self.action not in FILTER_ACTIONS:
+            raise FilterRuleError(f"Rule '{self.name}': unknown action {self.action!r}")
+        self.allow = self.action == ACTION_ALLOW
+        self.chat_types = frozenset(int(value) for value in spec.get("chat_types") or ()) or None
+        self.types = frozenset(str(value) for value in spec.get("types") or ()) or None
+        try:
+            self.speaker = re.compile(spec["speaker"]) if spec.get("speaker") else None
+            self.message = re.compile(spec["message"]) if spec.get("message") else None
+        except re.error as e:
+            raise FilterRuleError(f"Rule '{self.name}': invalid regex: {e}")
+        if not (self.chat_types or self.types or self.speaker or self.message):
+            raise FilterRuleError(f"Rule '{self.name}' has no conditions")
+        self.hits = 0
+
+    @property
+    def chat_type_only(self) -> bool:
+        return self.types is None and self.speaker is None and self.message is None
+
+    def matches_rest(self, message_data: TextHookData) -> bool:
+        """ตรวจเงื่อนไขที่ไม่ใช่ chat_types (chat_types ถูกตรวจจาก dispatch table แล้ว)"""
+        if self.types is not None and message_data.type not in self.types:
+            return False
+        if self.speaker is not None and not self.speaker.search(message_data.speaker):
+            return False
+        if self.message is not None and not self.message.search(message_data.message):
+            return False
+        return True
+
+
+class ChatFilterEngine:
+    """Dispatch table ของกฎ + hit counter ต่อกฎ"""
+
+    def __init__(self, spec: Optional[Dict[str, Any]] = None, source: str = "<defaults>"):
+        self.logger = logging.getLogger('ChatFilter')
+        self._lock = threading.Lock()
+        self.source = source
+        self.compile(spec or DEFAULT_RULES)
+
+    def compile(self, spec: Dict[str, Any]):
+        """Compile กฎเป็น dispatch table (hit counter ของกฎชื่อเดิมถูกเก็บไว้)"""
+        default = spec.get("default", ACTION_ALLOW)
+        if default not in FILTER_ACTIONS:
+            raise FilterRuleError(f"Unknown default action {default!r}")
+        rules = [FilterRule(index, rule_spec) for index, rule_spec in enumerate(spec.get("rules") or ())]
+
+        # ChatType -> กฎ chat_type-only ตัวแรกที่ตรง
+        direct: Dict[int, FilterRule] = {}
+        for rule in rules:
+            if rule.chat_type_only:
+                for chat_type in rule.chat_types:
+                    direct.setdefault(chat_type, rule)
+
+        with self._lock:
+            previous_hits = {rule.name: rule.hits for rule in getattr(self, 'rules', ())}
+            for rule in rules:
+                rule.hits = previous_hits.get(rule.name, 0)
+            self.rules = rules
+            self.default_allow = default == ACTION_ALLOW
+            self._direct = direct
+            self._conditional = [rule for rule in rules if not rule.chat_type_only]
+            self._plans: Dict[int, Tuple[Tuple[FilterRule, ...], Optional[FilterRule]]] = {}
+            self.default_hits = getattr(self, 'default_hits', 0)
+
+    def _plan(self, chat_type: int):
+        """กฎที่ต้องตรวจสำหรับ ChatType นี้: (กฎที่มีเงื่อนไขซึ่งมาก่อนกฎ direct, กฎ direct)"""
+        plan = self._plans.get(chat_type)
+        if plan is None:
+            direct = self._direct.get(chat_type)
+            limit = direct.index if direct is not None else len(self.rules)
+            conditional = tuple(
+                rule for rule in self._conditional
+                if rule.index < limit and (rule.chat_types is None or chat_type in rule.chat_types)
+            )
+            plan = self._plans[chat_type] = (conditional, direct)
+        return plan
+
+    def evaluate(self, message_data: TextHookData) -> Optional[FilterRule]:
+        """คืนกฎที่ตัดสินข้อความนี้ (None = ใช้ค่า default) และนับ hit"""
+        conditional, direct = self._plan(message_data.chat_type)
+        for rule in conditional:
+            if rule.matches_rest(message_data):
+                rule.hits += 1
+                return rule
+        if direct is not None:
+            direct.hits += 1
+            return direct
+        self.default_hits += 1
+        return None
+
+    def should_translate(self, message_data: TextHookData) -> bool:
+        rule = self.evaluate(message_data)
+        return self.default_allow if rule is None else rule.allow
+
+    def reset_stats(self):
+        with self._lock:
+            for rule in self.rules:
+                rule.hits = 0
+            self.default_hits = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit ต่อกฎ เรียงจากมากไปน้อย - 'blocked' คือจำนวน API call ที่ประหยัดได้"""
+        with self._lock:
+            rules = [
+                {'name': rule.name, 'action': rule.action, 'hits': rule.hits}
+                for rule in sorted(self.rules, key=lambda r: r.hits, reverse=True)
+            ]
+            default_hits = self.default_hits
+            default_action = ACTION_ALLOW if self.default_allow else ACTION_BLOCK
+        return {
+            'source': self.source,
+            'rules': rules,
+            'default': {'action': default_action, 'hits': default_hits},
+            'blocked': sum(rule['hits'] for rule in rules if rule['action'] == ACTION_BLOCK)
+                       + (default_hits if default_action == ACTION_BLOCK else 0),
+        }
+
+
+class ChatFilter:
+    """Engine ที่ผูกกับไฟล์กฎ - โหลดใหม่อัตโนมัติเมื่อไฟล์เปลี่ยน"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.logger = logging.getLogger('ChatFilter')
+        self.engine = ChatFilterEngine()
+        self.configure(config)
+
+    def configure(self, config: Optional[Dict[str, Any]] = None):
+        config = {**DEFAULT_FILTER_CONFIG, **(config or {})}
+        self.rules_path = config["rules_path"]
+        self.auto_reload = bool(config["auto_reload"])
+        self.reload_check_s = float(config["reload_check_s"])
+        self._mtime = None
+        self._next_check = 0.0
+        self.reload()
+
+    def reload(self) -> bool:
+        """โหลดกฎจากไฟล์ (เขียนกฎเริ่มต้นถ้ายังไม่มีไฟล์) - กฎเดิมยังใช้ต่อถ้าไฟล์ผิดรูปแบบ"""
+        path = self.rules_path
+        try:
+            if not os.path.exists(path):
+                self._write_defaults(path)
+            with open(path, "r", encoding="utf-8") as f:
+                spec = json.load(f)
+            self._mtime = os.path.getmtime(path)
+            self.engine.compile(spec)
+            self.engine.source = path
+            self.logger.info(f"Loaded {len(self.engine.rules)} chat filter rules from {path}")
+            return True
+        except (OSError, ValueError, TypeError) as e:
+            self.logger.error(f"Cannot load chat filter rules from {path}: {e} - keeping current rules")
+            return False
+
+    def _write_defaults(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(DEFAULT_RULES, f, ensure_ascii=False, indent=2)
+        self.logger.info(f"Wrote default chat filter rules to {path}")
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_check_s
+        try:
+            mtime = os.path.getmtime(self.rules_path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def should_translate(self, message_data: TextHookData) -> bool:
+        if self.auto_reload:
+            self._reload_if_changed()
+        return self.engine.should_translate(message_data)
+
+    def reset_stats(self):
+        self.engine.reset_stats()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.engine.get_stats()
+
+
+_filter: Optional[ChatFilter] = None
+
+
+def get_chat_filter() -> ChatFilter:
+    """Filter ที่ใช้ร่วมกันทั้ง threaded และ asyncio handler (สร้างจากค่าเริ่มต้นถ้ายังไม่ configure)"""
+    global _filter
+    if _filter is None:
+        _filter = ChatFilter()
+    return _filter
+
+
+def configure_chat_filter(config: Optional[Dict[str, Any]] = None) -> ChatFilter:
+    """ตั้งค่า filter จาก setting 'dalamud_filter'"""
+    global _filter
+    if _filter is None:
+        _filter = ChatFilter(config)
+    else:
+        _filter.configure(config)
+    return _filter
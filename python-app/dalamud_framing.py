@@ -0,0 +1,173 @@
+"""
+MBB Dalamud Framing - แยกข้อความจาก byte stream ของ DalamudBridge
+Zero-copy framed reader: bytearray + offset scanning แทนการต่อ bytes และ split ทีละบรรทัด
+
+โหมดที่รองรับ:
+    newline          - JSON หนึ่งบรรทัดต่อข้อความ (WriteLineAsync ของ Dalamud plugin)
+    length_prefixed  - 4-byte little-endian length ตามด้วย payload UTF-8
+"""
+
+import struct
+import logging
+from typing import List
+
+FRAMING_NEWLINE = "newline"
+FRAMING_LENGTH_PREFIXED = "length_prefixed"
+FRAMING_MODES = (FRAMING_NEWLINE, FRAMING_LENGTH_PREFIXED)
+
+LENGTH_PREFIX = struct.Struct("<I")
+
+DEFAULT_MAX_FRAME_SIZE = 1 << 20  # 1 MB - ป้องกัน buffer โตไม่สิ้นสุดถ้า stream เสีย
+COMPACT_THRESHOLD = 64 * 1024  # ย้ายข้อมูลที่เหลือไปต้น buffer เมื่อ offset เกินค่านี้
+
+
+def encode_frame(text: str, mode: str = FRAMING_NEWLINE) -> bytes:
+    """เข้ารหัสข้อความหนึ่งข้อความตาม framing mode (ใช้ฝั่งส่ง/ทดสอบ)"""
+    payload = text.encode("utf-8")
+    if mode == FRAMING_LENGTH_PREFIXED:
+        return LENGTH_PREFIX.pack(len(payload)) + payload
+    return payload + b"\n"
+
+
+def _decode(view: memoryview) -> str:
+    # str() อ่านจาก memoryview ได้โดยตรง - ไม่ต้องสร้าง bytes ชั่วคราวต่อบรรทัด
+    try:
+        return str(view, "utf-8-sig")  # Auto removes BOM
+    except UnicodeDecodeError:
+        return str(view, "utf-8", "ignore")
+
+
+class FramedReader:
+    """
+    Incremental frame parser สำหรับ stream จาก transport
+
+    - ข้อมูลใหม่ต่อท้าย bytearray เดียว (amortized O(1))
+    - ค้นหา delimiter จาก offset ที่สแกนล่าสุด ไม่สแกนซ้ำข้อมูลเดิม
+    - decode จาก memoryview slice โดยตรง
+    - compact buffer เมื่อ offset เกินครึ่งหนึ่งของ buffer เท่านั้น
+
+    รวมแล้ว burst หลายร้อยข้อความใช้เวลาเชิงเส้นตามจำนวน byte
+    """
+
+    def __init__(self, mode: str = FRAMING_NEWLINE, max_frame_size: int = DEFAULT_MAX_FRAME_SIZE):
+        if mode not in FRAMING_MODES:
+            raise ValueError(f"Unknown framing mode: {mode}")
+        self.mode = mode
+        self.max_frame_size = max_frame_size
+        self.logger = logging.getLogger("FramedReader")
+
+        self._buffer = bytearray()
+        self._start = 0  # offset ของ frame ถัดไปที่ยังไม่ได้อ่าน
+        self._scan_pos = 0  # offset ที่สแกนหา newline ไปแล้ว
+
+        self.stats = {
+            "frames": 0,
+            "bytes_fed": 0,
+            "compactions": 0,
+            "oversized_frames": 0,
+            "max_buffered_bytes": 0,
+        }
+
+    def feed(self, data) -> List[str]:
+        """เพิ่มข้อมูลจาก transport และคืนรายการข้อความที่สมบูรณ์"""
+        if not data:
+            return []
+
+        self._buffer += data
+        self.stats["bytes_fed"] += len(data)
+        if len(self._buffer) > self.stats["max_buffered_bytes"]:
+            self.stats["max_buffered_bytes"] = len(self._buffer)
+
+        if self.mode == FRAMING_LENGTH_PREFIXED:
+            frames = self._parse_length_prefixed()
+        else:
+            frames = self._parse_newline()
+
+        self._compact()
+        return frames
+
+    def reset(self):
+        """ล้าง buffer (เรียกเมื่อเชื่อมต่อใหม่)"""
+        self._buffer.clear()
+        self._start = 0
+        self._scan_pos = 0
+
+    @property
+    def buffered_bytes(self) -> int:
+        return len(self._buffer) - self._start
+
+    def _parse_newline(self) -> List[str]:
+        frames = []
+        buf = self._buffer
+        start = self._start
+        find = buf.find
+
+        with memoryview(buf) as view:
+            idx = find(b"\n", max(start, self._scan_pos))
+            while idx >= 0:
+                if idx > start:
+                    text = _decode(view[start:idx])
+                    if text.strip():
+                        frames.append(text)
+                start = idx + 1
+                idx = find(b"\n", start)
+
+        self._start = start
+        self._scan_pos = len(buf)
+
+        if self.buffered_bytes > self.max_frame_size:
+            self._drop_oversized()
+
+        self.stats["frames"] += len(frames)
+        return frames
+
+    def _parse_length_prefixed(self) -> List[str]:
+        frames = []
+        buf = self._buffer
+        start = self._start
+        end = len(buf)
+        header = LENGTH_PREFIX.size
+
+        with memoryview(buf) as view:
+            while end - start >= header:
+                (length,) = LENGTH_PREFIX.unpack_from(buf, start)
+                if length > self.max_frame_size:
+                    break
+                frame_end = start + header + length
+                if frame_end > end:
+                    break
+                if length:
+                    text = _decode(view[start + header:frame_end])
+                    if text.strip():
+                        frames.append(text)
+                start = frame_end
+
+        self._start = start
+
+        if end - start >= header and LENGTH_PREFIX.unpack_from(buf, start)[0] > self.max_frame_size:
+            self._drop_oversized()
+
+        self.stats["frames"] += len(frames)
+        return frames
+
+    def _drop_oversized(self):
+        """ทิ้งข้อมูลค้างเมื่อ frame ใหญ่เกินกำหนด (stream เสียหรือไม่มี delimiter)"""
+        self.stats["oversized_frames"] += 1
+        self.logger.warning(
+            f"Dropping {self.buffered_bytes} buffered bytes - frame exceeds {self.max_frame_size} bytes"
+        )
+        self.reset()
+
+    def _compact(self):
+        buffered = len(self._buffer)
+        start = self._start
+        if start == 0:
+            return
+        if start == buffered:
+            # อ่านครบทุก frame - ล้างโดยไม่ต้องคัดลอก
+            self.reset()
+        elif start >= COMPACT_THRESHOLD and start * 2 >= buffered:
+            del self._buffer[:start]
+            self._scan_pos -= start
+            self._start = 0
+            self.stats["compactions"] += 1
@@ -8,99 +8,80 @@ from typing import Dict, Any, Optional
 import time
 import threading
 
-# Text Hook Filtering - Block unnecessary messages
-BLOCKED_CHAT_TYPES = {
-    # 🔥 CRITICAL FIX: Real ChatTypes from actual game logs
-    2092,   # Player actions (You use a bowl of mesquite soup)
-    2857,   # Combat damage (You hit Necron for X damage)
-    12457,  # Enemy damage (Necron hits you for X damage)
-    4139,   # Ability casting (Krile begins casting, uses abilities)
-    4777,   # Damage taken (Necron takes X damage)
-    2729,   # Critical hits (Critical! You hit X for Y damage)
-    4398,   # Status gained (gains the effect of)
-    4400,   # Status lost (loses the effect of)
-    4269,   # HP recovery (You recover X HP)
-
-    # 🆕 v1.4.8.1 ADDITIONS: Equipment and System Messages
-    # 71 REMOVED - CONTAINS CUTSCENE TEXT! ("Or was it a gift─the terminal's parting miracle?")
-    2105,   # Equipment unequip messages (Ceremonial bangle of aiming unequipped) - RE-ADDED AFTER VERIFICATION
-
-    # v1.4.8.4 ADDITIONS: Combat Text Filtering
-    2221,   # HP absorption messages (You absorb 3711 HP)
-    2735,   # Status effect messages (The asterodia suffers the effect of Stun)
-    10283,  # Spell casting/interruption messages (The asterodia's Bombination is interrupted)
-    2874,   # Combat victory messages (You defeat the asterodia)
-
-    # v1.4.8.5 ADDITIONS: Job/Gear Change Messages
-    57,     # Gear/job change messages (Gear recommended for a viper equipped)
-
-    # v1.4.8.6 ADDITIONS: NPC/Monster Casting Messages
-    12331,  # NPC/Monster spell casting (The asterodia begins casting Bombination)
-
-    # v1.4.8.7 ADDITIONS: Hunt/Party Messages
-    11,     # Hunt board notifications and party status messages
-
-    # v1.4.8.9 ADDITIONS: Combat Zone Filtering (from live testing)
-    9001,   # Combat damage messages (The striking dummy takes X damage, Critical!)
-    10929,  # Status recovery messages (recovers from the effect of)
-    29,     # Other player actions/emotes (gives enthusiastic Lali-ho!)
-
-    # v1.4.10.1 ADDITIONS: Additional Combat Zone Filtering
-    9002,   # Combat immunity messages (The striking dummy is unaffected)
-    9007,   # Status effect application (suffers the effect of)
-    13105,  # Status effect recovery (recovers from the effect of)
-
-    # Legacy combat types (keep for safety)
-    2091, 2110, 2218, 2219, 2220, 2222, 2224, 2233, 2235, 2240, 2241, 2242,
-    2265, 2266, 2267, 2283, 2284, 2285, 2317, 2318, 2730, 2731, 3001,
-    8235, 8745, 8746, 8747, 8748, 8749, 8750, 8752, 8754,
-    10409, 10410, 10411, 10412, 10413
-}
-
-ALLOWED_CHAT_TYPES = {
-    61,     # Dialogue
-    0x0047,  # Cutscene text (TalkSubtitle addon) - decimal: 71
-}
-
-def should_translate_message(message_data):
+from dalamud_message import TextHookData
+from dalamud_workers import TranslationWorkerPool, DEFAULT_WORKER_CONFIG
+from dalamud_ingress import PRIORITY_NAMES, PRIORITY_OTHER, PRIORITY_STORY, message_priority
+from model_router import CLASS_CUTSCENE, message_class_scope
+from dalamud_filters import get_chat_filter
+from dalamud_dedup import create_duplicate_index
+from translation_store import stable_cache_key
+from translation_cache import REGION_TRANSLATIONS, TieredTranslationCache, get_translation_cache
+from gemini_hedge import hedge_cache_key, served_model_scope
+from dalamud_trace import (
+    get_tracer, activate as activate_trace, deactivate as deactivate_trace,
+    STAGE_FILTERED, STAGE_TK_DISPATCHED, STAGE_FIRST_PARTIAL,
+)
+from translation_stream import activate as activate_partial_sink, deactivate as deactivate_partial_sink
+from dalamud_events import (
+    MessageBus, TOPIC_RAW_RECEIVED, TOPIC_FILTERED, TOPIC_TRANSLATED, TOPIC_DISPLAYED,
+    RawReceivedEvent, FilteredEvent, TranslatedEvent, DisplayedEvent,
+)
+
+CUTSCENE_CHAT_TYPE = 0x0047
+
+# Display modes: dialogue = latest-wins, cutscene = แปลพร้อมกันแต่แสดงตามลำดับที่รับเข้ามา
+MODE_LATEST_WINS = "latest_wins"
+MODE_ORDERED = "ordered"
+
+
+def is_ordered_message(message_data: TextHookData) -> bool:
+    """Cutscene subtitle ต้องแสดงตามลำดับ (บรรทัด N+1 ห้ามขึ้นก่อนบรรทัด N)"""
+    return message_data.type == 'cutscene' or message_data.chat_type == CUTSCENE_CHAT_TYPE
+
+
+def message_route_class(message_data: TextHookData) -> str:
+    """ประเภทข้อความสำหรับ model router: cutscene / story / choice / battle / other"""
+    if is_ordered_message(message_data):
+        return CLASS_CUTSCENE
+    return PRIORITY_NAMES[message_priority(message_data)]
+
+def should_translate_message(message_data: TextHookData):
     """
     Determine if a message should be translated based on ChatType filtering
-    ตัดสินใจว่าข้อความควรถูกแปลหรือไม่ตาม ChatType
+    ตัดสินใจว่าข้อความควรถูกแปลหรือไม่ตามกฎใน dalamud_filters (ChatType, Type, speaker, regex)
     """
-    chat_type = message_data.get('ChatType', 0)
-
-    # ข้อความที่ห้ามแปล - Block immediately
-    if chat_type in BLOCKED_CHAT_TYPES:
-        return False
-
-    # ข้อความที่อนุญาต - Allow dialogue
-    if chat_type in ALLOWED_CHAT_TYPES:
-        return True
-
-    # ตรวจสอบเพิ่มเติมสำหรับ cutscene (จำเป็นต้องเก็บไว้)
-    if message_data.get('Type') == 'cutscene':
-        return True
-
-    # Default: Allow other message types that aren't explicitly blocked
-    return True
+    return get_chat_filter().should_translate(message_data)
 
 
 class DalamudImmediateHandler:
-    def __init__(self, translator=None, ui_updater=None, main_app=None):
+    def __init__(self, translator=None, ui_updater=None, main_app=None, bus: Optional[MessageBus] = None,
+                 concurrency: int = DEFAULT_WORKER_CONFIG["concurrency"],
+                 queue_size: int = DEFAULT_WORKER_CONFIG["queue_size"], latest_wins: bool = True,
+                 ordered_cutscenes: bool = True, reorder_window: int = 8,
+                 translation_cache: Optional[TieredTranslationCache] = None,
+                 scheduler: Optional[Dict[str, Any]] = None, dedup: Optional[Dict[str, Any]] = None,
+                 streaming: bool = True):
         self.translator = translator
         self.ui_updater = ui_updater
         self.main_app = main_app  # 🔧 Reference to main app for force translate
         self.main_app_ref = main_app  # 🔧 CRITICAL FIX: Also store as main_app_ref for compatibility
         self.translated_logs = None  # เพิ่มการเก็บ reference ไปที่ translated_logs
+        self._translated_logs_subscription = None
+
+        # Sinks (history, TUI auto-show, status line, logs) subscribe ที่ bus นี้ - handler แค่ publish
+        self.bus = bus or MessageBus()
 
 
         # Control flags
         self.is_running = False
         self.is_translating = False
 
-        # Translation cache for speed
-        self.translation_cache = {}
-        self.cache_max_size = 100
+        # Translation cache for speed - cache กลาง (LRU memory + disk) region "translations", key เป็น stable digest
+        self.translation_cache = translation_cache or get_translation_cache()
+        self.last_cache_key = None
+
+        # บรรทัดเดียวกันจากหลาย hook ของ plugin ภายใน window สั้นๆ ถูกตัดทิ้งก่อนถึง cache/API
+        self.dedup = create_duplicate_index(dedup)
 
         # Store original text for force translate
         self.last_original_text = None  # Store last original text
@@ -110,13 +91,49 @@ class DalamudImmediateHandler:
         self.current_translation_thread = None
         self.translating_messages = set()  # Track messages being translated
 
+        # Worker threads ขนาดคงที่ (สร้างเมื่อมีงานแรก) แทน thread ต่อข้อความ
+        # คิวจัดลำดับตาม message class: dialogue/cutscene > choice > battle > other
+        self.worker_pool = TranslationWorkerPool(concurrency, queue_size, scheduler=scheduler)
+
+        # Latest-wins: ทุกข้อความที่ผ่าน filter ได้ sequence เพิ่มขึ้นเรื่อยๆ
+        # งานแปลที่ sequence เก่ากว่าข้อความล่าสุดที่ class เท่ากันหรือสูงกว่าจะถูกยกเลิกก่อนเรียก API
+        # หรือไม่ถูกแสดง (ข้อความระบบที่ใหม่กว่าไม่ทำให้บทพูดที่กำลังแปลถูกทิ้ง)
+        self.latest_wins = latest_wins
+        self._sequence_lock = threading.Lock()
+        self._latest_sequence = 0
+        self._latest_by_priority = {priority: 0 for priority in PRIORITY_NAMES}
+        self._job_sequence = {}  # cache_key -> (sequence, priority) ล่าสุดที่รอคำแปลนี้
+        self._display_lock = threading.RLock()
+
+        # Ordered mode (cutscene): แต่ละบรรทัดได้ slot ตามลำดับที่รับ ผลที่เสร็จก่อนรอใน reorder buffer
+        # ถ้ามีบรรทัดรอเกิน reorder_window บรรทัดหัวคิวที่ช้าจะถูกข้ามเพื่อไม่ให้ค้าง
+        self.ordered_cutscenes = ordered_cutscenes
+        self.reorder_window = max(1, int(reorder_window))
+        self._next_order_slot = 0
+        self._next_display_slot = 0
+        self._reorder_buffer = {}  # slot -> (message_text, message_data, translated_text, from_cache) หรือ None = ข้าม
+
+        # Streaming: บทพูด/cutscene แสดงทีละประโยคระหว่างที่ model ยังแปลไม่จบ
+        # (ต้องมี ui_updater.partial และ translator ที่รองรับ translation_stream)
+        self.streaming = streaming
+
         # Statistics
         self.stats = {
             'messages_received': 0,
             'messages_translated': 0,
             'cache_hits': 0,
             'immediate_displays': 0,
-            'errors': 0
+            'errors': 0,
+            'duplicates_suppressed': 0,   # บรรทัดซ้ำจาก hook อื่น - ไม่เสียค่า API ซ้ำ
+            'api_time_total_ms': 0.0,
+            'api_time_max_ms': 0.0,
+            'api_calls_saved': 0,   # งานที่ถูก supersede ก่อนถึง API
+            'jobs_dropped': 0,   # งานที่ถูกทิ้งโดยยังไม่มีข้อความใหม่กว่า (คิวเต็ม / หมดอายุ / slot cutscene)
+            'stale_discarded': 0,   # คำแปลที่เสร็จหลังข้อความใหม่กว่า - ไม่แสดง
+            'ordered_displayed': 0,
+            'ordered_skipped': 0,   # slot ที่ถูกข้าม (แปลไม่สำเร็จ / ถูกทิ้ง / ช้าเกิน reorder_window)
+            'reorder_max_depth': 0,
+            'partial_displays': 0,   # คำแปลบางส่วน (streaming) ที่ขึ้น TUI
         }
 
         # Logger
@@ -134,6 +151,7 @@ class DalamudImmediateHandler:
         """Stop the handler"""
         self.is_running = False
         self.is_translating = False
+        self.worker_pool.clear()  # งานที่ยังไม่เริ่มจะไม่ถูกแสดงอยู่แล้ว
         self.logger.info("Dalamud IMMEDIATE Handler stopped")
 
     def set_translation_active(self, active: bool):
@@ -154,179 +172,436 @@ class DalamudImmediateHandler:
     def set_translated_logs(self, translated_logs):
         """Set the translated logs instance for history logging"""
         self.translated_logs = translated_logs
+        self.bus.unsubscribe(self._translated_logs_subscription)
+        self._translated_logs_subscription = None
+        if translated_logs is not None and hasattr(translated_logs, 'add_message'):
+            # *** TEXT HOOK INTEGRATION: translated_logs รับคำแปลผ่าน bus (คิวของตัวเอง ไม่หน่วง TUI) ***
+            self._translated_logs_subscription = self.bus.subscribe(
+                TOPIC_DISPLAYED, lambda event: translated_logs.add_message(event.translated_text),
+                name="translated_logs",
+            )
         self.logger.info("Translated logs instance set")
 
-    def process_message(self, message_data: Dict[str, Any]):
+    def process_message(self, message_data: TextHookData):
         """
         Process message with IMMEDIATE display
         แสดงคำแปลทันทีเมื่อได้รับข้อความ
         """
-        # Input validation - ensure message_data is a dict
-        if not isinstance(message_data, dict):
-            self.logger.error(f"[SECURITY] Invalid message_data type: {type(message_data)}")
-            return
-
         try:
-            # 🚫 TEXT HOOK FILTERING: Check if message should be translated
-            chat_type = message_data.get('ChatType', 0)
-            self.logger.info(f"[DEBUG FILTER] Checking ChatType {chat_type}")
-
-            if not should_translate_message(message_data):
-                self.logger.info(f"[FILTERED] ChatType {chat_type} blocked - not translating")
-                return
-
-            # Create message text with input sanitization
-            speaker = str(message_data.get('Speaker', '')).strip()[:100]  # Limit speaker name length
-            message = str(message_data.get('Message', '')).strip()[:5000]  # Limit message length
-            message_text = f"{speaker}: {message}" if speaker else message
-
-            if not message_text.strip():
-                return
-
-            # IMPORTANT: Store original text and data BEFORE checking translation state
-            # This ensures force translate always has text to work with
-            self.last_original_text = message_text
-            self.last_message_data = message_data
-
-            # 📝 ORIGINAL TEXT DISPLAY: Send original text to MBB for status display
-            if hasattr(self, 'main_app_ref') and self.main_app_ref:
-                try:
-                    # Update original text display on status line
-                    self.main_app_ref.update_original_text_display(message_text)
-                except Exception:
-                    pass  # Silently ignore errors to avoid breaking translation flow
-
-            # Force translate functionality has been removed - replaced by previous dialog system
-
-            # Now check if we should process for translation
-            if not self.is_running or not self.is_translating:
+            prepared = self._prepare_message(message_data)
+            if prepared is None:
                 return
+            message_text, cache_key = prepared
+            priority = message_priority(message_data)
+            sequence = self._claim_sequence(priority)
 
-            if not self.translator or not self.ui_updater:
+            if self.ordered_cutscenes and is_ordered_message(message_data):
+                self._process_ordered(message_text, cache_key, message_data)
                 return
 
-            self.stats['messages_received'] += 1
-            cache_key = hash(message_text)
-
-            self.logger.info(f"[รับข้อความ] #{self.stats['messages_received']}: {message_text[:50]}...")
-
             # Check cache first - if found, show IMMEDIATELY
-            if cache_key in self.translation_cache:
-                self.logger.info(f"[CACHE HIT] แสดงคำแปลจาก cache ทันที!")
-                self.stats['cache_hits'] += 1
-                self._show_immediately(self.translation_cache[cache_key])
+            if self._show_cached(cache_key, message_text, message_data):
                 return
 
-            # Check if already translating this message
+            # Check if already translating this message - งานที่กำลังแปลรับ sequence ใหม่แทน
             if cache_key in self.translating_messages:
+                self._job_sequence[cache_key] = (sequence, priority)
                 self.logger.info(f"[กำลังแปล] ข้อความนี้กำลังแปลอยู่")
                 return
 
             # Start immediate translation
             self.logger.info(f"[เริ่มแปล] เริ่มแปลข้อความใหม่...")
             self.translating_messages.add(cache_key)
+            self._job_sequence[cache_key] = (sequence, priority)
 
             def translate_and_show_immediately():
                 try:
-                    start_time = time.time()
-
-                    # Update status to show TRANSLATING
-                    if hasattr(self, 'main_app_ref') and self.main_app_ref:
-                        try:
-                            # Set temporary translating state for UI
-                            self.main_app_ref._translating_in_progress = True
-                            self.main_app_ref.root.after(0, self.main_app_ref.update_info_label_with_model_color)
-                        except Exception:
-                            pass
-
-                    # Translate
-                    translated_text = self.translator.translate(message_text)
-
-                    translation_time = time.time() - start_time
-                    self.logger.info(f"[แปลเสร็จ] ใช้เวลา {translation_time:.2f}s: {translated_text[:50]}...")
-
-                    # Cache result
-                    self.translation_cache[cache_key] = translated_text
-                    if len(self.translation_cache) > self.cache_max_size:
-                        first_key = next(iter(self.translation_cache))
-                        del self.translation_cache[first_key]
-
-                    self.stats['messages_translated'] += 1
-
-                    # CRITICAL: Show IMMEDIATELY if still translating
-                    if self.is_translating and self.is_running:
-                        self.logger.info(f"[แสดงทันที] แสดงคำแปลทันที!")
-                        self._show_immediately(translated_text)
-
-                        # *** ADD TO HISTORY: เพิ่มข้อความแปลจริงลงใน history สำหรับ Previous Dialog ***
-                        if hasattr(self, 'main_app_ref') and self.main_app_ref:
-                            try:
-                                if hasattr(self.main_app_ref, 'add_to_dialog_history'):
-                                    # Extract speaker and message from original
-                                    speaker = message_data.get('Speaker', 'Unknown')
-                                    self.main_app_ref.add_to_dialog_history(
-                                        original_text=message_text,
-                                        translated_text=translated_text,
-                                        speaker=speaker,
-                                        chat_type=message_data.get('ChatType')
-                                    )
-                                    self.logger.info(f"📄 [REAL HISTORY] Added real translation for '{speaker}'")
-                            except Exception as e:
-                                self.logger.error(f"❌ [REAL HISTORY] Error adding to history: {e}")
-
-                        # TUI AUTO-SHOW: Trigger directly after successful translation
-                        if hasattr(self, 'main_app_ref') and self.main_app_ref:
-                            try:
-                                if hasattr(self.main_app_ref, '_trigger_tui_auto_show'):
-                                    self.main_app_ref._trigger_tui_auto_show()
-                            except Exception:
-                                pass
-
-                        # 🔧 FORCE STATUS UPDATE: Update main UI status back to READY
-                        if hasattr(self, 'main_app_ref') and self.main_app_ref:
-                            try:
-                                # Clear translating state
-                                self.main_app_ref._translating_in_progress = False
-                                self.main_app_ref.root.after(0, self.main_app_ref.update_info_label_with_model_color)
-                            except:
-                                pass  # Fail silently if main app not available
-                    else:
-                        self.logger.warning(f"[ไม่แสดง] ระบบปิดแล้ว")
-
+                    if self._is_superseded(cache_key):
+                        self.stats['api_calls_saved'] += 1
+                        self.logger.info(f"[SUPERSEDED] ข้ามการแปล - มีข้อความใหม่กว่าแล้ว")
+                        return
+                    translated_text = self._translate_message(message_text, cache_key, message_data.trace,
+                                                              self._partial_sink(cache_key, message_data),
+                                                              message_route_class(message_data))
+                    self._deliver_if_current(cache_key, message_text, message_data, translated_text)
                 except Exception as e:
                     self.stats['errors'] += 1
                     self.logger.error(f"Translation error: {e}")
                 finally:
-                    # Clean up tracking
-                    self.translating_messages.discard(cache_key)
-
-                    # 🔧 ENSURE CLEANUP: Always clear translating status on completion
-                    if hasattr(self, 'main_app_ref') and self.main_app_ref:
-                        try:
-                            if hasattr(self.main_app_ref, '_translating_in_progress'):
-                                self.main_app_ref._translating_in_progress = False
-                                self.main_app_ref.root.after(0, self.main_app_ref.update_info_label_with_model_color)
-                        except:
-                            pass
-
-            # Start translation thread immediately
-            thread = threading.Thread(
-                target=translate_and_show_immediately,
-                daemon=True,
-                name=f"ImmediateTranslate-{time.time()}"
+                    self._finish_translation(cache_key)
+
+            # Latest-wins: งานที่ยังรอในคิวซึ่ง class ไม่สูงกว่าข้อความนี้เก่ากว่าทั้งหมด - ยกเลิกก่อนถึง API
+            if self.latest_wins:
+                self.worker_pool.clear(tag=MODE_LATEST_WINS, max_priority=priority)
+
+            # ส่งเข้า worker pool (ถ้าคิวเต็ม กฎ preemption เลือกงานที่ถูกทิ้งและ cleanup ผ่าน on_drop)
+            self.worker_pool.submit(
+                translate_and_show_immediately,
+                on_drop=lambda: self._cancel_translation(cache_key, self._is_superseded(cache_key)),
+                tag=MODE_LATEST_WINS,
+                priority=priority,
             )
-            thread.start()
 
         except Exception as e:
             self.stats['errors'] += 1
             self.logger.error(f"Error processing message: {e}")
 
-    def _show_immediately(self, text: str):
+    def _process_ordered(self, message_text: str, cache_key, message_data: TextHookData):
+        """Cutscene: แปลพร้อมกันใน worker pool แต่แสดงผลตามลำดับ slot"""
+        slot = self._reserve_order_slot()
+
+        cached = self._lookup_cached(cache_key)
+        if cached is not None:
+            self.logger.info(f"[CACHE HIT] cutscene slot #{slot}")
+            self.stats['cache_hits'] += 1
+            self._complete_order_slot(slot, (message_text, message_data, cached, True))
+            return
+
+        if cache_key in self.translating_messages:
+            # ข้อความเดียวกันกำลังแปลอยู่ใน slot ก่อนหน้า - ไม่ต้องแสดงซ้ำ
+            self._complete_order_slot(slot, None)
+            return
+
+        self.logger.info(f"[เริ่มแปล] cutscene slot #{slot}")
+        self.translating_messages.add(cache_key)
+
+        def translate_in_order():
+            result = None
+            try:
+                translated_text = self._translate_message(message_text, cache_key, message_data.trace,
+                                                          self._partial_sink(cache_key, message_data, slot),
+                                                          CLASS_CUTSCENE)
+                result = (message_text, message_data, translated_text, False)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.error(f"Translation error: {e}")
+            finally:
+                self._complete_order_slot(slot, result)
+                self._finish_translation(cache_key)
+
+        def drop_in_order():
+            self._complete_order_slot(slot, None)
+            self._cancel_translation(cache_key)
+
+        self.worker_pool.submit(translate_in_order, on_drop=drop_in_order, tag=MODE_ORDERED,
+                                priority=message_priority(message_data))
+
+    def _reserve_order_slot(self) -> int:
+        with self._display_lock:
+            slot = self._next_order_slot
+            self._next_order_slot += 1
+            return slot
+
+    def _complete_order_slot(self, slot: int, result):
+        """เก็บผลของ slot ลง reorder buffer แล้วแสดงทุก slot ที่ต่อเนื่องจากหัวคิว"""
+        with self._display_lock:
+            if slot < self._next_display_slot:
+                # slot นี้ถูกข้ามไปแล้วเพราะช้าเกิน reorder_window (คำแปลยังอยู่ใน cache)
+                self.stats['stale_discarded'] += 1
+                return
+
+            buffer = self._reorder_buffer
+            buffer[slot] = result
+            if len(buffer) > self.stats['reorder_max_depth']:
+                self.stats['reorder_max_depth'] = len(buffer)
+
+            while True:
+                while self._next_display_slot in buffer:
+                    self._display_ordered(buffer.pop(self._next_display_slot))
+                    self._next_display_slot += 1
+                if len(buffer) < self.reorder_window:
+                    break
+                # หัวคิวช้าเกินไป - ข้ามเพื่อให้บรรทัดถัดไปแสดงได้
+                self.logger.warning(f"[REORDER] skip slow cutscene slot #{self._next_display_slot}")
+                self.stats['ordered_skipped'] += 1
+                self._next_display_slot += 1
+
+    def _display_ordered(self, result):
+        if result is None:
+            self.stats['ordered_skipped'] += 1
+            return
+        message_text, message_data, translated_text, from_cache = result
+        if from_cache:
+            if self.is_translating and self.is_running:
+                self._show_immediately(translated_text, message_text, message_data, from_cache=True)
+        else:
+            self._deliver_translation(message_text, message_data, translated_text)
+        self.stats['ordered_displayed'] += 1
+
+    def _prepare_message(self, message_data: TextHookData):
+        """
+        Filter, sanitize and record the incoming message
+
+        Returns:
+            (message_text, cache_key) ถ้าควรแปล, None ถ้าไม่ต้องแปล
+        """
+        # Input validation - bridge ส่ง TextHookData ที่ decode แล้วเท่านั้น
+        if type(message_data) is not TextHookData:
+            self.logger.error(f"[SECURITY] Invalid message_data type: {type(message_data)}")
+            return None
+
+        bus = self.bus
+        if bus.has_subscribers(TOPIC_RAW_RECEIVED):
+            bus.publish(TOPIC_RAW_RECEIVED, RawReceivedEvent(message_data))
+
+        # 🚫 TEXT HOOK FILTERING: Check if message should be translated
+        chat_type = message_data.chat_type
+        self.logger.info(f"[DEBUG FILTER] Checking ChatType {chat_type}")
+
+        if not should_translate_message(message_data):
+            self.logger.info(f"[FILTERED] ChatType {chat_type} blocked - not translating")
+            return None
+
+        # Create message text with input sanitization
+        # (แปลงชนิดและ strip แล้วตอน decode - เหลือแค่จำกัดความยาว)
+        speaker = message_data.speaker[:100]  # Limit speaker name length
+        message = message_data.message[:5000]  # Limit message length
+        message_text = f"{speaker}: {message}" if speaker else message
+
+        if not message_text.strip():
+            return None
+
+        if self.dedup is not None and self.dedup.is_duplicate(message_data):
+            self.stats['duplicates_suppressed'] += 1
+            self.logger.info(f"[DUPLICATE] {message_data.type} ซ้ำกับบรรทัดที่เพิ่งได้รับ - ข้าม")
+            return None
+
+        cache_key = self._cache_key(message, speaker)
+
+        if message_data.trace is not None:
+            message_data.trace.mark(STAGE_FILTERED)
+
+        # IMPORTANT: Store original text and data BEFORE checking translation state
+        # This ensures force translate always has text to work with
+        self.last_original_text = message_text
+        self.last_message_data = message_data
+        self.last_cache_key = cache_key
+
+        # 📝 ORIGINAL TEXT DISPLAY: status line ฯลฯ subscribe topic นี้
+        bus.publish(TOPIC_FILTERED, FilteredEvent(message_data, message_text))
+
+        # Force translate functionality has been removed - replaced by previous dialog system
+
+        # Now check if we should process for translation
+        if not self.is_running or not self.is_translating:
+            return None
+
+        if not self.translator or not self.ui_updater:
+            return None
+
+        self.stats['messages_received'] += 1
+
+        self.logger.info(f"[รับข้อความ] #{self.stats['messages_received']}: {message_text[:50]}...")
+        return message_text, cache_key
+
+    def _show_cached(self, cache_key, message_text: Optional[str] = None,
+                     message_data: Optional[TextHookData] = None) -> bool:
+        """แสดงคำแปลจาก cache ทันทีถ้ามี"""
+        cached = self._lookup_cached(cache_key)
+        if cached is not None:
+            self.logger.info(f"[CACHE HIT] แสดงคำแปลจาก cache ทันที!")
+            self.stats['cache_hits'] += 1
+            with self._display_lock:
+                self._show_immediately(cached, message_text, message_data, from_cache=True)
+            return True
+        return False
+
+    def _translation_context(self):
+        """(model, role_mode, prompt_version, npc_data_version) ของ translator ปัจจุบัน - เป็นส่วนหนึ่งของ cache key"""
+        translator = self.translator
+        return (
+            getattr(translator, 'model_name', '') or '',
+            getattr(translator, 'current_role_mode', '') or '',
+            getattr(translator, 'PROMPT_VERSION', '') or '',
+            getattr(translator, 'npc_data_version', '') or '',
+        )
+
+    def _cache_key(self, message: str, speaker: str) -> str:
+        return stable_cache_key(message, speaker, *self._translation_context())
+
+    def _lookup_cached(self, cache_key) -> Optional[str]:
+        cached = self.translation_cache.get(REGION_TRANSLATIONS, cache_key)
+        if cached is None:
+            # คำแปลที่ model อื่นเคยตอบ (hedged request / model router) - เก็บแยก key ไว้
+            for model_name in getattr(self.translator, 'alternate_models', ()):
+                cached = self.translation_cache.get(REGION_TRANSLATIONS, hedge_cache_key(cache_key, model_name))
+                if cached is not None:
+                    break
+        return cached
+
+    def _claim_sequence(self, priority: int = PRIORITY_OTHER) -> int:
+        """ออก sequence ใหม่ให้ข้อความที่ผ่าน filter - กลายเป็นข้อความล่าสุดของ class นั้น"""
+        with self._sequence_lock:
+            self._latest_sequence += 1
+            self._latest_by_priority[priority] = self._latest_sequence
+            return self._latest_sequence
+
+    def _is_superseded(self, cache_key) -> bool:
+        """True ถ้ามีข้อความ class เท่ากันหรือสูงกว่าที่ใหม่กว่างานแปลนี้แล้ว (เฉพาะโหมด latest-wins)"""
+        if not self.latest_wins:
+            return False
+        sequence, priority = self._job_sequence.get(cache_key, (0, PRIORITY_OTHER))
+        newest = max(latest for level, latest in self._latest_by_priority.items() if level >= priority)
+        return sequence < newest
+
+    def _deliver_if_current(self, cache_key, message_text: str, message_data: TextHookData,
+                            translated_text: str) -> bool:
+        """แสดงคำแปลเฉพาะเมื่อยังไม่ถูก supersede (คำแปลยังอยู่ใน cache สำหรับครั้งหน้า)"""
+        with self._display_lock:
+            if self._is_superseded(cache_key):
+                self.stats['stale_discarded'] += 1
+                self.logger.info(f"[STALE] ไม่แสดงคำแปลเก่า - มีข้อความใหม่กว่าแสดงแล้ว")
+                return False
+            self._deliver_translation(message_text, message_data, translated_text)
+            return True
+
+    def _cancel_translation(self, cache_key, superseded: bool = False):
+        """
+        งานที่ถูกทิ้งจากคิวก่อนเรียก API
+        superseded = มีข้อความใหม่กว่าแล้ว (ประหยัด API จริง) - ไม่งั้นคือคำแปลที่หายไปจาก preemption / age-out
+        """
+        self.stats['api_calls_saved' if superseded else 'jobs_dropped'] += 1
+        self._finish_translation(cache_key)
+
+    def _translate_message(self, message_text: str, cache_key, trace=None, partial=None,
+                           message_class: Optional[str] = None) -> str:
+        """
+        เรียก translator และเก็บผลลง cache (ทำงานนอก UI thread) - partial รับคำแปลบางส่วนถ้า stream
+        message_class ให้ model router เลือก model ตามประเภทข้อความ
+        """
+        start_time = time.time()
+
+        # Update status to show TRANSLATING
+        if hasattr(self, 'main_app_ref') and self.main_app_ref:
+            try:
+                # Set temporary translating state for UI
+                self.main_app_ref._translating_in_progress = True
+                self.main_app_ref.root.after(0, self.main_app_ref.update_info_label_with_model_color)
+            except Exception:
+                pass
+
+        # Translate (translator mark stage ย่อยให้ trace ที่ active ใน thread นี้)
+        token = activate_trace(trace)
+        partial_token = activate_partial_sink(partial)
+        try:
+            with served_model_scope() as served, message_class_scope(message_class):
+                translated_text = self.translator.translate(message_text)
+        finally:
+            deactivate_partial_sink(partial_token)
+            deactivate_trace(token)
+
+        translation_time = time.time() - start_time
+        self.logger.info(f"[แปลเสร็จ] ใช้เวลา {translation_time:.2f}s: {translated_text[:50]}...")
+        self._record_api_time(translation_time * 1000.0)
+
+        self._store_translation(cache_key, translated_text, served.model)
+        return translated_text
+
+    def _partial_sink(self, cache_key, message_data: TextHookData, slot: Optional[int] = None):
+        """
+        Callback สำหรับคำแปลบางส่วนของข้อความนี้ - None ถ้าไม่ stream
+        stream เฉพาะบทพูด/cutscene (บรรทัดยาวที่รอนานที่สุด) ข้อความอื่นสั้นพอจะรอคำแปลเต็ม
+        """
+        if not self.streaming or message_priority(message_data) != PRIORITY_STORY:
+            return None
+        if getattr(self.ui_updater, 'partial', None) is None:
+            return None
+        return lambda text: self._emit_partial(cache_key, message_data, slot, text)
+
+    def _emit_partial(self, cache_key, message_data: TextHookData, slot: Optional[int], text: str):
+        """ถูกเรียกจาก thread ที่แปล - โหมด threaded แสดงทันทีแบบเดียวกับ _show_immediately"""
+        self._show_partial(cache_key, message_data, slot, text)
+
+    def _show_partial(self, cache_key, message_data: TextHookData, slot: Optional[int], text: str):
+        """
+        แสดงคำแปลบางส่วนถ้าข้อความนี้ยังเป็นข้อความที่ควรอยู่บนจอ
+        latest-wins: ต้องยังไม่ถูก supersede, ordered: ต้องเป็น slot หัวคิว (บรรทัดก่อนหน้าแสดงแล้ว)
+        คำแปลเต็มตามมาทาง _deliver_translation เสมอ - TUI พิมพ์ต่อจากส่วนที่ตรงกัน
+        """
+        with self._display_lock:
+            if not (self.is_translating and self.is_running):
+                return
+            if slot is None:
+                if self._is_superseded(cache_key):
+                    return
+            elif slot != self._next_display_slot:
+                return
+            try:
+                self.ui_updater.partial(text)
+                self.stats['partial_displays'] += 1
+                if message_data.trace is not None:
+                    message_data.trace.mark(STAGE_FIRST_PARTIAL)
+            except Exception as e:
+                self.logger.error(f"[UI ERROR] ไม่สามารถแสดงคำแปลบางส่วน: {e}")
+
+    def _record_api_time(self, elapsed_ms: float):
+        self.stats['api_time_total_ms'] += elapsed_ms
+        if elapsed_ms > self.stats['api_time_max_ms']:
+            self.stats['api_time_max_ms'] = elapsed_ms
+
+    def _store_translation(self, cache_key, translated_text: str, served_model: Optional[str] = None):
+        """Cache result - ผลจาก model สำรอง (hedged request) เก็บด้วย key ของ model นั้น"""
+        model, role_mode, _, _ = self._translation_context()
+        if served_model:
+            cache_key, model = hedge_cache_key(cache_key, served_model), served_model
+        # ไม่เก็บข้อความ error ของ translator ลงดิสก์
+        self.translation_cache.put(REGION_TRANSLATIONS, cache_key, translated_text,
+                                   persist=not translated_text.startswith("[Error"),
+                                   model=model, role_mode=role_mode)
+
+        self.stats['messages_translated'] += 1
+
+    def _deliver_translation(self, message_text: str, message_data: TextHookData, translated_text: str):
+        """แสดงคำแปล + เพิ่ม history + TUI auto-show + อัพเดทสถานะ"""
+        # CRITICAL: Show IMMEDIATELY if still translating
+        if self.is_translating and self.is_running:
+            self.logger.info(f"[แสดงทันที] แสดงคำแปลทันที!")
+            self._show_immediately(translated_text, message_text, message_data)
+
+            # History (Previous Dialog) และ TUI auto-show subscribe topic นี้
+            self.bus.publish(TOPIC_TRANSLATED, TranslatedEvent(message_data, message_text, translated_text))
+
+            # 🔧 FORCE STATUS UPDATE: Update main UI status back to READY
+            if hasattr(self, 'main_app_ref') and self.main_app_ref:
+                try:
+                    # Clear translating state
+                    self.main_app_ref._translating_in_progress = False
+                    self.main_app_ref.root.after(0, self.main_app_ref.update_info_label_with_model_color)
+                except:
+                    pass  # Fail silently if main app not available
+        else:
+            self.logger.warning(f"[ไม่แสดง] ระบบปิดแล้ว")
+
+    def _finish_translation(self, cache_key):
+        """Clean up tracking หลังแปลเสร็จหรือผิดพลาด"""
+        self._release_translation(cache_key)
+        self._clear_translating_status()
+
+    def _release_translation(self, cache_key):
+        self.translating_messages.discard(cache_key)
+        self._job_sequence.pop(cache_key, None)
+
+    def _clear_translating_status(self):
+        # 🔧 ENSURE CLEANUP: Always clear translating status on completion
+        if hasattr(self, 'main_app_ref') and self.main_app_ref:
+            try:
+                if hasattr(self.main_app_ref, '_translating_in_progress'):
+                    self.main_app_ref._translating_in_progress = False
+                    self.main_app_ref.root.after(0, self.main_app_ref.update_info_label_with_model_color)
+            except:
+                pass
+
+    def _show_immediately(self, text: str, message_text: Optional[str] = None,
+                          message_data: Optional[TextHookData] = None, from_cache: bool = False):
         """แสดงข้อความทันทีใน UI โดยไม่มีการหน่วงเวลา"""
         try:
             self.stats['immediate_displays'] += 1
             self.logger.info(f"[UI UPDATE] แสดงใน UI: {text[:50]}...")
 
+            trace = message_data.trace if message_data is not None else None
+            if trace is not None:
+                trace.mark(STAGE_TK_DISPATCHED)
+
             # Call UI updater directly - NO delays!
             if hasattr(self.ui_updater, '__call__'):
                 self.ui_updater(text)
@@ -335,13 +610,8 @@ class DalamudImmediateHandler:
                 self.ui_updater.update_text(text)
                 self.logger.info(f"[UI SUCCESS] เรียกเมธอด update_text สำเร็จ")
 
-            # *** TEXT HOOK INTEGRATION: ส่งข้อมูลไปที่ translated_logs ***
-            if self.translated_logs and hasattr(self.translated_logs, 'add_message'):
-                try:
-                    self.translated_logs.add_message(text)
-                    self.logger.info(f"[LOGS SUCCESS] ส่งข้อมูลไป translated_logs สำเร็จ")
-                except Exception as logs_error:
-                    self.logger.error(f"[LOGS ERROR] ไม่สามารถส่งไป translated_logs: {logs_error}")
+            # translated_logs และ sink อื่นรับผ่าน bus (แต่ละตัวมีคิวของตัวเอง)
+            self.bus.publish(TOPIC_DISPLAYED, DisplayedEvent(text, message_text, message_data, from_cache))
 
             # Force tkinter to update IMMEDIATELY
             if hasattr(self.ui_updater, 'root'):
@@ -349,6 +619,9 @@ class DalamudImmediateHandler:
                 self.ui_updater.root.update()
                 self.logger.info(f"[UI FORCED] บังคับอัพเดท tkinter สำเร็จ")
 
+            # root.update() ถูกเรียกแล้ว - ถือว่า render เสร็จ
+            get_tracer().finish(trace)
+
         except Exception as e:
             self.logger.error(f"[UI ERROR] ไม่สามารถแสดง UI: {e}")
 
@@ -362,27 +635,38 @@ class DalamudImmediateHandler:
 
     def get_stats(self) -> Dict[str, Any]:
         """Get handler statistics"""
+        translated = self.stats['messages_translated']
         return {
             **self.stats,
             'is_running': self.is_running,
             'is_translating': self.is_translating,
-            'cache_size': len(self.translation_cache),
-            'translating_count': len(self.translating_messages)
+            'cache_size': self.translation_cache.region_size(REGION_TRANSLATIONS),
+            'translation_cache': self.translation_cache.get_stats(),
+            'translating_count': len(self.translating_messages),
+            'reorder_depth': len(self._reorder_buffer),
+            'api_time_avg_ms': round(self.stats['api_time_total_ms'] / translated, 2) if translated else 0.0,
+            'worker_pool': self.worker_pool.get_stats(),  # queue_wait_* แยกจาก api_time_*
+            'bus': self.bus.get_stats(),
+            'chat_filter': get_chat_filter().get_stats(),  # hit ต่อกฎ - กฎ block ที่ hit สูงประหยัด API มากสุด
+            'dedup': self.dedup.get_stats() if self.dedup is not None else None,
+            # p99 ของ model หลักเทียบกับที่ผู้ใช้รอจริง + extra_request_rate (None ถ้าไม่ได้เปิด hedging)
+            'hedging': self.translator.get_hedge_stats() if hasattr(self.translator, 'get_hedge_stats') else None,
+            # บรรทัดต่อ route + error rate / p90 ต่อ model (None ถ้าไม่ได้เปิด model_routing)
+            'routing': self.translator.get_routing_stats() if hasattr(self.translator, 'get_routing_stats') else None,
         }
 
     def clear_cache(self):
         """Clear translation cache"""
-        self.translation_cache.clear()
+        self.translation_cache.clear_region(REGION_TRANSLATIONS)
         self.translating_messages.clear()
         self.logger.info("Translation cache cleared")
 
     def force_clear_cache(self):
         """Clear cache specifically for force translate"""
         if self.last_original_text:
-            cache_key = hash(self.last_original_text)
-            if cache_key in self.translation_cache:
-                del self.translation_cache[cache_key]
-                self.logger.info(f"[FORCE CLEAR] Cleared cache for force translate")
+            cache_key = self.last_cache_key
+            self.translation_cache.delete(REGION_TRANSLATIONS, cache_key)
+            self.logger.info(f"[FORCE CLEAR] Cleared cache for force translate")
             # Also remove from translating messages if present
             self.translating_messages.discard(cache_key)
         else:
@@ -395,13 +679,40 @@ class DalamudImmediateHandler:
             'messages_translated': 0,
             'cache_hits': 0,
             'immediate_displays': 0,
-            'errors': 0
+            'errors': 0,
+            'duplicates_suppressed': 0,   # บรรทัดซ้ำจาก hook อื่น - ไม่เสียค่า API ซ้ำ
+            'api_time_total_ms': 0.0,
+            'api_time_max_ms': 0.0,
+            'api_calls_saved': 0,
+            'jobs_dropped': 0,
+            'stale_discarded': 0,
+            'ordered_displayed': 0,
+            'ordered_skipped': 0,
+            'reorder_max_depth': 0,
+            'partial_displays': 0,
         }
+        self.worker_pool.reset_stats()
+        if self.dedup is not None:
+            self.dedup.reset_stats()
         self.logger.info("Statistics reset")
 
 
 # Factory function
-def create_dalamud_immediate_handler(translator=None, ui_updater=None, main_app=None) -> DalamudImmediateHandler:
+def create_dalamud_immediate_handler(translator=None, ui_updater=None, main_app=None,
+                                     bus: Optional[MessageBus] = None,
+                                     concurrency: int = DEFAULT_WORKER_CONFIG["concurrency"],
+                                     queue_size: int = DEFAULT_WORKER_CONFIG["queue_size"],
+                                     latest_wins: bool = True, ordered_cutscenes: bool = True,
+                                     reorder_window: int = 8,
+                                     translation_cache: Optional[TieredTranslationCache] = None,
+                                     scheduler: Optional[Dict[str, Any]] = None,
+                                     dedup: Optional[Dict[str, Any]] = None,
+                                     streaming: bool = True
+                                     ) -> DalamudImmediateHandler:
     """Create and configure a DalamudImmediateHandler instance"""
-    handler = DalamudImmediateHandler(translator, ui_updater, main_app)
+    handler = DalamudImmediateHandler(translator, ui_updater, main_app, bus=bus,
+                                      concurrency=concurrency, queue_size=queue_size, latest_wins=latest_wins,
+                                      ordered_cutscenes=ordered_cutscenes, reorder_window=reorder_window,
+                                      translation_cache=translation_cache, scheduler=scheduler, dedup=dedup,
+                                      streaming=streaming)
     return handler
\ No newline at end of file
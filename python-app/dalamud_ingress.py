@@ -0,0 +1,181 @@
+"""
+MBB Dalamud Ingress Queue - คิวขาเข้าระหว่าง reader thread กับ dispatcher thread
+Bounded queue with explicit backpressure: put() never blocks the reader,
+and every shed message is counted and kept in a short drop log.
+
+Policies (used only when the queue is full):
+    drop_oldest       - ทิ้งข้อความเก่าที่สุด
+    drop_priority     - ทิ้งข้อความที่ priority ต่ำสุด (ตาม Type/ChatType) เก่าสุดก่อน
+    coalesce_speaker  - แทนที่ข้อความที่รออยู่ของผู้พูด+Type เดียวกัน ถ้าไม่มีจึง drop_oldest
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from dalamud_message import TextHookData
+
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DROP_PRIORITY = "drop_priority"
+POLICY_COALESCE_SPEAKER = "coalesce_speaker"
+INGRESS_POLICIES = (POLICY_DROP_OLDEST, POLICY_DROP_PRIORITY, POLICY_COALESCE_SPEAKER)
+
+DEFAULT_INGRESS_CONFIG = {
+    "max_size": 64,
+    "policy": POLICY_DROP_PRIORITY,
+}
+
+# Message classes (สูง -> ต่ำ) ใช้ร่วมกับ scheduler ฝั่ง handler
+PRIORITY_STORY = 3   # dialogue / cutscene
+PRIORITY_CHOICE = 2
+PRIORITY_BATTLE = 1
+PRIORITY_OTHER = 0
+
+PRIORITY_NAMES = {
+    PRIORITY_STORY: "story",
+    PRIORITY_CHOICE: "choice",
+    PRIORITY_BATTLE: "battle",
+    PRIORITY_OTHER: "other",
+}
+
+STORY_CHAT_TYPES = {61, 0x0047}  # Dialogue, Cutscene text (TalkSubtitle)
+
+
+def message_priority(message_data: TextHookData) -> int:
+    """จัดลำดับความสำคัญของข้อความจาก Type และ ChatType"""
+    message_type = message_data.type
+    if message_type in ('dialogue', 'cutscene') or message_data.chat_type in STORY_CHAT_TYPES:
+        return PRIORITY_STORY
+    if message_type == 'choice':
+        return PRIORITY_CHOICE
+    if message_type == 'battle':
+        return PRIORITY_BATTLE
+    return PRIORITY_OTHER
+
+
+class IngressQueue:
+    """Bounded, non-blocking-put queue with drop policies and counters"""
+
+    def __init__(self, max_size: int = 64, policy: str = POLICY_DROP_PRIORITY, drop_log_size: int = 50):
+        if policy not in INGRESS_POLICIES:
+            raise ValueError(f"Unknown ingress policy: {policy}")
+        self.max_size = max(1, int(max_size))
+        self.policy = policy
+        self.logger = logging.getLogger('IngressQueue')
+
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.recent_drops = deque(maxlen=drop_log_size)
+        self.stats = {
+            'enqueued': 0,
+            'dequeued': 0,
+            'dropped': 0,
+            'dropped_incoming': 0,
+            'coalesced': 0,
+            'max_depth': 0,
+        }
+
+    def put(self, message_data: TextHookData) -> bool:
+        """
+        เพิ่มข้อความเข้าคิวโดยไม่บล็อก
+
+        Returns:
+            bool: False ถ้าข้อความที่เข้ามาถูกทิ้งเอง
+        """
+        with self._cond:
+            accepted = True
+            if len(self._items) >= self.max_size:
+                accepted = self._make_room(message_data)
+
+            if accepted:
+                self._items.append(message_data)
+                self.stats['enqueued'] += 1
+                depth = len(self._items)
+                if depth > self.stats['max_depth']:
+                    self.stats['max_depth'] = depth
+                self._cond.notify()
+            return accepted
+
+    def get(self, timeout: Optional[float] = None) -> Optional[TextHookData]:
+        """รอรับข้อความถัดไป (None เมื่อ timeout หรือคิวถูกปิด)"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            self.stats['dequeued'] += 1
+            return self._items.popleft()
+
+    def close(self):
+        """ปลุก consumer ที่รออยู่ให้ออกจาก get()"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _make_room(self, incoming: TextHookData) -> bool:
+        """เลือกข้อความที่จะทิ้งตาม policy - คืน False ถ้าทิ้งข้อความที่เข้ามาแทน"""
+        if self.policy == POLICY_COALESCE_SPEAKER:
+            key = (incoming.speaker, incoming.type)
+            for queued in self._items:
+                if (queued.speaker, queued.type) == key:
+                    self._items.remove(queued)
+                    self.stats['coalesced'] += 1
+                    self._record_drop(queued, 'coalesced')
+                    return True
+            victim = self._items.popleft()
+            self._record_drop(victim, 'oldest')
+            return True
+
+        if self.policy == POLICY_DROP_PRIORITY:
+            incoming_priority = message_priority(incoming)
+            victim = min(self._items, key=message_priority)  # min() คืนตัวแรกที่ต่ำสุด = เก่าสุด
+            if message_priority(victim) > incoming_priority:
+                # ทุกข้อความในคิวสำคัญกว่าข้อความใหม่ - ทิ้งข้อความใหม่
+                self.stats['dropped_incoming'] += 1
+                self._record_drop(incoming, 'low_priority_incoming')
+                return False
+            self._items.remove(victim)
+            self._record_drop(victim, 'low_priority')
+            return True
+
+        victim = self._items.popleft()
+        self._record_drop(victim, 'oldest')
+        return True
+
+    def _record_drop(self, message_data: TextHookData, reason: str):
+        self.stats['dropped'] += 1
+        self.recent_drops.append({
+            'time': time.time(),
+            'reason': reason,
+            'type': message_data.type,
+            'chat_type': message_data.chat_type,
+            'speaker': message_data.speaker,
+            'message': message_data.message[:60],
+        })
+        self.logger.debug(f"[INGRESS DROP] {reason}: {message_data.type} "
+                          f"{message_data.speaker}: {message_data.message[:40]}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.stats,
+                'policy': self.policy,
+                'max_size': self.max_size,
+                'depth': len(self._items),
+                'recent_drops': list(self.recent_drops)[-10:],
+            }
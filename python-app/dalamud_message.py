@@ -0,0 +1,146 @@
+"""
+MBB Dalamud Message - decode ข้อความจาก Dalamud plugin ในขั้นตอนเดียว
+Single-step decode: raw JSON line -> slotted TextHookData record
+
+Record เดียวกันถูกส่งตั้งแต่ bridge -> ingress -> handler โดยไม่แปลงกลับเป็น dict
+JSON backend เลือกตัวที่เร็วที่สุดที่ติดตั้งไว้: msgspec > orjson > json (stdlib)
+"""
+
+import json
+from typing import Any, Callable, Dict, Union
+
+try:
+    import msgspec
+    HAS_MSGSPEC = True
+except ImportError:
+    HAS_MSGSPEC = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+JSON_BACKENDS = ("msgspec", "orjson", "json")
+
+
+class MessageDecodeError(ValueError):
+    """ข้อความจาก plugin ไม่ใช่ JSON object ที่ถูกต้อง"""
+
+
+class TextHookData:
+    """Data structure for text received from Dalamud plugin"""
+
+    __slots__ = ("type", "speaker", "message", "timestamp", "chat_type", "trace")
+
+    # ชื่อ key ใน JSON ของ plugin -> ชื่อ attribute
+    WIRE_FIELDS = {
+        "Type": "type",
+        "Speaker": "speaker",
+        "Message": "message",
+        "Timestamp": "timestamp",
+        "ChatType": "chat_type",
+    }
+
+    def __init__(self, type: str = "unknown", speaker: str = "", message: str = "",
+                 timestamp: int = 0, chat_type: int = 0):
+        self.type = type            # "dialogue", "cutscene", "choice", "battle", "system"
+        self.speaker = speaker      # Character name (empty for narrative)
+        self.message = message      # The actual text content
+        self.timestamp = timestamp  # Unix timestamp
+        self.chat_type = chat_type  # Original XivChatType value
+        self.trace = None           # MessageTrace เมื่อเปิด latency tracing (ดู dalamud_trace.py)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TextHookData":
+        """Create TextHookData from dictionary (แปลงชนิดและ strip ในที่เดียว)"""
+        self = cls.__new__(cls)
+        get = data.get
+
+        value = get("Type", "unknown")
+        self.type = value if type(value) is str else _as_str(value, "unknown")
+        value = get("Speaker", "")
+        self.speaker = (value if type(value) is str else _as_str(value, "")).strip()
+        value = get("Message", "")
+        self.message = (value if type(value) is str else _as_str(value, "")).strip()
+        value = get("Timestamp", 0)
+        self.timestamp = value if type(value) is int else _as_int(value)
+        value = get("ChatType", 0)
+        self.chat_type = value if type(value) is int else _as_int(value)
+        self.trace = None
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """คืนรูปแบบ JSON เดิมของ plugin"""
+        return {wire: getattr(self, attr) for wire, attr in self.WIRE_FIELDS.items()}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style access ด้วยชื่อ key เดิม (สำหรับ callback เก่าที่ยังใช้ message_data.get)"""
+        attr = self.WIRE_FIELDS.get(key)
+        return getattr(self, attr) if attr else default
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TextHookData):
+            return NotImplemented
+        return (self.type, self.speaker, self.message, self.timestamp, self.chat_type) == \
+               (other.type, other.speaker, other.message, other.timestamp, other.chat_type)
+
+    def __repr__(self) -> str:
+        return (f"TextHookData(type={self.type!r}, speaker={self.speaker!r}, message={self.message!r}, "
+                f"timestamp={self.timestamp!r}, chat_type={self.chat_type!r})")
+
+
+def _as_str(value: Any, default: str) -> str:
+    if type(value) is str:
+        return value
+    return default if value is None else str(value)
+
+
+def _as_int(value: Any) -> int:
+    if type(value) is int:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _json_loader(backend: str) -> Callable[[Union[str, bytes]], Any]:
+    if backend == "msgspec":
+        if not HAS_MSGSPEC:
+            raise ImportError("msgspec is not installed")
+        return msgspec.json.Decoder().decode
+    if backend == "orjson":
+        if not HAS_ORJSON:
+            raise ImportError("orjson is not installed")
+        return orjson.loads
+    if backend == "json":
+        return json.loads
+    raise ValueError(f"Unknown JSON backend: {backend}")
+
+
+def available_backends():
+    """รายชื่อ JSON backend ที่ใช้ได้ในเครื่องนี้ (เร็วสุดก่อน)"""
+    return [name for name, ok in zip(JSON_BACKENDS, (HAS_MSGSPEC, HAS_ORJSON, True)) if ok]
+
+
+def make_decoder(backend: str) -> Callable[[Union[str, bytes]], TextHookData]:
+    """สร้างฟังก์ชัน decode สำหรับ backend ที่ระบุ"""
+    loads = _json_loader(backend)
+    from_dict = TextHookData.from_dict
+
+    def decode(raw: Union[str, bytes]) -> TextHookData:
+        try:
+            data = loads(raw)
+        except Exception as e:  # json/orjson -> ValueError, msgspec -> DecodeError
+            raise MessageDecodeError(str(e)) from e
+        if type(data) is not dict:
+            raise MessageDecodeError(f"Expected JSON object, got {type(data).__name__}")
+        return from_dict(data)
+
+    decode.backend = backend
+    return decode
+
+
+JSON_BACKEND = available_backends()[0]
+decode_message = make_decoder(JSON_BACKEND)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+MBB Dalamud Recorder - บันทึกและเล่นซ้ำ message stream จาก Dalamud plugin
+Record every raw line the bridge receives with its arrival time, then replay
+the same stream at 1x, Nx or max speed for reproducible load tests.
+
+File format (append-only, UTF-8 text, one record per line):
+    #MBBREC1 <session start unix time>      <- header, written once per session
+    <offset_us>\t<raw JSON line>            <- microseconds since session start
+
+JSON lines never contain a literal tab or newline, so the first tab is the separator.
+A path ending in .gz is written as multi-member gzip (still append-only).
+
+Usage:
+    python dalamud_recorder.py info <file>
+    python dalamud_recorder.py serve <file> [--speed N|max] [--transport unix_socket|tcp]
+    python dalamud_recorder.py warm <file> [--batch-size N]
+"""
+
+import os
+import sys
+import gzip
+import time
+import logging
+import argparse
+import threading
+from typing import Callable, List, Optional, Tuple
+
+# Add current directory to path
+sys.path.append(os.path.dirname(__file__))
+
+RECORD_HEADER = "#MBBREC1"
+
+
+def _open_text(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    # line buffering - ทุก record ถึงดิสก์ทันทีแม้โปรแกรมปิดกะทันหัน
+    return open(path, mode, encoding="utf-8", buffering=1 if "a" in mode or "w" in mode else -1)
+
+
+class MessageRecorder:
+    """บันทึกทุกบรรทัดที่ bridge ได้รับพร้อมเวลาที่มาถึง"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.logger = logging.getLogger("MessageRecorder")
+        self.lock = threading.Lock()
+        self.records_written = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._file = _open_text(path, "a")
+        self._start = time.perf_counter()
+        self._file.write(f"{RECORD_HEADER} {time.time():.6f}\n")
+        self.logger.info(f"Recording Dalamud stream to {path}")
+
+    def record(self, raw_line: str, arrival: Optional[float] = None):
+        """บันทึกหนึ่งบรรทัด (arrival = perf_counter ตอนได้รับ ถ้าไม่ระบุใช้เวลาปัจจุบัน)"""
+        if arrival is None:
+            arrival = time.perf_counter()
+        offset_us = int((arrival - self._start) * 1_000_000)
+        with self.lock:
+            if self._file is None:
+                return
+            self._file.write(f"{offset_us}\t{raw_line}\n")
+            self.records_written += 1
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self.logger.info(f"Recording stopped - {self.records_written} messages written to {self.path}")
+
+
+def load_recording(path: str) -> List[Tuple[float, str]]:
+    """
+    โหลดไฟล์บันทึกเป็น [(offset_seconds, raw_line), ...]
+
+    หลาย session ในไฟล์เดียวจะถูกต่อกันตามลำดับเวลา (session ถัดไปเริ่มหลัง record สุดท้าย)
+    """
+    records = []
+    session_base = 0.0
+    last_offset = 0.0
+
+    with _open_text(path, "r") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            if line.startswith(RECORD_HEADER):
+                session_base = last_offset
+                continue
+            offset_str, sep, raw = line.partition("\t")
+            if not sep:
+                continue
+            try:
+                offset = session_base + int(offset_str) / 1_000_000
+            except ValueError:
+                continue
+            records.append((offset, raw))
+            last_offset = offset
+
+    return records
+
+
+class MessageReplayer:
+    """
+    เล่นซ้ำ stream ที่บันทึกไว้ไปยัง callback ตามจังหวะเวลาจริง
+
+    speed: 1.0 = เวลาจริง, N = เร็วขึ้น N เท่า, None หรือ 0 = เร็วที่สุด (ไม่รอ)
+    """
+
+    def __init__(self, records: List[Tuple[float, str]], speed: Optional[float] = 1.0):
+        self.records = records
+        self.speed = speed if speed and speed > 0 else None
+        self.logger = logging.getLogger("MessageReplayer")
+        self.is_running = False
+        self.thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "messages_replayed": 0,
+            "max_lag_ms": 0.0,  # ส่งช้ากว่ากำหนดสูงสุด (callback ช้ากว่า stream)
+            "duration": 0.0,
+        }
+
+    @classmethod
+    def from_file(cls, path: str, speed: Optional[float] = 1.0) -> "MessageReplayer":
+        return cls(load_recording(path), speed)
+
+    def run(self, callback: Callable[[str], None]):
+        """เล่นซ้ำแบบ blocking ใน thread ปัจจุบัน"""
+        self.is_running = True
+        start = time.perf_counter()
+        first_offset = self.records[0][0] if self.records else 0.0
+
+        for offset, raw in self.records:
+            if not self.is_running:
+                break
+
+            if self.speed is not None:
+                target = start + (offset - first_offset) / self.speed
+                delay = target - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    lag_ms = -delay * 1000
+                    if lag_ms > self.stats["max_lag_ms"]:
+                        self.stats["max_lag_ms"] = lag_ms
+
+            callback(raw)
+            self.stats["messages_replayed"] += 1
+
+        self.stats["duration"] = time.perf_counter() - start
+        self.is_running = False
+
+    def start(self, callback: Callable[[str], None]) -> threading.Thread:
+        """เล่นซ้ำใน background thread"""
+        self.thread = threading.Thread(target=self.run, args=(callback,), daemon=True, name="DalamudReplay")
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        self.is_running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+
+    def replay_into_bridge(self, bridge) -> threading.Thread:
+        """ส่งทุกบรรทัดเข้า bridge โดยตรง (เหมือนอ่านได้จาก transport)"""
+        return self.start(bridge.inject_message)
+
+
+def recorded_lines(records: List[Tuple[float, str]]) -> List[Tuple[str, str]]:
+    """(speaker, message) ของทุกข้อความในไฟล์บันทึกที่ผ่าน chat filter - ซ้ำกันเก็บครั้งเดียว"""
+    from dalamud_message import decode_message, MessageDecodeError
+    from dalamud_filters import get_chat_filter
+
+    chat_filter = get_chat_filter()
+    seen = set()
+    lines = []
+    for _, raw in records:
+        try:
+            message_data = decode_message(raw)
+        except MessageDecodeError:
+            continue
+        if not message_data.message or not chat_filter.should_translate(message_data):
+            continue
+        line = (message_data.speaker, message_data.message)
+        if line not in seen:
+            seen.add(line)
+            lines.append(line)
+    return lines
+
+
+def _parse_speed(value: str) -> Optional[float]:
+    if value.lower() in ("max", "0"):
+        return None
+    return float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dalamud stream recorder / replayer")
+    subparsers = parser.add_subparsers(dest="command")
+
+    info = subparsers.add_parser("info", help="show recording summary")
+    info.add_argument("file")
+
+    serve = subparsers.add_parser("serve", help="replay a recording over a socket transport")
+    serve.add_argument("file")
+    serve.add_argument("--speed", type=_parse_speed, default=1.0, help="1, N or 'max'")
+    serve.add_argument("--transport", default="auto", choices=["auto", "unix_socket", "tcp"])
+
+    warm = subparsers.add_parser("warm", help="pre-translate a recording into the translation cache")
+    warm.add_argument("file")
+    warm.add_argument("--batch-size", type=int, default=10)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == "info":
+        records = load_recording(args.file)
+        duration = records[-1][0] - records[0][0] if records else 0
+        print(f"📼 {args.file}: {len(records)} messages over {duration:.1f}s")
+        if duration > 0:
+            print(f"   average rate: {len(records) / duration:.2f} msg/s")
+
+    elif args.command == "serve":
+        from dalamud_transport import SocketTransportServer
+
+        replayer = MessageReplayer.from_file(args.file, args.speed)
+        server = SocketTransportServer({"type": args.transport})
+        print(f"⏳ Waiting for DalamudBridge on {server.address}...")
+        try:
+            server.accept()
+            replayer.run(server.send_line)
+            print(f"✅ Replayed {replayer.stats['messages_replayed']} messages "
+                  f"in {replayer.stats['duration']:.2f}s (max lag {replayer.stats['max_lag_ms']:.1f} ms)")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+
+    elif args.command == "warm":
+        from settings import Settings
+        from translator_factory import TranslatorFactory
+        from translation_cache import configure_translation_cache
+        from dalamud_filters import configure_chat_filter
+        from gemini_guard import configure_gemini_guard
+
+        settings = Settings()
+        cache = configure_translation_cache(settings.get("translation_cache"))
+        configure_chat_filter(settings.get("dalamud_filter"))
+        configure_gemini_guard(settings.get("gemini_client"))
+        translator = TranslatorFactory.create_translator(settings)
+
+        lines = recorded_lines(load_recording(args.file))
+        start = time.perf_counter()
+        try:
+            stored = translator.warm_cache(lines, batch_size=args.batch_size)
+        finally:
+            cache.close()
+        elapsed = time.perf_counter() - start
+        print(f"🔥 Warmed {stored} of {len(lines)} unique lines in {elapsed:.1f}s")
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+MBB Dalamud Trace - วัด latency ต่อข้อความตั้งแต่ plugin ส่งจนถึง TUI แสดงผล
+End-to-end latency tracing for the Dalamud text hook pipeline
+
+ทุกข้อความได้ MessageTrace ตอน decode และถูก mark ตาม stage:
+
+    received -> filtered -> speaker_split -> prompt_built -> api_start -> api_end
+        -> post_process -> tk_dispatched -> tk_rendered
+
+คำแปลที่ stream ทีละประโยคถูก mark first_partial ตอนประโยคแรกขึ้น TUI (ไม่อยู่ในลำดับ stage ข้างบน
+เพราะเกิดระหว่าง api_start กับ api_end) - metric first_partial คือ received -> ประโยคแรกบนจอ
+
+Trace ที่ render เสร็จถูกเก็บใน ring buffer และเวลาระหว่าง stage (ms) ถูกสะสมเป็น
+histogram ต่อ stage พร้อม p50/p95/p99 - ดูได้จาก debug panel หรือ export เป็น JSON
+
+translator ไม่ต้องรู้จัก trace โดยตรง: handler activate trace ใน context ก่อนเรียก translate()
+แล้ว translator เรียก mark(stage) ซึ่งไม่ทำอะไรถ้าไม่มี trace ที่ active
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+STAGE_RECEIVED = "received"
+STAGE_FILTERED = "filtered"
+STAGE_SPEAKER_SPLIT = "speaker_split"
+STAGE_PROMPT_BUILT = "prompt_built"
+STAGE_API_START = "api_start"
+STAGE_API_END = "api_end"
+STAGE_POST_PROCESS = "post_process"
+STAGE_TK_DISPATCHED = "tk_dispatched"
+STAGE_TK_RENDERED = "tk_rendered"
+STAGE_FIRST_PARTIAL = "first_partial"  # ประโยคแรกของคำแปลที่ stream ขึ้น TUI
+
+STAGES = (
+    STAGE_RECEIVED,
+    STAGE_FILTERED,
+    STAGE_SPEAKER_SPLIT,
+    STAGE_PROMPT_BUILT,
+    STAGE_API_START,
+    STAGE_API_END,
+    STAGE_POST_PROCESS,
+    STAGE_TK_DISPATCHED,
+    STAGE_TK_RENDERED,
+)
+
+# ชื่อ metric พิเศษนอกเหนือจาก stage
+METRIC_PLUGIN_TO_RECEIVED = "plugin_to_received"  # Timestamp ของ plugin เป็นวินาที - ความละเอียด 1s
+METRIC_TOTAL = "total"                            # received -> tk_rendered
+METRIC_FIRST_PARTIAL = STAGE_FIRST_PARTIAL        # received -> first_partial (latency ที่ผู้เล่นรู้สึก)
+
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+DEFAULT_TRACING_CONFIG = {
+    "enabled": False,
+    "ring_size": 500,       # จำนวน trace ล่าสุดที่เก็บไว้
+    "sample_size": 2000,    # จำนวน sample ต่อ stage ที่ใช้คำนวณ percentile
+    "export_path": "logs/dalamud_latency.json",
+}
+
+_current_trace: ContextVar[Optional["MessageTrace"]] = ContextVar("mbb_current_trace", default=None)
+
+
+class MessageTrace:
+    """เวลาของแต่ละ stage ของข้อความหนึ่ง (perf_counter) - stage แรกที่ mark ชนะ"""
+
+    __slots__ = ("trace_id", "message_type", "plugin_timestamp", "received_wall", "marks")
+
+    def __init__(self, trace_id: int, message_type: str, plugin_timestamp: int):
+        self.trace_id = trace_id
+        self.message_type = message_type
+        self.plugin_timestamp = plugin_timestamp
+        self.received_wall = time.time()
+        self.marks: Dict[str, float] = {STAGE_RECEIVED: time.perf_counter()}
+
+    def mark(self, stage: str):
+        if stage not in self.marks:
+            self.marks[stage] = time.perf_counter()
+
+    def stage_durations(self) -> Dict[str, float]:
+        """เวลา (ms) ของแต่ละ stage นับจาก stage ก่อนหน้าที่ถูก mark"""
+        durations = {}
+        previous = None
+        for stage in STAGES:
+            at = self.marks.get(stage)
+            if at is None:
+                continue
+            if previous is not None:
+                durations[stage] = (at - previous) * 1000.0
+            previous = at
+        return durations
+
+    def total_ms(self) -> Optional[float]:
+        end = self.marks.get(STAGE_TK_RENDERED)
+        return None if end is None else (end - self.marks[STAGE_RECEIVED]) * 1000.0
+
+    def first_partial_ms(self) -> Optional[float]:
+        at = self.marks.get(STAGE_FIRST_PARTIAL)
+        return None if at is None else (at - self.marks[STAGE_RECEIVED]) * 1000.0
+
+    def plugin_lag_ms(self) -> Optional[float]:
+        if not self.plugin_timestamp:
+            return None
+        return max(0.0, (self.received_wall - self.plugin_timestamp) * 1000.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.trace_id,
+            "type": self.message_type,
+            "plugin_timestamp": self.plugin_timestamp,
+            "received_wall": self.received_wall,
+            "stages_ms": {stage: round(ms, 3) for stage, ms in self.stage_durations().items()},
+            "total_ms": self.total_ms(),
+            "first_partial_ms": self.first_partial_ms(),
+            "plugin_lag_ms": self.plugin_lag_ms(),
+        }
+
+
+class StageHistogram:
+    """Histogram แบบ bucket คงที่ + sample ล่าสุดสำหรับ percentile"""
+
+    def __init__(self, sample_size: int):
+        self.counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.samples = deque(maxlen=sample_size)
+        self.count = 0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect_left(HISTOGRAM_BUCKETS_MS, ms)] += 1
+        self.samples.append(ms)
+        self.count += 1
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "p50": _percentile(ordered, 0.50),
+            "p95": _percentile(ordered, 0.95),
+            "p99": _percentile(ordered, 0.99),
+            "max": round(self.max_ms, 3),
+            "histogram": {
+                (f"<={bound}ms" if i < len(HISTOGRAM_BUCKETS_MS) else f">{HISTOGRAM_BUCKETS_MS[-1]}ms"): n
+                for i, (bound, n) in enumerate(zip(HISTOGRAM_BUCKETS_MS + (None,), self.counts))
+            },
+        }
+
+
+def _percentile(ordered: List[float], fraction: float) -> Optional[float]:
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+class LatencyTracer:
+    """เก็บ trace ที่เสร็จแล้วใน ring buffer และสรุป latency ต่อ stage"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.logger = logging.getLogger('LatencyTracer')
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.configure(config)
+
+    def configure(self, config: Optional[Dict[str, Any]] = None):
+        config = {**DEFAULT_TRACING_CONFIG, **(config or {})}
+        with self._lock:
+            self.enabled = bool(config["enabled"])
+            self.export_path = config["export_path"]
+            self.sample_size = max(1, int(config["sample_size"]))
+            self.traces = deque(maxlen=max(1, int(config["ring_size"])))
+            self.histograms: Dict[str, StageHistogram] = {}
+
+    def start(self, message) -> Optional[MessageTrace]:
+        """สร้าง trace ให้ข้อความที่เพิ่ง decode (ผูกไว้ที่ message.trace)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._next_id += 1
+            trace_id = self._next_id
+        trace = MessageTrace(trace_id, message.type, message.timestamp)
+        message.trace = trace
+        return trace
+
+    def finish(self, trace: Optional[MessageTrace]):
+        """Mark tk_rendered แล้วบันทึก trace ลง ring buffer และ histogram"""
+        if trace is None:
+            return
+        trace.mark(STAGE_TK_RENDERED)
+        durations = trace.stage_durations()
+        durations[METRIC_TOTAL] = trace.total_ms()
+        plugin_lag = trace.plugin_lag_ms()
+        if plugin_lag is not None:
+            durations[METRIC_PLUGIN_TO_RECEIVED] = plugin_lag
+        first_partial = trace.first_partial_ms()
+        if first_partial is not None:
+            durations[METRIC_FIRST_PARTIAL] = first_partial
+
+        with self._lock:
+            self.traces.append(trace)
+            for stage, ms in durations.items():
+                histogram = self.histograms.get(stage)
+                if histogram is None:
+                    histogram = self.histograms[stage] = StageHistogram(self.sample_size)
+                histogram.add(ms)
+
+    def summary(self) -> Dict[str, Any]:
+        """p50/p95/p99/max + histogram ต่อ stage (เรียงตามลำดับ pipeline)"""
+        order = (METRIC_PLUGIN_TO_RECEIVED,) + STAGES[1:] + (METRIC_FIRST_PARTIAL, METRIC_TOTAL)
+        with self._lock:
+            return {stage: self.histograms[stage].summary() for stage in order if stage in self.histograms}
+
+    def recent_traces(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self.traces)
+        if limit is not None:
+            traces = traces[-limit:]
+        return [trace.to_dict() for trace in traces]
+
+    def format_summary(self) -> str:
+        """ตารางสรุปสำหรับ debug panel / console"""
+        lines = [f"{'stage':<20}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"]
+        for stage, row in self.summary().items():
+            lines.append(
+                f"{stage:<20}{row['count']:>7}"
+                + "".join(f"{_format_ms(row[key]):>10}" for key in ("p50", "p95", "p99", "max"))
+            )
+        if len(lines) == 1:
+            lines.append("(no completed traces yet)")
+        return "\n".join(lines)
+
+    def export(self, path: Optional[str] = None) -> str:
+        """เขียน summary และ trace ล่าสุดลงไฟล์ JSON - คืน path ที่เขียน"""
+        path = path or self.export_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {
+            "exported_at": time.time(),
+            "summary": self.summary(),
+            "traces": self.recent_traces(),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        self.logger.info(f"Latency traces exported to {path}")
+        return path
+
+    def reset(self):
+        with self._lock:
+            self.traces.clear()
+            self.histograms.clear()
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}ms"
+
+
+_tracer = LatencyTracer()
+
+
+def get_tracer() -> LatencyTracer:
+    """Tracer ที่ใช้ร่วมกันทั้ง bridge, handler และ translator"""
+    return _tracer
+
+
+def configure_tracer(config: Optional[Dict[str, Any]] = None) -> LatencyTracer:
+    """ตั้งค่า tracer จาก setting 'dalamud_tracing'"""
+    _tracer.configure(config)
+    return _tracer
+
+
+def activate(trace: Optional[MessageTrace]):
+    """ตั้ง trace ปัจจุบันของ thread/task นี้ - คืน token สำหรับ deactivate()"""
+    return _current_trace.set(trace)
+
+
+def deactivate(token):
+    _current_trace.reset(token)
+
+
+def mark(stage: str):
+    """Mark stage ให้ trace ที่ active อยู่ (ไม่ทำอะไรถ้าไม่มี)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.mark(stage)
@@ -0,0 +1,403 @@
+"""
+MBB Dalamud Transport Layer
+ชั้นการเชื่อมต่อสำหรับ DalamudBridge - แยก I/O ออกจาก framing และสถิติ
+รองรับ Named Pipe (Windows), Unix domain socket และ TCP loopback
+
+Named pipe เป็นค่าเริ่มต้นบน Windows (ตรงกับ Dalamud plugin)
+Unix socket / TCP ใช้สำหรับรัน bridge และ replay stream บน Linux เพื่อวัด latency
+"""
+
+import os
+import socket
+import selectors
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any
+
+try:
+    import pywintypes
+    import win32event
+    import win32pipe
+    import win32file
+    import winerror
+
+    HAS_WIN32 = True
+except ImportError:
+    HAS_WIN32 = False
+
+DEFAULT_PIPE_NAME = r'\\.\pipe\mbb_dalamud_bridge'
+DEFAULT_UNIX_SOCKET_PATH = "/tmp/mbb_dalamud_bridge.sock"
+DEFAULT_TCP_HOST = "127.0.0.1"
+DEFAULT_TCP_PORT = 47811
+
+DEFAULT_TRANSPORT_CONFIG = {
+    "type": "auto",  # auto, named_pipe, unix_socket, tcp
+    "pipe_name": DEFAULT_PIPE_NAME,
+    "unix_socket_path": DEFAULT_UNIX_SOCKET_PATH,
+    "tcp_host": DEFAULT_TCP_HOST,
+    "tcp_port": DEFAULT_TCP_PORT,
+    "connect_timeout": 10.0,
+    # event = ตื่นเมื่อมีข้อมูลจริง (overlapped I/O / selectors), poll = อ่านแล้ว sleep 10ms แบบเดิม
+    "read_mode": "event",
+    "idle_timeout": 0.5,  # วินาที - event mode ตื่นเช็ค is_running อย่างน้อยทุกช่วงนี้
+}
+
+READ_MODE_EVENT = "event"
+READ_MODE_POLL = "poll"
+
+READ_CHUNK_SIZE = 4096
+
+
+class BridgeTransport(ABC):
+    """
+    Base class for bridge transports - subclass ต้อง implement connect/read/close/is_open
+    (transport ที่ไม่ครบสร้าง instance ไม่ได้ตั้งแต่แรก)
+
+    read() contract (same for every backend):
+        bytes with data -> data received
+        b""             -> no data yet, connection still open
+        None            -> connection closed by the other side
+    """
+
+    name = "base"
+    # True = read() บล็อกจนมีข้อมูล (หรือครบ idle timeout) - bridge ไม่ต้อง sleep เอง
+    event_driven = False
+
+    @abstractmethod
+    def connect(self):
+        """เชื่อมต่อกับ server - raise exception ถ้าล้มเหลว"""
+
+    @abstractmethod
+    def read(self, size: int = READ_CHUNK_SIZE) -> Optional[bytes]:
+        """อ่านข้อมูลจาก transport"""
+
+    @abstractmethod
+    def close(self):
+        """ปิดการเชื่อมต่อ (เรียกซ้ำได้)"""
+
+    @property
+    @abstractmethod
+    def is_open(self) -> bool:
+        """True ถ้ายังเชื่อมต่ออยู่"""
+
+    def describe(self) -> str:
+        return self.name
+
+
+class NamedPipeTransport(BridgeTransport):
+    """
+    Windows named pipe client (ค่าเดิมของ DalamudBridge)
+
+    event mode ใช้ overlapped ReadFile + WaitForSingleObject ตื่นทันทีที่มี byte เข้ามา
+    poll mode ใช้ ReadFile แบบ synchronous ตามเดิม
+    """
+
+    name = "named_pipe"
+
+    def __init__(self, pipe_name: str = DEFAULT_PIPE_NAME, connect_timeout: float = 10.0,
+                 event_driven: bool = True, idle_timeout: float = 0.5):
+        if not HAS_WIN32:
+            raise RuntimeError("Named pipe transport requires pywin32 (Windows only)")
+        self.pipe_name = pipe_name
+        self.connect_timeout = connect_timeout
+        self.event_driven = event_driven
+        self.idle_timeout_ms = int(idle_timeout * 1000)
+        self.pipe_handle = None
+
+        # overlapped read state (event mode)
+        self._overlapped = None
+        self._read_buffer = None
+        self._read_pending = False
+
+    def connect(self):
+        # รอ pipe server จาก Dalamud
+        win32pipe.WaitNamedPipe(self.pipe_name, int(self.connect_timeout * 1000))
+
+        flags = win32file.FILE_FLAG_OVERLAPPED if self.event_driven else 0
+        self.pipe_handle = win32file.CreateFile(
+            self.pipe_name,
+            win32file.GENERIC_READ,
+            0,
+            None,
+            win32file.OPEN_EXISTING,
+            flags,
+            None
+        )
+
+        if self.event_driven:
+            self._overlapped = pywintypes.OVERLAPPED()
+            self._overlapped.hEvent = win32event.CreateEvent(None, True, False, None)
+            self._read_pending = False
+
+    def read(self, size: int = READ_CHUNK_SIZE) -> Optional[bytes]:
+        if self.event_driven:
+            return self._read_overlapped(size)
+
+        result, data = win32file.ReadFile(self.pipe_handle, size)
+        if result == 0:
+            return data if data else b""
+        return None
+
+    def _read_overlapped(self, size: int) -> Optional[bytes]:
+        try:
+            if not self._read_pending:
+                # เริ่ม read ใหม่ - ถ้ายังไม่เสร็จจะค้างไว้จนกว่า event จะถูก signal
+                self._read_buffer = win32file.AllocateReadBuffer(size)
+                win32event.ResetEvent(self._overlapped.hEvent)
+                win32file.ReadFile(self.pipe_handle, self._read_buffer, self._overlapped)
+                self._read_pending = True
+
+            rc = win32event.WaitForSingleObject(self._overlapped.hEvent, self.idle_timeout_ms)
+            if rc == win32event.WAIT_TIMEOUT:
+                return b""  # idle wakeup - read ยังค้างอยู่ ใช้ต่อรอบหน้า
+
+            self._read_pending = False
+            nbytes = win32file.GetOverlappedResult(self.pipe_handle, self._overlapped, False)
+            if nbytes == 0:
+                return b""
+            return bytes(self._read_buffer[:nbytes])
+
+        except pywintypes.error as e:
+            self._read_pending = False
+            if e.winerror in (winerror.ERROR_BROKEN_PIPE, winerror.ERROR_PIPE_NOT_CONNECTED):
+                return None
+            raise
+
+    def close(self):
+        if self.pipe_handle:
+            try:
+                if self._read_pending:
+                    win32file.CancelIo(self.pipe_handle)
+                win32file.CloseHandle(self.pipe_handle)
+            except Exception:
+                pass
+            self.pipe_handle = None
+        if self._overlapped is not None:
+            try:
+                win32file.CloseHandle(self._overlapped.hEvent)
+            except Exception:
+                pass
+            self._overlapped = None
+        self._read_pending = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.pipe_handle is not None
+
+    def describe(self) -> str:
+        return f"{self.name}:{self.pipe_name}"
+
+
+class _SocketTransport(BridgeTransport):
+    """
+    Shared client logic for stream sockets
+
+    socket เป็น non-blocking เสมอ - event mode รอด้วย selectors จนกว่าจะอ่านได้
+    poll mode คืน b"" ทันทีถ้ายังไม่มีข้อมูล (bridge จะ sleep เอง)
+    """
+
+    def __init__(self, connect_timeout: float = 10.0, event_driven: bool = True, idle_timeout: float = 0.5):
+        self.connect_timeout = connect_timeout
+        self.event_driven = event_driven
+        self.idle_timeout = idle_timeout
+        self.sock: Optional[socket.socket] = None
+        self._selector: Optional[selectors.BaseSelector] = None
+
+    @abstractmethod
+    def _create_socket(self) -> socket.socket:
+        """socket ใหม่ของ address family นี้"""
+
+    @abstractmethod
+    def _address(self):
+        """address สำหรับ connect_ex"""
+
+    def connect(self):
+        sock = self._create_socket()
+        sock.settimeout(self.connect_timeout)
+        try:
+            sock.connect(self._address())
+        except Exception:
+            sock.close()
+            raise
+        sock.setblocking(False)
+        self.sock = sock
+
+        if self.event_driven:
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(sock, selectors.EVENT_READ)
+
+    def read(self, size: int = READ_CHUNK_SIZE) -> Optional[bytes]:
+        if self._selector is not None and not self._selector.select(self.idle_timeout):
+            return b""  # idle wakeup
+        try:
+            data = self.sock.recv(size)
+        except (BlockingIOError, InterruptedError):
+            return b""
+        # recv() คืน b"" เมื่ออีกฝั่งปิดการเชื่อมต่อ
+        return data if data else None
+
+    def close(self):
+        if self._selector is not None:
+            try:
+                self._selector.close()
+            except Exception:
+                pass
+            self._selector = None
+        if self.sock:
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+            self.sock = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.sock is not None
+
+
+class UnixSocketTransport(_SocketTransport):
+    """Unix domain socket client"""
+
+    name = "unix_socket"
+
+    def __init__(self, path: str = DEFAULT_UNIX_SOCKET_PATH, **kwargs):
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("Unix domain sockets are not supported on this platform")
+        super().__init__(**kwargs)
+        self.path = path
+
+    def _create_socket(self) -> socket.socket:
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    def _address(self):
+        return self.path
+
+    def describe(self) -> str:
+        return f"{self.name}:{self.path}"
+
+
+class TcpLoopbackTransport(_SocketTransport):
+    """TCP loopback client (ใช้ได้ทุก platform)"""
+
+    name = "tcp"
+
+    def __init__(self, host: str = DEFAULT_TCP_HOST, port: int = DEFAULT_TCP_PORT, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = int(port)
+
+    def _create_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _address(self):
+        return (self.host, self.port)
+
+    def describe(self) -> str:
+        return f"{self.name}:{self.host}:{self.port}"
+
+
+def resolve_transport_type(transport_type: str) -> str:
+    """แปลง 'auto' เป็นชนิด transport ที่ใช้ได้บน platform ปัจจุบัน"""
+    if transport_type != "auto":
+        return transport_type
+    if HAS_WIN32:
+        return "named_pipe"
+    if hasattr(socket, "AF_UNIX"):
+        return "unix_socket"
+    return "tcp"
+
+
+def merge_transport_config(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """DEFAULT_TRANSPORT_CONFIG ทับด้วยค่าที่ระบุ (ค่า None = ใช้ค่าเริ่มต้น)"""
+    merged = DEFAULT_TRANSPORT_CONFIG.copy()
+    if config:
+        merged.update({k: v for k, v in config.items() if v is not None})
+    return merged
+
+
+def create_transport(config: Optional[Dict[str, Any]] = None) -> BridgeTransport:
+    """
+    สร้าง transport จาก settings ("dalamud_transport")
+
+    Args:
+        config: dict ตาม DEFAULT_TRANSPORT_CONFIG (ค่าที่ไม่ระบุจะใช้ค่าเริ่มต้น)
+    """
+    cfg = merge_transport_config(config)
+    transport_type = resolve_transport_type(cfg["type"])
+    options = {
+        "connect_timeout": float(cfg["connect_timeout"]),
+        "event_driven": cfg["read_mode"] != READ_MODE_POLL,
+        "idle_timeout": float(cfg["idle_timeout"]),
+    }
+
+    if transport_type == "named_pipe":
+        return NamedPipeTransport(cfg["pipe_name"], **options)
+    if transport_type == "unix_socket":
+        return UnixSocketTransport(cfg["unix_socket_path"], **options)
+    if transport_type == "tcp":
+        return TcpLoopbackTransport(cfg["tcp_host"], cfg["tcp_port"], **options)
+    raise ValueError(f"Unknown Dalamud transport type: {transport_type}")
+
+
+class SocketTransportServer:
+    """
+    Server ฝั่งส่งข้อความสำหรับ Unix socket / TCP
+    ใช้แทน Dalamud plugin เวลาทดสอบหรือ replay stream บน Linux
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        cfg = merge_transport_config(config)
+        self.transport_type = resolve_transport_type(cfg["type"])
+        self.logger = logging.getLogger('SocketTransportServer')
+        self.client: Optional[socket.socket] = None
+
+        if self.transport_type == "unix_socket":
+            self.address = cfg["unix_socket_path"]
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        elif self.transport_type == "tcp":
+            self.address = (cfg["tcp_host"], int(cfg["tcp_port"]))
+            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        else:
+            raise ValueError(f"SocketTransportServer does not support '{self.transport_type}'")
+
+        self.server.bind(self.address)
+        self.server.listen(1)
+
+    def accept(self, timeout: Optional[float] = None) -> bool:
+        """รอ client (DalamudBridge) เชื่อมต่อ"""
+        self.server.settimeout(timeout)
+        try:
+            self.client, _ = self.server.accept()
+        except socket.timeout:
+            return False
+        if self.transport_type == "tcp":
+            self.client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.logger.info(f"Client connected via {self.transport_type}")
+        return True
+
+    def send(self, data: bytes):
+        """ส่งข้อมูล raw ไปยัง client"""
+        self.client.sendall(data)
+
+    def send_line(self, line: str):
+        """ส่งหนึ่งบรรทัด (เหมือน WriteLineAsync ฝั่ง plugin)"""
+        self.client.sendall(line.encode('utf-8') + b'\n')
+
+    def close(self):
+        for sock in (self.client, self.server):
+            if sock:
+                try:
+                    sock.close()
+                except Exception:
+                    pass
+        self.client = None
+        if self.transport_type == "unix_socket" and os.path.exists(self.address):
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
@@ -0,0 +1,390 @@
+"""
+MBB Dalamud Workers - thread pool ขนาดคงที่สำหรับงานแปลของ DalamudImmediateHandler
+Fixed-size translation worker pool with a bounded priority job queue
+
+แทนการสร้าง thread ใหม่ต่อข้อความ: worker N ตัวถูกสร้างครั้งแรกที่มีงานแล้วใช้ซ้ำ
+submit() ไม่บล็อก - ถ้าคิวเต็มจะใช้กฎ preemption เลือกงานที่จะทิ้ง
+และเรียก on_drop ของงานนั้นเพื่อ cleanup
+
+งานถูกจัดคิวแยกตาม message class (story > choice > battle > other) - worker หยิบงาน
+ของ class ที่สูงที่สุดก่อนเสมอ งานของ class ต่ำที่รอนานเกิน max_age_s จะหมดอายุและถูกทิ้ง
+(ข้อความระบบ/battle ที่ค้างนานไม่มีประโยชน์ที่จะแปลแล้ว)
+
+Preemption (ใช้เมื่อคิวเต็ม):
+    drop_lowest     - ทิ้งงานเก่าสุดของ class ต่ำสุด (ถ้างานใหม่ต่ำกว่าทุกงานในคิว ทิ้งงานใหม่)
+    drop_oldest     - ทิ้งงานที่รอนานที่สุดโดยไม่สนใจ class
+    reject_incoming - ไม่รับงานใหม่
+
+เวลารอคิว (queue wait) และเวลาทำงาน (run = เวลาเรียก API + post-process) ถูกนับแยกกัน
+และเวลารอคิว/ความลึกของคิวถูกรายงานแยกตาม class ด้วย
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from dalamud_ingress import PRIORITY_NAMES, PRIORITY_OTHER
+
+PREEMPT_DROP_LOWEST = "drop_lowest"
+PREEMPT_DROP_OLDEST = "drop_oldest"
+PREEMPT_REJECT_INCOMING = "reject_incoming"
+PREEMPTION_RULES = (PREEMPT_DROP_LOWEST, PREEMPT_DROP_OLDEST, PREEMPT_REJECT_INCOMING)
+
+DEFAULT_WORKER_CONFIG = {
+    "concurrency": 2,
+    "queue_size": 16,
+}
+
+DEFAULT_SCHEDULER_CONFIG = {
+    "preemption": PREEMPT_DROP_LOWEST,
+    # อายุสูงสุด (วินาที) ที่งานของแต่ละ class รอในคิวได้ - None = ไม่หมดอายุ
+    "max_age_s": {
+        "story": None,
+        "choice": 30.0,
+        "battle": 5.0,
+        "other": 5.0,
+    },
+}
+
+
+class TranslationJob:
+    """งานหนึ่งชิ้นในคิว"""
+
+    __slots__ = ("func", "args", "on_drop", "tag", "priority", "enqueued_at")
+
+    def __init__(self, func: Callable, args: tuple, on_drop: Optional[Callable[[], None]], tag: Optional[str],
+                 priority: int = PRIORITY_OTHER):
+        self.func = func
+        self.args = args
+        self.on_drop = on_drop
+        self.tag = tag              # ใช้เลือกงานที่จะ clear() (เช่น latest_wins / ordered)
+        self.priority = priority    # message class (PRIORITY_* ใน dalamud_ingress)
+        self.enqueued_at = time.perf_counter()
+
+
+class PriorityJobQueue:
+    """
+    คิวงานแยกตาม class + aging + preemption (ไม่ thread-safe - ผู้ใช้ต้องถือ lock เอง)
+
+    ใช้ร่วมกันทั้ง TranslationWorkerPool (threaded) และ AsyncDalamudHandler (event loop เดียว)
+    """
+
+    def __init__(self, capacity: int = 16, scheduler: Optional[Dict[str, Any]] = None):
+        config = {**DEFAULT_SCHEDULER_CONFIG, **(scheduler or {})}
+        if config["preemption"] not in PREEMPTION_RULES:
+            raise ValueError(f"Unknown preemption rule: {config['preemption']}")
+        self.capacity = max(1, int(capacity))
+        self.preemption = config["preemption"]
+        max_age = {**DEFAULT_SCHEDULER_CONFIG["max_age_s"], **(config.get("max_age_s") or {})}
+        self.max_age_s = {
+            priority: (float(max_age[name]) if max_age.get(name) else None)
+            for priority, name in PRIORITY_NAMES.items()
+        }
+
+        # priority สูงก่อน
+        self._order = sorted(PRIORITY_NAMES, reverse=True)
+        self._queues: Dict[int, deque] = {priority: deque() for priority in self._order}
+        self._size = 0
+        self.class_stats = self._empty_class_stats()
+
+    @staticmethod
+    def _empty_class_stats() -> Dict[int, Dict[str, float]]:
+        return {
+            priority: {
+                'submitted': 0,
+                'started': 0,
+                'preempted': 0,
+                'aged_out': 0,
+                'max_depth': 0,
+                'wait_total_ms': 0.0,
+                'wait_max_ms': 0.0,
+            }
+            for priority in PRIORITY_NAMES
+        }
+
+    def __len__(self):
+        return self._size
+
+    def push(self, job: TranslationJob) -> List[TranslationJob]:
+        """
+        เพิ่มงาน - คืนรายการงานที่ถูกทิ้ง (หมดอายุ / ถูก preempt / งานใหม่ถูกปฏิเสธ)
+        """
+        dropped = self.expire()
+        priority = job.priority if job.priority in self._queues else PRIORITY_OTHER
+        job.priority = priority
+        stats = self.class_stats[priority]
+        stats['submitted'] += 1
+
+        if self._size >= self.capacity:
+            victim = self._select_victim(priority)
+            if victim is None:
+                stats['preempted'] += 1
+                dropped.append(job)
+                return dropped
+            self._queues[victim.priority].remove(victim)
+            self._size -= 1
+            self.class_stats[victim.priority]['preempted'] += 1
+            dropped.append(victim)
+
+        queue = self._queues[priority]
+        queue.append(job)
+        self._size += 1
+        if len(queue) > stats['max_depth']:
+            stats['max_depth'] = len(queue)
+        return dropped
+
+    def _select_victim(self, incoming_priority: int) -> Optional[TranslationJob]:
+        if self.preemption == PREEMPT_REJECT_INCOMING:
+            return None
+        if self.preemption == PREEMPT_DROP_OLDEST:
+            heads = [queue[0] for queue in self._queues.values() if queue]
+            return min(heads, key=lambda job: job.enqueued_at)
+        for priority in reversed(self._order):
+            queue = self._queues[priority]
+            if queue:
+                # งานใหม่ priority ต่ำกว่าทุกงานที่รออยู่ - ทิ้งงานใหม่แทน
+                return queue[0] if priority <= incoming_priority else None
+        return None
+
+    def pop(self):
+        """
+        หยิบงานของ class สูงสุด
+
+        Returns:
+            (job หรือ None, รายการงานที่หมดอายุระหว่างนี้)
+        """
+        expired = self.expire()
+        for priority in self._order:
+            queue = self._queues[priority]
+            if queue:
+                job = queue.popleft()
+                self._size -= 1
+                wait_ms = (time.perf_counter() - job.enqueued_at) * 1000.0
+                stats = self.class_stats[priority]
+                stats['started'] += 1
+                stats['wait_total_ms'] += wait_ms
+                if wait_ms > stats['wait_max_ms']:
+                    stats['wait_max_ms'] = wait_ms
+                return job, expired
+        return None, expired
+
+    def expire(self) -> List[TranslationJob]:
+        """ทิ้งงานที่รอนานเกิน max_age_s ของ class (งานเก่าสุดอยู่หัวคิวเสมอ)"""
+        expired = []
+        now = time.perf_counter()
+        for priority, queue in self._queues.items():
+            max_age = self.max_age_s[priority]
+            if max_age is None:
+                continue
+            while queue and now - queue[0].enqueued_at > max_age:
+                expired.append(queue.popleft())
+                self._size -= 1
+                self.class_stats[priority]['aged_out'] += 1
+        return expired
+
+    def remove(self, predicate: Callable[[TranslationJob], bool]) -> List[TranslationJob]:
+        """เอางานที่ตรงเงื่อนไขออกจากคิว (ไม่นับเป็น preempt)"""
+        removed = []
+        for priority, queue in self._queues.items():
+            matched = [job for job in queue if predicate(job)]
+            if matched:
+                self._queues[priority] = deque(job for job in queue if not predicate(job))
+                removed.extend(matched)
+        self._size -= len(removed)
+        return removed
+
+    def reset_stats(self):
+        self.class_stats = self._empty_class_stats()
+
+    def get_class_stats(self) -> Dict[str, Dict[str, Any]]:
+        """ความลึกของคิวและเวลารอแยกตาม class"""
+        result = {}
+        for priority in self._order:
+            stats = self.class_stats[priority]
+            started = stats['started']
+            result[PRIORITY_NAMES[priority]] = {
+                'depth': len(self._queues[priority]),
+                'max_depth': stats['max_depth'],
+                'submitted': stats['submitted'],
+                'started': started,
+                'preempted': stats['preempted'],
+                'aged_out': stats['aged_out'],
+                'wait_avg_ms': round(stats['wait_total_ms'] / started, 2) if started else 0.0,
+                'wait_max_ms': round(stats['wait_max_ms'], 2),
+            }
+        return result
+
+
+class TranslationWorkerPool:
+    """Worker threads ที่ใช้ซ้ำ + bounded priority queue"""
+
+    def __init__(self, concurrency: int = 2, queue_size: int = 16, name: str = "ImmediateTranslate",
+                 scheduler: Optional[Dict[str, Any]] = None):
+        self.concurrency = max(1, int(concurrency))
+        self.queue_size = max(1, int(queue_size))
+        self.name = name
+        self.logger = logging.getLogger('TranslationWorkerPool')
+
+        self._jobs = PriorityJobQueue(self.queue_size, scheduler)
+        self._cond = threading.Condition()
+        self._workers = []
+        self._active = 0
+        self._closed = False
+
+        self.stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'dropped': 0,
+            'max_depth': 0,
+            'queue_wait_total_ms': 0.0,
+            'queue_wait_max_ms': 0.0,
+            'run_total_ms': 0.0,
+            'run_max_ms': 0.0,
+        }
+
+    def submit(self, func: Callable, *args, on_drop: Optional[Callable[[], None]] = None,
+               tag: Optional[str] = None, priority: int = PRIORITY_OTHER) -> bool:
+        """
+        เพิ่มงานเข้าคิวโดยไม่บล็อก
+
+        Returns:
+            False ถ้า pool ถูกปิดแล้ว (งานไม่ถูกรัน และ on_drop ไม่ถูกเรียก)
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            dropped = self._jobs.push(TranslationJob(func, args, on_drop, tag, priority))
+            self.stats['submitted'] += 1
+            self.stats['dropped'] += len(dropped)
+            depth = len(self._jobs)
+            if depth > self.stats['max_depth']:
+                self.stats['max_depth'] = depth
+
+            # สร้าง worker เพิ่มเฉพาะเมื่อทุกตัวที่มีอยู่กำลังทำงานและยังไม่ถึง concurrency
+            if len(self._workers) < self.concurrency and self._active + depth > len(self._workers):
+                self._spawn_worker()
+            self._cond.notify()
+
+        if dropped:
+            self.logger.info(f"[WORKER POOL] queue full/stale ({self.queue_size}) - dropped {len(dropped)} pending translation(s)")
+            self._run_drops(dropped)
+        return True
+
+    def clear(self, tag: Optional[str] = None, max_priority: Optional[int] = None) -> int:
+        """
+        ทิ้งงานที่ยังรออยู่และเรียก on_drop - คืนจำนวนที่ทิ้ง
+
+        Args:
+            tag: ทิ้งเฉพาะงานที่มี tag นี้ (None = ทุกงาน)
+            max_priority: ทิ้งเฉพาะงานที่ priority ไม่เกินค่านี้ (None = ทุก class)
+        """
+        with self._cond:
+            pending = self._jobs.remove(
+                lambda job: (tag is None or job.tag == tag)
+                and (max_priority is None or job.priority <= max_priority)
+            )
+            self.stats['dropped'] += len(pending)
+        self._run_drops(pending)
+        return len(pending)
+
+    def shutdown(self):
+        """ปิด pool: ทิ้งงานที่รออยู่และให้ worker จบหลังงานปัจจุบัน"""
+        self.clear()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _spawn_worker(self):
+        index = len(self._workers) + 1
+        worker = threading.Thread(target=self._worker_loop, daemon=True, name=f"{self.name}-{index}")
+        self._workers.append(worker)
+        worker.start()
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not len(self._jobs) and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job, expired = self._jobs.pop()
+                self.stats['dropped'] += len(expired)
+                if job is not None:
+                    self._active += 1
+
+            if expired:
+                self._run_drops(expired)
+            if job is None:
+                continue
+
+            started = time.perf_counter()
+            wait_ms = (started - job.enqueued_at) * 1000.0
+            failed = False
+            try:
+                job.func(*job.args)
+            except Exception as e:
+                failed = True
+                self.logger.error(f"[WORKER POOL] job error: {e}")
+            run_ms = (time.perf_counter() - started) * 1000.0
+
+            with self._cond:
+                self._active -= 1
+                stats = self.stats
+                stats['failed' if failed else 'completed'] += 1
+                stats['queue_wait_total_ms'] += wait_ms
+                stats['run_total_ms'] += run_ms
+                if wait_ms > stats['queue_wait_max_ms']:
+                    stats['queue_wait_max_ms'] = wait_ms
+                if run_ms > stats['run_max_ms']:
+                    stats['run_max_ms'] = run_ms
+
+    def _run_drops(self, jobs: List[TranslationJob]):
+        for job in jobs:
+            self._run_drop(job)
+
+    def _run_drop(self, job: TranslationJob):
+        if job.on_drop is None:
+            return
+        try:
+            job.on_drop()
+        except Exception as e:
+            self.logger.error(f"[WORKER POOL] on_drop error: {e}")
+
+    def reset_stats(self):
+        with self._cond:
+            self.stats = self._empty_stats()
+            self._jobs.reset_stats()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self.stats)
+            depth = len(self._jobs)
+            active = self._active
+            workers = len(self._workers)
+            classes = self._jobs.get_class_stats()
+        finished = stats['completed'] + stats['failed']
+        return {
+            'concurrency': self.concurrency,
+            'queue_size': self.queue_size,
+            'preemption': self._jobs.preemption,
+            'workers': workers,
+            'active': active,
+            'depth': depth,
+            'submitted': stats['submitted'],
+            'completed': stats['completed'],
+            'failed': stats['failed'],
+            'dropped': stats['dropped'],
+            'max_depth': stats['max_depth'],
+            'queue_wait_avg_ms': round(stats['queue_wait_total_ms'] / finished, 2) if finished else 0.0,
+            'queue_wait_max_ms': round(stats['queue_wait_max_ms'], 2),
+            'run_avg_ms': round(stats['run_total_ms'] / finished, 2) if finished else 0.0,
+            'run_max_ms': round(stats['run_max_ms'], 2),
+            'classes': classes,  # depth / wait ต่อ message class
+        }
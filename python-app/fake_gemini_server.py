@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+MBB Fake Gemini Server - Gemini REST endpoint ปลอมในเครื่องสำหรับทดสอบ rate limit / retry / quota
+Local stand-in for generativelanguage.googleapis.com (v1beta generateContent)
+
+ตอบ POST /v1beta/models/<model>:generateContent และ :streamGenerateContent ด้วย JSON รูปแบบเดียวกับ API จริง
+(candidates + usageMetadata) และจำลองความผิดพลาดที่ gemini_guard ต้องรับมือ:
+    --latency-ms      เวลาตอบต่อ request
+    --error-rate      สัดส่วน 503 UNAVAILABLE แบบสุ่ม
+    --rpm             จำกัด request/นาที ฝั่ง server - เกินแล้วตอบ 429 พร้อม "Please retry in Ns"
+    --daily-quota     หลังตอบสำเร็จครบ N ครั้ง ตอบ 429 quota รายวันตลอด
+
+ใช้กับ MBB จริง (google-generativeai ผ่าน REST transport):
+    python fake_gemini_server.py --port 8765 --rpm 10
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765 python MBB.py
+
+Usage:
+    python fake_gemini_server.py [--port N] [--latency-ms MS] [--error-rate P] [--rpm N] [--daily-quota N]
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+_PATH_RE = re.compile(r"^/v1(?:beta)?/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)")
+
+logger = logging.getLogger('FakeGemini')
+
+
+class FakeGeminiBehaviour:
+    """สถานะและกติกาความผิดพลาดที่ใช้ร่วมกันทุก request"""
+
+    def __init__(self, latency_ms: float = 0, error_rate: float = 0.0, rpm: int = 0,
+                 daily_quota: int = 0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.daily_quota = daily_quota
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self.stats = {'requests': 0, 'ok': 0, 'unavailable': 0, 'rate_limited': 0, 'quota_exhausted': 0}
+
+    def decide(self):
+        """(status, error message) ของ request นี้ - (200, None) ถ้าตอบปกติ"""
+        with self._lock:
+            self.stats['requests'] += 1
+            now = time.monotonic()
+            if self.daily_quota and self.stats['ok'] >= self.daily_quota:
+                self.stats['quota_exhausted'] += 1
+                return 429, ("You exceeded your current quota, please check your plan and billing details. "
+                             "Quota: GenerateRequestsPerDayPerProjectPerModel")
+            if self.rpm:
+                while self._recent and now - self._recent[0] >= 60:
+                    self._recent.popleft()
+                if len(self._recent) >= self.rpm:
+                    retry_in = 60 - (now - self._recent[0])
+                    self.stats['rate_limited'] += 1
+                    return 429, f"Resource has been exhausted (e.g. check quota). Please retry in {retry_in:.1f}s."
+                self._recent.append(now)
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.stats['unavailable'] += 1
+                return 503, "The model is overloaded. Please try again later."
+            self.stats['ok'] += 1
+            return 200, None
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    parts = []
+    for content in body.get("contents", ()):
+        for part in content.get("parts", ()):
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+def fake_translation(prompt: str) -> str:
+    """คำตอบปลอม: batch JSON ตอบเป็น array ตาม id, ข้อความเดี่ยวตอบ [TH] <ข้อความที่จะแปล>"""
+    last_line = prompt.rstrip().rsplit("\n", 1)[-1]
+    if last_line.startswith("["):
+        try:
+            items = json.loads(last_line)
+            return json.dumps([{"id": item["id"], "translation": f"[TH] {item['text']}"} for item in items],
+                              ensure_ascii=False)
+        except (ValueError, KeyError, TypeError):
+            pass
+    marker = "Text to translate:"
+    text = prompt.rsplit(marker, 1)[-1] if marker in prompt else last_line
+    return f"[TH] {text.strip()}"
+
+
+def _error_status(code: int) -> str:
+    return {429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE"}.get(code, "UNKNOWN")
+
+
+def make_handler(behaviour: FakeGeminiBehaviour):
+    class FakeGeminiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            logger.debug(fmt % args)
+
+        def _send_json(self, status: int, payload: Any, content_type: str = "application/json"):
+            data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            match = _PATH_RE.match(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not match:
+                self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}", "status": "NOT_FOUND"}})
+                return
+
+            if behaviour.latency_ms:
+                time.sleep(behaviour.latency_ms / 1000)
+            status, message = behaviour.decide()
+            if status != 200:
+                self._send_json(status, {"error": {"code": status, "message": message, "status": _error_status(status)}})
+                return
+
+            prompt = _prompt_text(body)
+            text = fake_translation(prompt)
+            response = {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": max(1, len(prompt) // 4),
+                    "candidatesTokenCount": max(1, len(text) // 4),
+                    "totalTokenCount": max(1, len(prompt) // 4) + max(1, len(text) // 4),
+                },
+                "modelVersion": match.group("model"),
+            }
+            if match.group("method") == "generateContent":
+                self._send_json(200, response)
+            elif "alt=sse" in self.path:
+                self._send_json(200, f"data: {json.dumps(response, ensure_ascii=False)}\r\n\r\n".encode("utf-8"),
+                                "text/event-stream")
+            else:
+                self._send_json(200, [response])
+
+    return FakeGeminiHandler
+
+
+class FakeGeminiServer:
+    """ThreadingHTTPServer ใน thread แยก - ใช้จาก benchmark หรือสคริปต์ทดสอบ"""
+
+    def __init__(self, behaviour: Optional[FakeGeminiBehaviour] = None, host: str = "127.0.0.1", port: int = 0):
+        self.behaviour = behaviour or FakeGeminiBehaviour()
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.behaviour))
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGeminiServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="FakeGemini", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeApiError(Exception):
+    """HTTP error จาก endpoint - มี .code แบบเดียวกับ google.api_core.exceptions"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class _Response:
+    def __init__(self, payload: Dict[str, Any]):
+        self.text = payload["candidates"][0]["content"]["parts"][0]["text"]
+        usage = payload.get("usageMetadata", {})
+        self.usage_metadata = type("UsageMetadata", (), {
+            "prompt_token_count": usage.get("promptTokenCount"),
+            "candidates_token_count": usage.get("candidatesTokenCount"),
+        })()
+
+
+class EndpointModel:
+    """Client ขั้นต่ำ (urllib) ที่มี generate_content แบบ GenerativeModel - ใช้ทดสอบโดยไม่ต้องมี SDK"""
+
+    def __init__(self, base_url: str, model_name: str = "gemini-2.0-flash", timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.timeout = timeout
+
+    def generate_content(self, contents, **kwargs):
+        if isinstance(contents, str):
+            contents = [{"role": "user", "parts": [{"text": contents}]}]
+        request = urllib.request.Request(
+            f"{self.base_url}/v1beta/models/{self.model_name}:generateContent",
+            data=json.dumps({"contents": contents}, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return _Response(json.loads(response.read()))
+        except urllib.error.HTTPError as e:
+            error = json.loads(e.read() or b"{}").get("error", {})
+            raise FakeApiError(e.code, error.get("message", e.reason)) from None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Gemini REST endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=0)
+    parser.add_argument("--daily-quota", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(message)s")
+    behaviour = FakeGeminiBehaviour(args.latency_ms, args.error_rate, args.rpm, args.daily_quota)
+    server = FakeGeminiServer(behaviour, args.host, args.port)
+    print(f"Fake Gemini endpoint on {server.url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"Stats: {behaviour.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""
+MBB Gemini Guard - rate limit, retry และ circuit breaker ของทุก call ไป Gemini
+Client-side token-bucket rate limiting + adaptive retry policy + quota circuit breaker
+
+เดิม translate() เจอ error อะไรก็ตามจะเรียกซ้ำอีกครั้งด้วย message format อื่นแล้วยอมแพ้ -
+ไม่มีการจำกัดอัตรา และ 429/quota ทำให้ยิงซ้ำใส่ API ที่ปฏิเสธอยู่แล้ว
+
+GuardedModel ครอบ genai.GenerativeModel (generate_content มี signature เดิม) ทุก call ผ่าน:
+    1. CircuitBreaker - quota หมด (429 ที่บอกให้รอนาน/รายวัน) เปิดวงจร: call ถัดไป fail fast
+       ด้วย QuotaExhaustedError จนครบ cooldown แล้วปล่อย probe ทีละ call (half-open)
+    2. RateLimiter - token bucket สองถัง: requests/min และ input tokens/min
+       (จองล่วงหน้าแล้วรอ - ถ้าต้องรอเกิน max_wait_s จะ raise RateLimitedError แทนการค้าง TUI)
+    3. RetryPolicy - exponential backoff + full jitter เฉพาะ error ที่ retry ได้
+       (429 ชั่วคราว, 408/500/502/503/504, timeout/connection) ใช้ retry delay ที่ server บอกถ้ามี
+       error ถาวร (400/401/403/404, prompt ถูก block) ส่งต่อทันที
+
+ทดสอบกับ endpoint ปลอมในเครื่องได้ด้วย fake_gemini_server.py (ตั้ง GEMINI_API_ENDPOINT)
+"""
+
+import re
+import time
+import random
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from prompt_budget import estimate_tokens
+
+logger = logging.getLogger('GeminiGuard')
+
+ERROR_RETRYABLE = "retryable"
+ERROR_QUOTA = "quota"
+ERROR_FATAL = "fatal"
+
+DEFAULT_GEMINI_GUARD_CONFIG = {
+    "requests_per_min": 60,
+    "tokens_per_min": 1000000,
+    "max_wait_s": 10.0,
+    "max_attempts": 4,
+    "base_delay_s": 0.5,
+    "max_delay_s": 8.0,
+    "quota_cooldown_s": 60.0,
+}
+
+_RETRYABLE_CODES = frozenset((408, 500, 502, 503, 504))
+_FATAL_CODES = frozenset((400, 401, 403, 404))
+_RETRYABLE_NAMES = frozenset((
+    "DeadlineExceeded", "ServiceUnavailable", "InternalServerError", "BadGateway",
+    "GatewayTimeout", "RetryError", "Aborted", "TimeoutError", "ConnectionError",
+    "ReadTimeout", "ConnectTimeout", "RemoteDisconnected",
+))
+_QUOTA_NAMES = frozenset(("ResourceExhausted", "TooManyRequests"))
+# quota รายวัน/ตาม billing - รอ backoff ไม่ช่วย
+_DAILY_QUOTA_RE = re.compile(r"PerDay|per day|billing", re.IGNORECASE)
+# "retry_delay { seconds: 23 }" (grpc/rest details) หรือ "Please retry in 23.5s"
+_RETRY_HINT_RE = re.compile(r"retry(?:_delay|Delay)?\W+(?:in\W+|seconds\W+)?(\d+(?:\.\d+)?)\s*s?", re.IGNORECASE)
+
+
+class RateLimitedError(RuntimeError):
+    """ต้องรอ rate limiter นานเกิน max_wait_s"""
+
+
+class QuotaExhaustedError(RuntimeError):
+    """Circuit breaker เปิดอยู่เพราะ quota หมด - ไม่ได้ส่ง request"""
+
+    def __init__(self, retry_in_s: float):
+        super().__init__(f"Gemini quota exhausted - retry in {retry_in_s:.0f}s")
+        self.retry_in_s = retry_in_s
+
+
+def _error_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "code", None)
+    if callable(code):  # grpc.RpcError.code() คืน enum
+        return None
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(exc: BaseException) -> str:
+    """ERROR_QUOTA (429), ERROR_RETRYABLE หรือ ERROR_FATAL"""
+    if isinstance(exc, (QuotaExhaustedError, RateLimitedError)):
+        return ERROR_QUOTA
+    code = _error_code(exc)
+    name = type(exc).__name__
+    if code == 429 or name in _QUOTA_NAMES:
+        return ERROR_QUOTA
+    if code in _RETRYABLE_CODES or name in _RETRYABLE_NAMES:
+        return ERROR_RETRYABLE
+    if code in _FATAL_CODES:
+        return ERROR_FATAL
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return ERROR_RETRYABLE
+    return ERROR_FATAL
+
+
+def retry_hint(exc: BaseException) -> Optional[float]:
+    """เวลาที่ server ขอให้รอ (วินาที) ถ้าระบุไว้ใน error"""
+    match = _RETRY_HINT_RE.search(str(exc))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """ถังเดียว: เติม rate_per_s ต่อวินาที จุสูงสุด capacity - ยอมติดลบเพื่อจองคิว (caller รอชดใช้)"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, float(per_minute))
+        self.rate_per_s = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate_per_s)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """วินาทีที่ต้องรอก่อนใช้ amount ได้ (หลัง refill)"""
+        amount = min(amount, self.capacity)
+        deficit = amount - self.level
+        return deficit / self.rate_per_s if deficit > 0 else 0.0
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """requests/min + tokens/min (จองทั้งสองถังพร้อมกันแล้วรอนอก lock)"""
+
+    def __init__(self, requests_per_min: float, tokens_per_min: float, max_wait_s: float = 10.0):
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min)
+        self.max_wait_s = float(max_wait_s)
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> float:
+        """จองหนึ่ง request + tokens แล้วรอจนถึงคิว - คืนเวลาที่รอ"""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(self.requests.wait_for(1), self.tokens.wait_for(tokens))
+            if wait > self.max_wait_s:
+                raise RateLimitedError(f"Client rate limit: would wait {wait:.1f}s")
+            self.requests.take(1)
+            self.tokens.take(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RetryPolicy:
+    """Exponential backoff + full jitter"""
+
+    def __init__(self, max_attempts: int = 4, base_delay_s: float = 0.5, max_delay_s: float = 8.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay_s = float(base_delay_s)
+        self.max_delay_s = float(max_delay_s)
+
+    def delay(self, attempt: int, hint: Optional[float] = None) -> float:
+        """เวลารอก่อน attempt ถัดไป (attempt นับจาก 1)"""
+        ceiling = min(self.max_delay_s, self.base_delay_s * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        return max(delay, hint) if hint else delay
+
+
+class CircuitBreaker:
+    """closed -> open (quota หมด) -> half_open (probe หนึ่ง call) -> closed"""
+
+    def __init__(self, cooldown_s: float = 60.0):
+        self.cooldown_s = float(cooldown_s)
+        self.state = "closed"
+        self.open_until = 0.0
+        self.opens = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """raise QuotaExhaustedError ถ้ายังไม่ควรส่ง request"""
+        with self._lock:
+            if self.state == "closed":
+                return
+            now = time.monotonic()
+            if now < self.open_until:
+                raise QuotaExhaustedError(self.open_until - now)
+            if self._probing:
+                raise QuotaExhaustedError(0)
+            self.state = "half_open"
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Gemini quota available again - circuit closed")
+            self.state = "closed"
+            self._probing = False
+
+    def record_failure(self):
+        """call ที่ได้สิทธิ์ probe ล้มด้วย error อื่น - ปล่อย probe ถัดไปได้"""
+        with self._lock:
+            self._probing = False
+
+    def trip(self, cooldown_s: Optional[float] = None):
+        with self._lock:
+            cooldown = max(self.cooldown_s, cooldown_s or 0)
+            self.open_until = max(self.open_until, time.monotonic() + cooldown)
+            was_open = self.state == "open"
+            self.state = "open"
+            self._probing = False
+            if was_open:
+                return  # worker อื่นที่ส่งไปก่อนวงจรเปิดเจอ 429 ตามมา
+            self.opens += 1
+        logger.warning(f"Gemini quota exhausted - failing fast for {cooldown:.0f}s")
+
+
+class GeminiGuard:
+    """นโยบายรวมที่ใช้ร่วมกันทุก model/translator (quota ผูกกับ API key ไม่ใช่ instance)"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.configure(config)
+
+    def configure(self, config: Optional[Dict[str, Any]] = None):
+        config = {**DEFAULT_GEMINI_GUARD_CONFIG, **(config or {})}
+        self.limiter = RateLimiter(config["requests_per_min"], config["tokens_per_min"], config["max_wait_s"])
+        self.retry = RetryPolicy(config["max_attempts"], config["base_delay_s"], config["max_delay_s"])
+        self.breaker = CircuitBreaker(config["quota_cooldown_s"])
+        self._lock = threading.Lock()
+        self.stats = {
+            'calls': 0,
+            'attempts': 0,
+            'retries': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'failed_fast': 0,
+            'rate_limited': 0,
+            'limiter_wait_s': 0.0,
+            'errors': {ERROR_RETRYABLE: 0, ERROR_QUOTA: 0, ERROR_FATAL: 0},
+        }
+
+    def _count(self, key: str, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def call(self, fn: Callable[..., Any], *args, tokens: int = 0, **kwargs):
+        """เรียก fn ภายใต้ rate limit / retry / circuit breaker"""
+        self._count('calls')
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.breaker.before_call()
+            except QuotaExhaustedError:
+                self._count('failed_fast')
+                self._count('failed')
+                raise
+            try:
+                waited = self.limiter.acquire(tokens)
+            except RateLimitedError:
+                self.breaker.record_failure()
+                self._count('rate_limited')
+                self._count('failed')
+                raise
+            if waited:
+                self._count('limiter_wait_s', waited)
+
+            self._count('attempts')
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                with self._lock:
+                    self.stats['errors'][kind] += 1
+                hint = retry_hint(e)
+
+                if kind == ERROR_QUOTA and (
+                    _DAILY_QUOTA_RE.search(str(e)) or (hint or 0) > self.retry.max_delay_s
+                ):
+                    self.breaker.trip(hint)
+                    self._count('failed')
+                    raise
+                self.breaker.record_failure()
+                if kind == ERROR_FATAL or attempt >= self.retry.max_attempts:
+                    if kind == ERROR_QUOTA:
+                        # 429 ซ้ำจนหมดรอบ retry - พักทั้ง client แทนการยิงซ้ำจาก worker อื่น
+                        self.breaker.trip(hint)
+                    self._count('failed')
+                    raise
+
+                delay = self.retry.delay(attempt, hint)
+                self._count('retries')
+                logger.warning(
+                    f"Gemini {kind} error (attempt {attempt}/{self.retry.max_attempts}), "
+                    f"retrying in {delay:.2f}s: {e}"
+                )
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self._count('succeeded')
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['errors'] = dict(self.stats['errors'])
+        stats['limiter_wait_s'] = round(stats['limiter_wait_s'], 3)
+        stats['breaker_state'] = self.breaker.state
+        stats['breaker_opens'] = self.breaker.opens
+        return stats
+
+
+def _contents_text(contents: Any) -> str:
+    """ข้อความใน contents ของ generate_content (str หรือ [{"role", "parts"}])"""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        return "".join(_contents_text(part) for part in contents.get("parts", ()))
+    if isinstance(contents, (list, tuple)):
+        return "".join(_contents_text(part) for part in contents)
+    return ""
+
+
+class GuardedModel:
+    """ครอบ genai.GenerativeModel - generate_content ผ่าน GeminiGuard, attribute อื่นส่งต่อ"""
+
+    def __init__(self, model: Any, guard: Optional["GeminiGuard"] = None):
+        self.model = model
+        self.guard = guard or get_gemini_guard()
+
+    def generate_content(self, contents, **kwargs):
+        tokens = estimate_tokens(_contents_text(contents))
+        return self.guard.call(self.model.generate_content, contents, tokens=tokens, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+_guard = GeminiGuard()
+
+
+def get_gemini_guard() -> GeminiGuard:
+    """Guard ที่ใช้ร่วมกันทั้งโปรแกรม"""
+    return _guard
+
+
+def configure_gemini_guard(config: Optional[Dict[str, Any]] = None) -> GeminiGuard:
+    """ตั้งค่า guard กลางจาก setting 'gemini_client'"""
+    _guard.configure(config)
+    return _guard
@@ -0,0 +1,294 @@
+"""
+MBB Gemini Hedge - ตัด tail latency ด้วย hedged request ไปยัง model ที่เร็วกว่า
+Hedged requests with model fallback
+
+Response ของ Gemini ช้าเป็นบางครั้ง (หลายวินาที) และบรรทัดนั้นค้างอยู่บน TUI ทั้งหมด
+HedgedModel ส่ง request ไป model หลักก่อน - ถ้ายังไม่ตอบภายใน latency percentile ที่ตั้งไว้ (p90)
+ของ model หลักในช่วงล่าสุด จะยิง request ซ้ำไป model สำรองที่เร็วกว่า (เช่น flash-lite)
+แล้วใช้ผลที่ได้ก่อน อีกฝั่งถูกยกเลิก (ถ้ายังไม่เริ่ม) หรือถูกทิ้งผลเมื่อตอบกลับมา
+
+request หลักกับ hedge ใช้ thread pool แยกกัน - request หลักที่ช้าและถูกทิ้งยังถือ worker จนกว่าจะตอบ
+ถ้าใช้ pool เดียว hedge จะต่อคิวหลัง request ที่มันควรจะแซง; request หลักที่ค้างอยู่จำกัดไว้
+MAX_INFLIGHT_PRIMARIES - เกินแล้วเรียกตรงใน thread ผู้เรียกโดยไม่ hedge (ไม่ต่อคิวใน pool)
+
+ผลจาก model สำรองไม่ปนกับ cache ของ model หลัก: ผู้เรียกครอบการแปลด้วย served_model_scope()
+แล้วเก็บผลด้วย hedge_cache_key(key, model) - key แยกที่ผูกกับ model ที่ตอบจริง
+
+stream=True (บทพูด/cutscene ที่ขึ้น TUI ทีละประโยค) hedge ด้วยเวลาถึง chunk แรก: call ถือว่าตอบแล้ว
+เมื่อได้ chunk แรก (PrefetchedStream) - delay มาจาก percentile ของเวลาถึง chunk แรกซึ่งเก็บแยกจาก
+latency ของ call ที่ไม่ stream (คนละการกระจาย) ฝั่งที่ได้ chunk แรกก่อนเป็นผู้ stream ต่อจนจบ
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from translation_store import stable_cache_key
+
+logger = logging.getLogger('GeminiHedge')
+
+DEFAULT_HEDGING_CONFIG = {
+    "enabled": False,
+    "model": "gemini-2.0-flash-lite",
+    "quantile": 0.9,  # hedge เมื่อช้ากว่า percentile นี้ของ model หลัก
+    "min_samples": 20,  # ยังไม่ hedge จนกว่าจะมี latency พอคำนวณ percentile
+    "min_delay_ms": 300,
+    "max_delay_ms": 5000,
+    "window": 200,
+}
+
+MAX_INFLIGHT_PRIMARIES = 32
+
+_primary_executor = ThreadPoolExecutor(max_workers=MAX_INFLIGHT_PRIMARIES, thread_name_prefix="GeminiPrimary")
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="GeminiHedge")
+_primary_slots = threading.BoundedSemaphore(MAX_INFLIGHT_PRIMARIES)
+
+_served: contextvars.ContextVar[Optional["ServedModel"]] = contextvars.ContextVar("mbb_served_model", default=None)
+
+
+class ServedModel:
+    """model ที่ให้ผลจริงใน scope นี้ - None ถ้าทุก call ได้ผลจาก model หลัก"""
+
+    __slots__ = ("model",)
+
+    def __init__(self):
+        self.model: Optional[str] = None
+
+
+@contextmanager
+def served_model_scope():
+    """บันทึกว่า call ที่อยู่ใน scope ได้ผลจาก model สำรองหรือไม่ (scope ซ้อนส่งผลต่อให้ scope นอก)"""
+    served = ServedModel()
+    outer = _served.get()
+    token = _served.set(served)
+    try:
+        yield served
+    finally:
+        _served.reset(token)
+        if outer is not None and served.model:
+            outer.model = served.model
+
+
+def record_served(model_name: str):
+    """บันทึกว่า call นี้ได้ผลจาก model_name แทน model หลัก (hedge / model router)"""
+    served = _served.get()
+    if served is not None:
+        served.model = model_name
+
+
+def hedge_cache_key(cache_key: str, model_name: str) -> str:
+    """key ของผลจาก model สำรอง - แยกจาก key ของ model หลักเสมอ"""
+    return stable_cache_key(cache_key, "", model_name)
+
+
+def _percentile(samples, fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PrefetchedStream:
+    """stream ที่ดึง chunk แรกมาแล้ว - iterate ได้ตามปกติ, attribute อื่น (usage_metadata ฯลฯ) ส่งต่อให้ response จริง"""
+
+    _END = object()
+
+    def __init__(self, response: Any):
+        self.response = response
+        self._chunks = iter(response)
+        self._first = next(self._chunks, self._END)  # บล็อกจนได้ chunk แรก (หรือ stream ว่าง)
+
+    def __iter__(self):
+        if self._first is not self._END:
+            yield self._first
+        yield from self._chunks
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+
+class HedgeTracker:
+    """
+    latency ของ model หลัก (ใช้หา delay) + latency ที่ผู้เรียกเห็นจริง + ตัวนับ
+    call แบบ stream เก็บเวลาถึง chunk แรกแยกไว้ (first_chunk) - ไม่ปนกับเวลาของ call ที่รอคำแปลเต็ม
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**DEFAULT_HEDGING_CONFIG, **(config or {})}
+        self.quantile = float(config["quantile"])
+        self.min_samples = int(config["min_samples"])
+        self.min_delay_ms = float(config["min_delay_ms"])
+        self.max_delay_ms = float(config["max_delay_ms"])
+        self._lock = threading.Lock()
+        window = int(config["window"])
+        self.primary_ms = deque(maxlen=window)  # เวลาที่ model หลักใช้ (รวมที่ถูกทิ้ง)
+        self.observed_ms = deque(maxlen=window)  # เวลาที่ผู้เรียกรอจริง
+        self.primary_first_chunk_ms = deque(maxlen=window)  # stream: เวลาถึง chunk แรกของ model หลัก
+        self.observed_first_chunk_ms = deque(maxlen=window)
+        self.reset_stats()
+
+    def _samples(self, stream: bool):
+        if stream:
+            return self.primary_first_chunk_ms, self.observed_first_chunk_ms
+        return self.primary_ms, self.observed_ms
+
+    def reset_stats(self):
+        """ล้างตัวนับและ latency ที่ผู้เรียกเห็น - latency ของ model หลัก (ใช้หา delay) คงไว้"""
+        with self._lock:
+            self.observed_ms.clear()
+            self.observed_first_chunk_ms.clear()
+            self.stats = {
+                'calls': 0,
+                'stream_calls': 0,  # hedge ด้วยเวลาถึง chunk แรก
+                'hedged': 0,
+                'hedge_wins': 0,
+                'primary_wins': 0,
+                'cancelled': 0,  # ฝั่งที่แพ้ถูกยกเลิกก่อนเริ่มส่ง
+                'abandoned': 0,  # ฝั่งที่แพ้กำลังทำงานอยู่ - ผลถูกทิ้งเมื่อตอบกลับมา
+                'failovers': 0,
+                'unhedged_busy': 0,  # request หลักค้างเต็ม MAX_INFLIGHT_PRIMARIES - เรียกตรงไม่ hedge
+            }
+
+    def hedge_delay_s(self, stream: bool = False) -> Optional[float]:
+        """เวลาที่รอ model หลัก (stream = รอ chunk แรก) ก่อนยิง hedge (None = ยังไม่ hedge)"""
+        with self._lock:
+            samples = self._samples(stream)[0]
+            if len(samples) < self.min_samples:
+                return None
+            delay = _percentile(samples, self.quantile)
+        return min(self.max_delay_ms, max(self.min_delay_ms, delay)) / 1000.0
+
+    def record_primary(self, elapsed_ms: float, stream: bool = False):
+        with self._lock:
+            self._samples(stream)[0].append(elapsed_ms)
+
+    def record_observed(self, elapsed_ms: float, stream: bool = False):
+        with self._lock:
+            self._samples(stream)[1].append(elapsed_ms)
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            series = (
+                ('primary', list(self.primary_ms)),
+                ('observed', list(self.observed_ms)),
+                ('primary_first_chunk', list(self.primary_first_chunk_ms)),
+                ('observed_first_chunk', list(self.observed_first_chunk_ms)),
+            )
+        calls = stats['calls']
+        stats['extra_request_rate'] = round(stats['hedged'] / calls, 3) if calls else 0.0
+        for label, samples in series:
+            for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+                value = _percentile(samples, fraction)
+                stats[f'{label}_{name}_ms'] = round(value, 1) if value is not None else None
+        if stats['primary_p99_ms'] and stats['observed_p99_ms'] is not None:
+            stats['p99_improvement_ms'] = round(stats['primary_p99_ms'] - stats['observed_p99_ms'], 1)
+        else:
+            stats['p99_improvement_ms'] = None
+        return stats
+
+
+class HedgedModel:
+    """generate_content ที่ hedge ไป model สำรองเมื่อ model หลักช้ากว่า percentile ที่ตั้งไว้"""
+
+    def __init__(self, primary: Any, hedge: Any, hedge_model_name: str, tracker: HedgeTracker):
+        self.primary = primary
+        self.hedge = hedge
+        self.hedge_model_name = hedge_model_name
+        self.tracker = tracker
+
+    def __getattr__(self, name):
+        return getattr(self.primary, name)
+
+    @staticmethod
+    def _call(model: Any, contents, kwargs):
+        """generate_content - stream คืนเมื่อได้ chunk แรก (เวลาที่วัด/hedge คือเวลาถึง chunk แรก)"""
+        result = model.generate_content(contents, **kwargs)
+        return PrefetchedStream(result) if kwargs.get("stream") else result
+
+    @staticmethod
+    def _submit(executor: ThreadPoolExecutor, model: Any, contents, kwargs):
+        context = contextvars.copy_context()
+        return executor.submit(context.run, HedgedModel._call, model, contents, kwargs)
+
+    def generate_content(self, contents, **kwargs):
+        tracker = self.tracker
+        stream = bool(kwargs.get("stream"))
+        delay = tracker.hedge_delay_s(stream)
+        start = time.perf_counter()
+
+        if delay is not None and not _primary_slots.acquire(blocking=False):
+            tracker.count('unhedged_busy')
+            delay = None
+
+        tracker.count('calls')
+        if stream:
+            tracker.count('stream_calls')
+
+        if delay is None:
+            result = self._call(self.primary, contents, kwargs)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            tracker.record_primary(elapsed_ms, stream)
+            tracker.record_observed(elapsed_ms, stream)
+            return result
+
+        try:
+            primary = self._submit(_primary_executor, self.primary, contents, kwargs)
+        except BaseException:
+            _primary_slots.release()
+            raise
+
+        def primary_done(future):
+            _primary_slots.release()
+            # latency ของ model หลักบันทึกเสมอแม้ถูกทิ้ง - ไม่งั้น percentile จะต่ำเกินจริง
+            if not future.cancelled():
+                tracker.record_primary((time.perf_counter() - start) * 1000, stream)
+
+        primary.add_done_callback(primary_done)
+        done, _ = wait([primary], timeout=delay)
+        if done and primary.exception() is None:
+            tracker.record_observed((time.perf_counter() - start) * 1000, stream)
+            return primary.result()
+
+        tracker.count('hedged')
+        if done:
+            tracker.count('failovers')  # model หลักล้มก่อนถึง delay - ใช้ model สำรองแทน
+        logger.info(f"Hedging to {self.hedge_model_name} after {delay * 1000:.0f}ms")
+        hedge = self._submit(_hedge_executor, self.hedge, contents, kwargs)
+        pending = {primary, hedge}
+        errors = {}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    errors[future] = future.exception()
+                    continue
+                loser = hedge if future is primary else primary
+                if not loser.done():
+                    # cancel() ได้ผลเฉพาะงานที่ยังไม่เริ่ม - ที่กำลังส่งอยู่ปล่อยให้จบแล้วทิ้งผล
+                    tracker.count('cancelled' if loser.cancel() else 'abandoned')
+                tracker.record_observed((time.perf_counter() - start) * 1000, stream)
+                if future is hedge:
+                    tracker.count('hedge_wins')
+                    record_served(self.hedge_model_name)
+                else:
+                    tracker.count('primary_wins')
+                return future.result()
+        raise errors.get(primary) or errors[hedge]
+
+
+def create_hedge_tracker(config: Optional[Dict[str, Any]] = None) -> Optional[HedgeTracker]:
+    """Tracker จาก setting 'gemini_hedging' (None ถ้าปิดไว้)"""
+    config = {**DEFAULT_HEDGING_CONFIG, **(config or {})}
+    if not config["enabled"] or not config["model"]:
+        return None
+    return HedgeTracker(config)
@@ -0,0 +1,101 @@
+"""
+MBB Keyword Index - หาชื่อตัวละครและศัพท์ lore ทั้งหมดในข้อความด้วยการสแกนรอบเดียว
+Aho-Corasick automaton over NPC.json names / lore terms
+
+เดิม get_relevant_names / get_relevant_lore_terms ทำ substring scan ทุก entry ต่อทุกบรรทัด
+(O(จำนวนชื่อ + ศัพท์) ต่อบรรทัด โตตาม NPC.json) - automaton สร้างครั้งเดียวต่อการโหลด NPC.json
+แล้วหา keyword ทั้งหมดใน O(ความยาวข้อความ + จำนวนที่เจอ)
+
+เทียบแบบไม่สนตัวพิมพ์ และเคารพขอบคำ: keyword ที่ขึ้นต้น/ลงท้ายด้วยตัวอักษรหรือตัวเลข
+ต้องไม่ติดกับตัวอักษรหรือตัวเลขอื่น ("Ja" ไม่ match ใน "Jasper", "Y'shtola's" ยัง match "Y'shtola")
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordIndex:
+    """Automaton ของ keyword ชุดหนึ่ง - find() คืน keyword ตามลำดับที่เจอครั้งแรกในข้อความ"""
+
+    __slots__ = ("keywords", "_lengths", "_goto", "_fail", "_out")
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self._lengths: List[int] = []  # ความยาวหลัง lower() (อาจต่างจากต้นฉบับกับอักษรบางตัว)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[tuple] = [()]  # state -> (keyword id, ...) รวม output ของ fail chain แล้ว
+
+        seen = set()
+        for keyword in keywords:
+            if not keyword or keyword in seen:
+                continue
+            seen.add(keyword)
+            pattern = keyword.lower()
+            self._add(pattern, len(self.keywords))
+            self.keywords.append(keyword)
+            self._lengths.append(len(pattern))
+        self._build_links()
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _add(self, pattern: str, keyword_id: int):
+        goto = self._goto
+        state = 0
+        for char in pattern:
+            next_state = goto[state].get(char)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][char] = next_state
+                goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        self._out[state] = self._out[state] + (keyword_id,)
+
+    def _build_links(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                out[next_state] = out[next_state] + out[fail[next_state]]
+
+    def find(self, text: str) -> List[str]:
+        """keyword ทั้งหมดที่อยู่ในข้อความ (ไม่ซ้ำ, ตามลำดับที่เจอ)"""
+        if not text or not self.keywords:
+            return []
+        text = text.lower()
+        goto, fail, out, keywords, lengths = self._goto, self._fail, self._out, self.keywords, self._lengths
+        length = len(text)
+        found = {}
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not out[state]:
+                continue
+            after_is_word = end + 1 < length and _is_word_char(text[end + 1])
+            for keyword_id in out[state]:
+                if keyword_id in found:
+                    continue
+                keyword = keywords[keyword_id]
+                if after_is_word and _is_word_char(keyword[-1]):
+                    continue
+                start = end - lengths[keyword_id] + 1
+                if start > 0 and _is_word_char(keyword[0]) and _is_word_char(text[start - 1]):
+                    continue
+                found[keyword_id] = start
+        return [keywords[keyword_id] for keyword_id in sorted(found, key=found.get)]
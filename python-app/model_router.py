@@ -0,0 +1,299 @@
+"""
+MBB Model Router - เลือก Gemini model ต่อบรรทัดตามความยาว ประเภทข้อความ และสุขภาพของ model
+Length- and class-aware model routing with per-route parameters
+
+เดิมทุกบรรทัดใช้ model เดียวกับที่ตั้งไว้ (model คุณภาพ) - คำอุทาน "Hmph." หรือเสียงตะโกนในฉากต่อสู้
+ไม่ต้องใช้ model แพงและช้าเท่าบทพูดยาวในเนื้อเรื่อง
+
+ModelRouter.choose(text, message_class):
+    ไล่ routes ตามลำดับใน setting 'model_routing' - route แรกที่ตรงเงื่อนไข (classes / min_chars / max_chars)
+    และ model ยังปกติ (error rate / p90 latency ล่าสุดไม่เกินเกณฑ์) ถูกเลือก
+    ไม่มี route ตรง = None (ใช้ model คุณภาพตาม api_parameters)
+    ถ้า model คุณภาพเองมีปัญหา ใช้ route ที่ตั้ง "fallback": true แทน
+
+RoutingModel:
+    ครอบ model หลักแบบเดียวกับ GuardedModel / HedgedModel - generate_content ส่งไป model ของ route
+    ที่ active (route_scope) พร้อม generation_config ของ route แล้วบันทึก latency / error ต่อ model
+
+ประเภทข้อความ (message class) มาจาก handler ผ่าน message_class_scope():
+    story / cutscene / choice / battle / other
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from gemini_hedge import record_served
+
+logger = logging.getLogger('ModelRouter')
+
+CLASS_STORY = "story"
+CLASS_CUTSCENE = "cutscene"
+CLASS_CHOICE = "choice"
+CLASS_BATTLE = "battle"
+CLASS_OTHER = "other"
+
+DEFAULT_MODEL_ROUTING_CONFIG = {
+    "enabled": False,
+    "routes": [
+        # คำอุทาน/ประโยคสั้นทุกประเภท -> model ถูกและเร็วที่สุด
+        {"name": "bark", "model": "gemini-2.0-flash-lite", "max_chars": 24,
+         "max_tokens": 120, "temperature": 0.5},
+        {"name": "battle", "model": "gemini-2.0-flash-lite", "classes": [CLASS_BATTLE],
+         "max_tokens": 200},
+        {"name": "choice", "model": "gemini-2.0-flash-lite", "classes": [CLASS_CHOICE],
+         "max_chars": 160, "max_tokens": 300},
+        # ใช้เมื่อ model คุณภาพ error / ช้าผิดปกติเท่านั้น
+        {"name": "fallback", "model": "gemini-2.0-flash", "fallback": True},
+    ],
+    "max_error_rate": 0.5,  # error ล่าสุดเกินสัดส่วนนี้ = ข้าม route นั้น
+    "max_p90_ms": 6000,  # p90 latency ล่าสุดเกินนี้ = ข้าม route นั้น
+    "min_samples": 5,  # ยังไม่ตัดสินสุขภาพจนกว่าจะมีผลพอ
+    "recover_after_s": 30.0,  # model ที่ถูกข้ามได้ลองใหม่ (probe) เมื่อไม่มีผลใหม่นานเท่านี้
+    "window": 50,
+}
+
+# ชื่อ key ใน route -> key ของ generation_config
+_ROUTE_PARAMS = {"max_tokens": "max_output_tokens", "temperature": "temperature", "top_p": "top_p"}
+
+_message_class: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("mbb_message_class", default=None)
+_active_route: contextvars.ContextVar[Optional["Route"]] = contextvars.ContextVar("mbb_model_route", default=None)
+
+
+@contextmanager
+def message_class_scope(message_class: Optional[str]):
+    """ประเภทของข้อความที่กำลังแปลใน scope นี้ (handler เป็นผู้ตั้ง)"""
+    token = _message_class.set(message_class)
+    try:
+        yield
+    finally:
+        _message_class.reset(token)
+
+
+def current_message_class() -> Optional[str]:
+    return _message_class.get()
+
+
+@contextmanager
+def route_scope(route: Optional["Route"]):
+    """call ของ RoutingModel ใน scope นี้ใช้ route นี้ (None = model คุณภาพ)"""
+    token = _active_route.set(route)
+    try:
+        yield route
+    finally:
+        _active_route.reset(token)
+
+
+def spoken_length(text: str) -> int:
+    """ความยาวส่วนที่พูด - ตัดชื่อผู้พูด "Name: " ออก (ชื่อไม่ได้ทำให้บรรทัดแปลยากขึ้น)"""
+    text = text.strip()
+    speaker, sep, content = text.partition(": ")
+    if sep and len(speaker) <= 40 and "\n" not in speaker:
+        return len(content.strip())
+    return len(text)
+
+
+class Route:
+    """route หนึ่งจาก config - เงื่อนไขการเลือก + model + generation_config ที่ใช้แทนค่าหลัก"""
+
+    __slots__ = ("name", "model", "classes", "min_chars", "max_chars", "fallback", "params")
+
+    def __init__(self, config: Dict[str, Any]):
+        self.name = config.get("name") or config["model"]
+        self.model = config["model"]
+        self.classes = frozenset(config.get("classes") or ())
+        self.min_chars = int(config.get("min_chars", 0))
+        self.max_chars = config.get("max_chars")
+        self.fallback = bool(config.get("fallback", False))
+        self.params = {_ROUTE_PARAMS[key]: config[key] for key in _ROUTE_PARAMS if config.get(key) is not None}
+
+    def matches(self, length: int, message_class: Optional[str]) -> bool:
+        if self.fallback:
+            return False
+        if self.classes and message_class not in self.classes:
+            return False
+        if length < self.min_chars:
+            return False
+        return self.max_chars is None or length <= self.max_chars
+
+    def generation_config(self, base: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {**(base or {}), **self.params}
+
+
+class ModelHealth:
+    """latency / ผลของ call ล่าสุดของ model หนึ่ง"""
+
+    def __init__(self, window: int = 50):
+        self._lock = threading.Lock()
+        self.latency_ms = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = สำเร็จ
+        self.calls = 0
+        self.errors = 0
+        self.last_at = 0.0
+
+    def record(self, elapsed_ms: Optional[float], ok: bool):
+        with self._lock:
+            self.last_at = time.monotonic()
+            self.calls += 1
+            self.outcomes.append(ok)
+            if not ok:
+                self.errors += 1
+            elif elapsed_ms is not None:
+                self.latency_ms.append(elapsed_ms)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            outcomes = list(self.outcomes)
+        return outcomes.count(False) / len(outcomes) if outcomes else 0.0
+
+    def p90_ms(self) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self.latency_ms)
+        return samples[min(len(samples) - 1, int(0.9 * len(samples)))] if samples else None
+
+    def samples(self) -> int:
+        with self._lock:
+            return len(self.outcomes)
+
+
+class ModelRouter:
+    """เลือก route ต่อบรรทัด + ติดตามสุขภาพของทุก model ที่ถูกใช้"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**DEFAULT_MODEL_ROUTING_CONFIG, **(config or {})}
+        self.routes: List[Route] = [Route(route) for route in config["routes"]]
+        self.max_error_rate = float(config["max_error_rate"])
+        self.max_p90_ms = float(config["max_p90_ms"])
+        self.min_samples = int(config["min_samples"])
+        self.recover_after_s = float(config["recover_after_s"])
+        self.window = int(config["window"])
+        self._lock = threading.Lock()
+        self._health: Dict[str, ModelHealth] = {}
+        self.stats = {'routed': {route.name: 0 for route in self.routes}, 'quality': 0, 'skipped_unhealthy': 0}
+
+    def models(self) -> tuple:
+        """model ทุกตัวที่ route อาจเลือก (ไม่ซ้ำ ตามลำดับใน config)"""
+        return tuple(dict.fromkeys(route.model for route in self.routes))
+
+    def health(self, model_name: str) -> ModelHealth:
+        with self._lock:
+            health = self._health.get(model_name)
+            if health is None:
+                health = self._health[model_name] = ModelHealth(self.window)
+            return health
+
+    def is_healthy(self, model_name: str) -> bool:
+        health = self.health(model_name)
+        if health.samples() < self.min_samples:
+            return True
+        p90 = health.p90_ms()
+        if health.error_rate() <= self.max_error_rate and (p90 is None or p90 <= self.max_p90_ms):
+            return True
+        # model ที่ถูกข้ามไม่มีผลใหม่ - ปล่อยให้ลองอีกครั้งหลัง recover_after_s (probe ล้มก็ถูกข้ามต่อ)
+        return time.monotonic() - health.last_at >= self.recover_after_s
+
+    def choose(self, text: str, message_class: Optional[str], quality_model: str) -> Optional[Route]:
+        """route ของบรรทัดนี้ - None = ใช้ model คุณภาพ (quality_model)"""
+        length = spoken_length(text)
+        chosen = None
+        for route in self.routes:
+            if not route.matches(length, message_class):
+                continue
+            if route.model != quality_model and not self.is_healthy(route.model):
+                self._count('skipped_unhealthy')
+                continue
+            chosen = route
+            break
+
+        if chosen is None and not self.is_healthy(quality_model):
+            chosen = next(
+                (route for route in self.routes
+                 if route.fallback and route.model != quality_model and self.is_healthy(route.model)),
+                None,
+            )
+            if chosen is not None:
+                logger.info(f"Quality model {quality_model} unhealthy - using route '{chosen.name}'")
+
+        with self._lock:
+            if chosen is None:
+                self.stats['quality'] += 1
+            else:
+                self.stats['routed'][chosen.name] += 1
+        return chosen
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def record(self, model_name: str, elapsed_ms: Optional[float], ok: bool):
+        self.health(model_name).record(elapsed_ms, ok)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {**self.stats, 'routed': dict(self.stats['routed'])}
+            health = dict(self._health)
+        stats['models'] = {
+            name: {
+                'calls': model_health.calls,
+                'errors': model_health.errors,
+                'error_rate': round(model_health.error_rate(), 3),
+                'p90_ms': round(model_health.p90_ms(), 1) if model_health.p90_ms() is not None else None,
+                'healthy': self.is_healthy(name),
+            }
+            for name, model_health in health.items()
+        }
+        return stats
+
+
+class RoutingModel:
+    """generate_content ที่ส่งไป model ของ route ที่ active - model ต่อชื่อสร้างครั้งเดียวด้วย create_model"""
+
+    def __init__(self, primary: Any, primary_name: str, router: ModelRouter, create_model: Callable[[str], Any]):
+        self.primary = primary
+        self.primary_name = primary_name
+        self.router = router
+        self.create_model = create_model
+        self._models: Dict[str, Any] = {primary_name: primary}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.primary, name)
+
+    def _model_for(self, model_name: str):
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._models[model_name] = self.create_model(model_name)
+            return model
+
+    def generate_content(self, contents, **kwargs):
+        route = _active_route.get()
+        model_name = route.model if route is not None else self.primary_name
+        model = self._model_for(model_name)
+        if route is not None and route.params:
+            kwargs["generation_config"] = route.generation_config(kwargs.get("generation_config"))
+
+        start = time.perf_counter()
+        try:
+            result = model.generate_content(contents, **kwargs)
+        except Exception:
+            self.router.record(model_name, None, False)
+            raise
+        # stream คืน iterator ทันที - เวลาตอนนี้ไม่ใช่ latency จริง (บันทึกแค่ว่าสำเร็จ)
+        elapsed_ms = None if kwargs.get("stream") else (time.perf_counter() - start) * 1000
+        self.router.record(model_name, elapsed_ms, True)
+        if model_name != self.primary_name:
+            record_served(model_name)
+        return result
+
+
+def create_model_router(config: Optional[Dict[str, Any]] = None) -> Optional[ModelRouter]:
+    """Router จาก setting 'model_routing' (None ถ้าปิดไว้)"""
+    config = {**DEFAULT_MODEL_ROUTING_CONFIG, **(config or {})}
+    if not config["enabled"] or not config["routes"]:
+        return None
+    return ModelRouter(config)
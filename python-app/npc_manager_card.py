@@ -7560,6 +7560,10 @@ class NPCManagerCard:
             # อัพเดทแคช
             self.data_cache = self.data.copy()
 
+            # แจ้ง MBB ให้โหลด NPC.json ใหม่ (translator สร้าง index/prompt ของตัวละครใหม่)
+            if self.reload_callback and callable(self.reload_callback):
+                self._safe_after(0, self.reload_callback)
+
             # แสดง section main_characters
             self.show_section("main_characters")
 
@@ -0,0 +1,239 @@
+"""
+MBB Prompt Budget - ประกอบ prompt แปลภายใต้งบ token ต่อ request
+Token-budgeted prompt assembly with usage-calibrated counting
+
+เดิม translate() ต่อ system prompt + context + ชื่อ (สูงสุด 20) + ศัพท์ lore ทั้งหมดโดยไม่มีงบ
+และประมาณ token ด้วย len(text) // 4 (log) / จำนวนคำ x 1.3 (console) ซึ่งคลาดมากกับภาษาไทย
+
+TokenCounter:
+    ตัวนับในเครื่องแยกข้อความเป็นช่วงอังกฤษ/ตัวเลข/ไทย/สัญลักษณ์ (cache ผลต่อข้อความ - system prompt
+    และส่วน prompt ของตัวละครซ้ำทุกบรรทัด) แล้วคูณด้วยอัตราปรับเทียบที่เรียนจาก usage_metadata
+    ของ response จริง (prompt_token_count / ค่าที่ประมาณไว้)
+
+PromptAssembler:
+    ส่วนบังคับ (system prompt, หัวข้อ, ข้อความที่จะแปล) ใส่เสมอ - ที่เหลือเติมตามลำดับความสำคัญ
+    style ตัวละคร > ชื่อที่เกี่ยวข้อง > ศัพท์ lore จนเต็มงบ max_prompt_tokens
+    ทุก call บันทึก token ที่ใช้จริงเทียบกับงบ (get_stats)
+"""
+
+import re
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger('PromptBudget')
+
+DEFAULT_PROMPT_BUDGET_CONFIG = {
+    "max_prompt_tokens": 3000,
+    "calibrate": True,
+}
+
+# อัตราปรับเทียบ: EMA ของ (token จริง / ค่าประมาณ) จำกัดช่วงกัน usage ผิดปกติ
+CALIBRATION_ALPHA = 0.2
+CALIBRATION_RANGE = (0.25, 4.0)
+
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[\u0E00-\u0E7F]+|\s+|.", re.DOTALL)
+
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """ประมาณจำนวน token ก่อนปรับเทียบ - รวมได้ต่อส่วน (estimate(a) + estimate(b) ~ estimate(a + b))"""
+    tokens = 0
+    for piece in _PIECE_RE.findall(text):
+        first = piece[0]
+        if first.isspace():
+            continue
+        length = len(piece)
+        if first.isascii() and first.isalpha():
+            tokens += max(1, (length + 2) // 5)  # คำอังกฤษทั่วไปเป็น 1 token, คำยาวแตกเป็นหลายชิ้น
+        elif first.isdigit():
+            tokens += (length + 2) // 3
+        elif "\u0E00" <= first <= "\u0E7F":
+            tokens += (length * 2 + 4) // 5  # ภาษาไทยไม่มีช่องว่างระหว่างคำ ~2.5 ตัวอักษรต่อ token
+        else:
+            tokens += 1
+    return tokens
+
+
+class TokenCounter:
+    """ตัวนับ token ในเครื่องที่ปรับเทียบกับ usage_metadata ของ Gemini"""
+
+    def __init__(self, calibrate: bool = True):
+        self.calibrate = calibrate
+        self.ratio = 1.0
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def raw(self, text: str) -> int:
+        return estimate_tokens(text) if text else 0
+
+    def count(self, text: str) -> int:
+        return self.scale(self.raw(text))
+
+    def scale(self, raw_tokens: int) -> int:
+        return int(round(raw_tokens * self.ratio))
+
+    def observe(self, raw_tokens: int, actual_tokens: int):
+        """ปรับอัตราจาก token จริงของ prompt ที่ประมาณไว้ raw_tokens"""
+        if not self.calibrate or raw_tokens <= 0 or not actual_tokens:
+            return
+        low, high = CALIBRATION_RANGE
+        sample = min(high, max(low, actual_tokens / raw_tokens))
+        with self._lock:
+            if self.samples:
+                self.ratio += CALIBRATION_ALPHA * (sample - self.ratio)
+            else:
+                self.ratio = sample
+            self.samples += 1
+
+
+class AssembledPrompt:
+    """prompt ที่ประกอบแล้ว + ข้อมูลงบสำหรับบันทึกหลัง call"""
+
+    __slots__ = ("text", "raw_tokens", "estimated_tokens", "budget", "dropped")
+
+    def __init__(self, text: str, raw_tokens: int, estimated_tokens: int, budget: int, dropped: Dict[str, int]):
+        self.text = text
+        self.raw_tokens = raw_tokens
+        self.estimated_tokens = estimated_tokens
+        self.budget = budget
+        self.dropped = dropped
+
+
+def usage_tokens(usage_metadata: Any) -> Tuple[Optional[int], Optional[int]]:
+    """(prompt_token_count, candidates_token_count) จาก usage_metadata ของ response (None ถ้าไม่มี)"""
+    if usage_metadata is None:
+        return None, None
+    prompt_tokens = getattr(usage_metadata, "prompt_token_count", None) or None
+    output_tokens = getattr(usage_metadata, "candidates_token_count", None) or None
+    return prompt_tokens, output_tokens
+
+
+class PromptAssembler:
+    """ประกอบ prompt แปลหนึ่งบรรทัดตามลำดับความสำคัญภายใต้งบ token"""
+
+    NAMES_HEADER = "Preserve names: "
+    LORE_HEADER = "Special Terms (Strongly prefer using these Thai translations):\n"
+
+    def __init__(self, max_prompt_tokens: int = 3000, counter: Optional[TokenCounter] = None):
+        self.max_prompt_tokens = max(1, int(max_prompt_tokens))
+        self.counter = counter or TokenCounter()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def assemble(
+        self,
+        head: str,
+        tail: str,
+        style: str = "",
+        names: Iterable[str] = (),
+        lore: Iterable[Tuple[str, str]] = (),
+    ) -> AssembledPrompt:
+        """
+        Args:
+            head: system prompt (บังคับ)
+            tail: ข้อความที่จะแปล (บังคับ)
+            style: ส่วน prompt ของตัวละคร (context/style/สรรพนาม)
+            names: ชื่อที่ต้องคงไว้ เรียงตามความสำคัญ
+            lore: (ศัพท์, คำอธิบาย) เรียงตามความสำคัญ
+        """
+        raw = self.counter.raw
+        budget = self.counter.scale  # งบเทียบกับค่าที่ปรับเทียบแล้ว
+        dropped = {"style": 0, "names": 0, "lore": 0}
+
+        used = raw(head) + raw(self.NAMES_HEADER) + raw(self.LORE_HEADER) + raw(tail)
+
+        if style:
+            cost = raw(style)
+            if budget(used + cost) <= self.max_prompt_tokens:
+                used += cost
+            else:
+                style = ""
+                dropped["style"] = 1
+
+        kept_names = []
+        for name in names:
+            cost = raw(name) + (1 if kept_names else 0)  # ", " คั่นชื่อ
+            if budget(used + cost) <= self.max_prompt_tokens:
+                kept_names.append(name)
+                used += cost
+            else:
+                dropped["names"] += 1
+
+        lore_lines = []
+        for term, explanation in lore:
+            line = f"{term}: {explanation}\n"
+            cost = raw(line)
+            if budget(used + cost) <= self.max_prompt_tokens:
+                lore_lines.append(line)
+                used += cost
+            else:
+                dropped["lore"] += 1
+
+        text = "".join((
+            head,
+            style,
+            self.NAMES_HEADER, ", ".join(kept_names), "\n\n",
+            self.LORE_HEADER,
+            *lore_lines,
+            tail,
+        ))
+        return AssembledPrompt(text, used, budget(used), self.max_prompt_tokens, dropped)
+
+    def record(self, prompt: AssembledPrompt, usage_metadata: Any = None) -> Optional[int]:
+        """บันทึกผลหนึ่ง call (ปรับเทียบตัวนับถ้ามี usage) - คืน prompt token จริงถ้ารู้"""
+        actual, _ = usage_tokens(usage_metadata)
+        if actual:
+            self.counter.observe(prompt.raw_tokens, actual)
+        tokens = actual or prompt.estimated_tokens
+        with self._lock:
+            stats = self.stats
+            stats['calls'] += 1
+            stats['budget_tokens'] += prompt.budget
+            stats['estimated_tokens'] += prompt.estimated_tokens
+            if actual:
+                stats['measured_calls'] += 1
+                stats['actual_tokens'] += actual
+            if tokens > prompt.budget:
+                stats['over_budget'] += 1
+            for part, count in prompt.dropped.items():
+                stats[f'dropped_{part}'] += count
+            stats['last'] = {
+                'budget': prompt.budget,
+                'estimated': prompt.estimated_tokens,
+                'actual': actual,
+            }
+        if tokens > prompt.budget:
+            logger.warning(f"Prompt over budget: {tokens} tokens (budget {prompt.budget})")
+        return actual
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {
+                'calls': 0,
+                'measured_calls': 0,
+                'over_budget': 0,
+                'budget_tokens': 0,
+                'estimated_tokens': 0,
+                'actual_tokens': 0,
+                'dropped_style': 0,
+                'dropped_names': 0,
+                'dropped_lore': 0,
+                'last': None,
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        measured = stats['measured_calls']
+        stats['avg_actual_tokens'] = round(stats['actual_tokens'] / measured, 1) if measured else None
+        stats['calibration_ratio'] = round(self.counter.ratio, 3)
+        stats['calibration_samples'] = self.counter.samples
+        return stats
+
+
+def create_prompt_assembler(config: Optional[Dict[str, Any]] = None) -> PromptAssembler:
+    """สร้าง assembler จาก setting 'prompt_budget'"""
+    config = {**DEFAULT_PROMPT_BUDGET_CONFIG, **(config or {})}
+    return PromptAssembler(config["max_prompt_tokens"], TokenCounter(config["calibrate"]))
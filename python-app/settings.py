@@ -1,5 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+import copy
 import json
 import os
 import logging
@@ -35,6 +36,27 @@ def is_valid_hotkey(hotkey):
     return False
 
 
+def merge_missing_defaults(target, defaults, path=""):
+    """เติม key ที่ขาดใน dict ซ้อนจาก defaults (ไม่แตะค่าที่ผู้ใช้ตั้งไว้และไม่ merge list)
+
+    คืนรายชื่อ key (แบบ a.b.c) ที่ถูกเพิ่มหรือแทนที่
+    """
+    added = []
+    for sub_key, sub_default in defaults.items():
+        sub_path = f"{path}.{sub_key}" if path else sub_key
+        if sub_key not in target:
+            target[sub_key] = copy.deepcopy(sub_default)
+            added.append(sub_path)
+        elif isinstance(sub_default, dict):
+            if isinstance(target[sub_key], dict):
+                added.extend(merge_missing_defaults(target[sub_key], sub_default, sub_path))
+            elif sub_default and target[sub_key] is not None:
+                # โครงสร้างผิด (เช่นไฟล์เก่าเก็บเป็นค่าเดี่ยว) - ใช้ default ทั้งก้อน
+                target[sub_key] = copy.deepcopy(sub_default)
+                added.append(sub_path)
+    return added
+
+
 # ==================================================================
 # ลบคลาส HotkeyUI แบบเก่าออกไปทั้งหมด (HotkeyUI ถูกลบไปแล้ว)
 # ==================================================================
@@ -109,6 +131,104 @@ class Settings:
             "enable_auto_area_switch": False,  # ค่า default สำหรับ auto area switch (ปิดใช้งานถาวร)
             "enable_click_translate": False,  # เพิ่มการตั้งค่าใหม่สำหรับ Click Translate โดยค่าเริ่มต้นเป็น False
             "dalamud_enabled": False,  # เพิ่มการตั้งค่าสำหรับ Dalamud Bridge mode
+            "dalamud_transport": {  # transport ของ Dalamud Bridge (auto = named pipe บน Windows)
+                "type": "auto",  # auto, named_pipe, unix_socket, tcp
+                "pipe_name": r"\\.\pipe\mbb_dalamud_bridge",
+                "unix_socket_path": "/tmp/mbb_dalamud_bridge.sock",
+                "tcp_host": "127.0.0.1",
+                "tcp_port": 47811,
+                "framing": "newline",  # newline, length_prefixed
+                "read_mode": "event",  # event (ตื่นเมื่อมีข้อมูล), poll (sleep 10ms แบบเดิม)
+            },
+            "dalamud_recording": {  # บันทึก raw stream จาก Dalamud สำหรับ replay/load test
+                "enabled": False,
+                "path": "logs/dalamud_stream.mbbrec",
+            },
+            "dalamud_ingress": {  # คิวขาเข้าระหว่าง reader กับ dispatcher ของ Dalamud Bridge
+                "max_size": 64,
+                "policy": "drop_priority",  # drop_oldest, drop_priority, coalesce_speaker
+            },
+            "dalamud_pipeline": {  # threaded = reader/dispatcher thread, asyncio = event loop เดียว
+                "mode": "threaded",
+                "concurrency": 4,  # จำนวน translate worker ในโหมด asyncio
+                "workers": 2,  # จำนวน worker thread ของ handler ในโหมด threaded
+                "queue_size": 16,  # งานแปลที่รอได้สูงสุด (เต็มแล้วทิ้งงานเก่าสุด)
+                "latest_wins": True,  # ยกเลิก/ไม่แสดงคำแปลที่เก่ากว่าข้อความล่าสุด
+                "ordered_cutscenes": True,  # cutscene แปลพร้อมกันแต่แสดงตามลำดับที่รับ
+                "reorder_window": 8,  # บรรทัดที่รอหัวคิวได้สูงสุดก่อนข้ามบรรทัดที่ช้า
+                "streaming": True,  # บทพูด/cutscene ขึ้น TUI ทีละประโยคระหว่างที่ Gemini ยังแปลไม่จบ
+                "scheduler": {  # ลำดับงานแปล: story (dialogue/cutscene) > choice > battle > other
+                    "preemption": "drop_lowest",  # drop_lowest, drop_oldest, reject_incoming
+                    "max_age_s": {  # งานที่รอนานเกินนี้ถูกทิ้ง (None = ไม่หมดอายุ)
+                        "story": None,
+                        "choice": 30.0,
+                        "battle": 5.0,
+                        "other": 5.0,
+                    },
+                },
+            },
+            "dalamud_dedup": {  # ตัดบรรทัดซ้ำที่ plugin ส่งมาจากหลาย hook
+                "enabled": True,
+                "window_s": 1.5,  # ถือว่าซ้ำถ้าเห็นข้อความเดียวกันภายในกี่วินาที
+                "max_entries": 256,
+            },
+            "dalamud_filter": {  # กฎกรองข้อความ (ChatType / Type / speaker / regex) ก่อนแปล
+                "rules_path": "config/chat_filter_rules.json",  # สร้างจากกฎเริ่มต้นถ้ายังไม่มี
+                "auto_reload": True,  # แก้ไฟล์กฎแล้วมีผลทันทีไม่ต้องรีสตาร์ท
+                "reload_check_s": 2.0,
+            },
+            "translation_cache": {  # cache กลาง: LRU ใน memory + cache คำแปลถาวรบนดิสก์
+                "enabled": True,  # disk tier (ใช้ซ้ำข้ามการเปิดโปรแกรม)
+                "path": "cache/translation_cache.sqlite3",
+                "max_entries": 50000,
+                "memory_budget_bytes": 8388608,  # ขนาดสูงสุดของ memory tier (ทุก region รวมกัน)
+            },
+            "gemini_client": {  # rate limit / retry / circuit breaker ของทุก call ไป Gemini
+                "requests_per_min": 60,  # ตาม quota ของ API key (free tier ต่ำกว่านี้)
+                "tokens_per_min": 1000000,  # input tokens/นาที
+                "max_wait_s": 10.0,  # รอคิว rate limit นานกว่านี้ถือว่าล้ม (ไม่ค้าง TUI)
+                "max_attempts": 4,  # รวมครั้งแรก - เฉพาะ error ที่ retry ได้ (429 ชั่วคราว, 5xx, timeout)
+                "base_delay_s": 0.5,  # exponential backoff + jitter
+                "max_delay_s": 8.0,  # server ขอให้รอนานกว่านี้ = quota หมด -> fail fast
+                "quota_cooldown_s": 60.0,  # เวลาที่ circuit breaker เปิดก่อนลอง probe ใหม่
+            },
+            "gemini_hedging": {  # ยิง request ซ้ำไป model ที่เร็วกว่าเมื่อ model หลักช้ากว่า p90 ล่าสุด
+                "enabled": False,  # เพิ่ม request ~10% เพื่อลด tail latency
+                "model": "gemini-2.0-flash-lite",
+                "quantile": 0.9,
+                "min_samples": 20,  # ยังไม่ hedge จนกว่าจะมี latency ของ model หลักพอ
+                "min_delay_ms": 300,
+                "max_delay_ms": 5000,
+                "window": 200,
+            },
+            "model_routing": {  # เลือก model ต่อบรรทัด - route แรกที่ตรงเงื่อนไขชนะ ไม่ตรงเลยใช้ model ที่ตั้งไว้
+                "enabled": False,
+                "routes": [
+                    # max_chars นับเฉพาะส่วนที่พูด (ไม่รวมชื่อผู้พูด), classes: story/cutscene/choice/battle/other
+                    {"name": "bark", "model": "gemini-2.0-flash-lite", "max_chars": 24,
+                     "max_tokens": 120, "temperature": 0.5},
+                    {"name": "battle", "model": "gemini-2.0-flash-lite", "classes": ["battle"],
+                     "max_tokens": 200},
+                    {"name": "choice", "model": "gemini-2.0-flash-lite", "classes": ["choice"],
+                     "max_chars": 160, "max_tokens": 300},
+                    {"name": "fallback", "model": "gemini-2.0-flash", "fallback": True},  # เมื่อ model หลักมีปัญหา
+                ],
+                "max_error_rate": 0.5,  # error ล่าสุดเกินนี้ = ข้าม route นั้น
+                "max_p90_ms": 6000,  # p90 latency ล่าสุดเกินนี้ = ข้าม route นั้น
+                "min_samples": 5,
+                "recover_after_s": 30.0,  # model ที่ถูกข้ามได้ลองใหม่เมื่อไม่มีผลใหม่นานเท่านี้
+                "window": 50,
+            },
+            "prompt_budget": {  # งบ token ต่อ request แปล: style > ชื่อ > ศัพท์ lore ตัดส่วนท้ายก่อน
+                "max_prompt_tokens": 3000,  # รวม system prompt (ส่วนบังคับเกินงบได้แต่ถูกบันทึกเป็น over_budget)
+                "calibrate": True,  # ปรับตัวนับ token ในเครื่องตาม usage_metadata ของ Gemini
+            },
+            "dalamud_tracing": {  # วัด latency ต่อ stage ตั้งแต่รับข้อความจนแสดงบน TUI
+                "enabled": False,
+                "ring_size": 500,
+                "sample_size": 2000,
+                "export_path": "logs/dalamud_latency.json",
+            },
             "bg_color": appearance_manager.bg_color,  # ดึงจาก appearance_manager
             "bg_swatch_mode": 1,  # ค่า default swatch mode
             "bg_swatch_transparency": 0.6,  # ค่า default swatch transparency
@@ -128,6 +248,7 @@ class Settings:
                 "start_stop_translate": "f9",
                 "previous_dialog": "r-click",  # Previous Dialog shortcut
                 "previous_dialog_key": "f10",  # Previous Dialog key
+                "latency_panel": "ctrl+alt+l",  # Latency debug panel (เมื่อเปิด dalamud_tracing)
             },
             "logs_ui": {  # ค่า default logs UI
                 "width": 480,
@@ -383,6 +504,18 @@ class Settings:
                             self.settings[key][sub_key] = sub_default
                             changes_made = True
                             logging.info(f"Added missing logs_ui setting '{sub_key}'.")
+            elif isinstance(default_value, dict):
+                # setting ซ้อนอื่น ๆ (dalamud_*, translation_cache, gemini_*, model_routing ฯลฯ)
+                # ไฟล์ settings เก่าที่มี dict อยู่แล้วต้องได้ key ย่อยที่เพิ่มใหม่ด้วย
+                if not isinstance(self.settings[key], dict):
+                    self.settings[key] = copy.deepcopy(default_value)
+                    changes_made = True
+                    logging.info(f"Reset invalid setting '{key}' to default value.")
+                else:
+                    added = merge_missing_defaults(self.settings[key], default_value, key)
+                    if added:
+                        changes_made = True
+                        logging.info(f"Added missing nested settings: {', '.join(added)}.")
             # --- จบการตรวจสอบโครงสร้างภายใน ---
 
         # --- ส่วนสำคัญ: ตรวจสอบและจัดการ area_presets (เหมือนเดิม แต่รวมอยู่ใน Loop ใหญ่) ---
@@ -11,18 +11,29 @@ import time
 import threading
 import logging
 from datetime import datetime
-import win32pipe
-import win32file
-import win32api
 
 # Add current directory to path
 sys.path.append(os.path.dirname(__file__))
 
+from dalamud_transport import (
+    HAS_WIN32,
+    DEFAULT_PIPE_NAME,
+    SocketTransportServer,
+    resolve_transport_type,
+)
+
+if HAS_WIN32:
+    import win32pipe
+    import win32file
+
 class TextHookSimulator:
     """จำลองการทำงานของ Dalamud text hook"""
 
-    def __init__(self):
-        self.pipe_name = r'\\.\pipe\mbb_dalamud_bridge'
+    def __init__(self, transport_config=None):
+        self.pipe_name = DEFAULT_PIPE_NAME
+        # transport เดียวกับ DalamudBridge (named pipe บน Windows, socket บน Linux)
+        self.transport_config = transport_config or {"type": "auto"}
+        self.transport_type = resolve_transport_type(self.transport_config.get("type", "auto"))
         self.running = False
         self.test_messages = []
         self.current_index = 0
@@ -134,6 +145,19 @@ class TextHookSimulator:
             self.logger.error(f"❌ Named pipe creation error: {e}")
             return None
 
+    def create_socket_server(self):
+        """สร้าง Unix socket / TCP server แทน named pipe (สำหรับรันบน Linux)"""
+
+        try:
+            self.logger.info(f"🔧 Creating {self.transport_type} server")
+            server = SocketTransportServer(self.transport_config)
+            self.logger.info(f"✅ {self.transport_type} server listening on {server.address}")
+            return server
+
+        except Exception as e:
+            self.logger.error(f"❌ Socket server creation error: {e}")
+            return None
+
     def wait_for_connection(self, pipe_handle):
         """รอการเชื่อมต่อจาก MBB client"""
 
@@ -141,6 +165,8 @@ class TextHookSimulator:
             self.logger.info("⏳ Waiting for MBB client connection...")
 
             # รอการเชื่อมต่อ
+            if isinstance(pipe_handle, SocketTransportServer):
+                return pipe_handle.accept()
             win32pipe.ConnectNamedPipe(pipe_handle, None)
             self.logger.info("✅ MBB client connected!")
             return True
@@ -155,10 +181,14 @@ class TextHookSimulator:
         try:
             # Convert to JSON
             json_data = json.dumps(message_data, ensure_ascii=False)
-            message_bytes = json_data.encode('utf-8')
+            # ขึ้นบรรทัดใหม่ท้ายข้อความเหมือน WriteLineAsync ของ plugin (bridge แยกข้อความด้วย \n)
+            message_bytes = json_data.encode('utf-8') + b'\n'
 
             # ส่งข้อความ
-            win32file.WriteFile(pipe_handle, message_bytes)
+            if isinstance(pipe_handle, SocketTransportServer):
+                pipe_handle.send(message_bytes)
+            else:
+                win32file.WriteFile(pipe_handle, message_bytes)
             self.logger.info(f"📤 Sent: {message_data['Message'][:50]}...")
 
             return True
@@ -173,8 +203,11 @@ class TextHookSimulator:
         self.running = True
         self.logger.info("🚀 Starting Text Hook Simulation...")
 
-        # สร้าง named pipe
-        pipe_handle = self.create_named_pipe_server()
+        # สร้าง named pipe (หรือ socket server เมื่อไม่ได้ใช้ named pipe)
+        if self.transport_type == "named_pipe":
+            pipe_handle = self.create_named_pipe_server()
+        else:
+            pipe_handle = self.create_socket_server()
         if not pipe_handle:
             return
 
@@ -197,7 +230,10 @@ class TextHookSimulator:
         finally:
             # ปิด pipe
             try:
-                win32file.CloseHandle(pipe_handle)
+                if isinstance(pipe_handle, SocketTransportServer):
+                    pipe_handle.close()
+                else:
+                    win32file.CloseHandle(pipe_handle)
                 self.logger.info("🔒 Named pipe closed")
             except:
                 pass
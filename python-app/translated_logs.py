@@ -27,6 +27,7 @@ from settings import Settings
 import win32gui
 from ctypes import windll
 from font_manager import FontSettings, FontManager, FontUI, FontUIManager
+from translation_cache import get_translation_cache, REGION_LOG_MESSAGES
 
 # เพิ่ม import สำหรับการจัดการ monitor position
 try:
@@ -161,10 +162,9 @@ class Translated_Logs:
             value=self.settings.get("logs_reverse_mode", False)
         )
 
-        # Smart Message Cache System
-        self.message_cache = (
-            {}
-        )  # {message_hash: {'text': str, 'speaker': str, 'timestamp': float, 'bubble_index': int}}
+        # Smart Message Cache System - region log_messages ใน cache กลาง
+        # {message_hash: {'text': str, 'speaker': str, 'timestamp': float, 'bubble_index': int}}
+        self.message_cache = get_translation_cache()
         self.last_message_hash = None
         self.enable_smart_replacement = True
 
@@ -1180,24 +1180,27 @@ class Translated_Logs:
             )
 
             # ตรวจสอบว่าเป็นการแปลซ้ำหรือไม่
+            cached_data = None
             if (
                 self.enable_smart_replacement
                 and is_force_retranslation
                 and self.last_message_hash
-                and self.last_message_hash in self.message_cache
             ):
+                cached_data = self.message_cache.get(
+                    REGION_LOG_MESSAGES, self.last_message_hash
+                )
 
-                cached_data = self.message_cache[self.last_message_hash]
-
+            if cached_data is not None:
                 # ถ้าเป็นการแปลซ้ำของข้อความล่าสุด
                 if self._is_likely_retranslation(text, cached_data["text"]):
                     logging.info(f"🔄 Detected retranslation, replacing last message")
                     if self._replace_last_message(text, is_lore_text=is_lore_text):
-                        # อัปเดต cache ด้วยข้อความใหม่
-                        self.message_cache[self.last_message_hash]["text"] = text
-                        self.message_cache[self.last_message_hash][
-                            "timestamp"
-                        ] = time.time()
+                        # อัปเดต cache ด้วยข้อความใหม่ (put ใหม่เพื่อให้ขนาดใน cache ถูกต้อง)
+                        self.message_cache.put(
+                            REGION_LOG_MESSAGES,
+                            self.last_message_hash,
+                            {**cached_data, "text": text, "timestamp": time.time()},
+                        )
                         return
                 else:
                     logging.info(
@@ -1222,12 +1225,16 @@ class Translated_Logs:
         self._add_new_message_bubble(text)
 
         # บันทึกลง cache
-        self.message_cache[message_hash] = {
-            "text": text,
-            "speaker": speaker,
-            "timestamp": time.time(),
-            "bubble_index": len(self.bubble_list) - 1,
-        }
+        self.message_cache.put(
+            REGION_LOG_MESSAGES,
+            message_hash,
+            {
+                "text": text,
+                "speaker": speaker,
+                "timestamp": time.time(),
+                "bubble_index": len(self.bubble_list) - 1,
+            },
+        )
         self.last_message_hash = message_hash
 
         logging.info(
@@ -2099,7 +2106,7 @@ class Translated_Logs:
         self.bubble_list.clear()
 
         # Clear smart cache
-        self.message_cache.clear()
+        self.message_cache.clear_region(REGION_LOG_MESSAGES)
         self.last_message_hash = None
 
         self._update_status()
@@ -2126,7 +2133,7 @@ class Translated_Logs:
     def get_cache_stats(self):
         """ดูสถิติ cache ปัจจุบัน"""
         return {
-            "total_cached": len(self.message_cache),
+            "total_cached": self.message_cache.region_size(REGION_LOG_MESSAGES),
             "total_bubbles": len(self.bubble_list),
             "last_message": self.last_message_hash is not None,
             "smart_mode": self.enable_smart_replacement,
@@ -2306,6 +2306,9 @@ class Translated_UI(FontObserver):
             force_choice_mode: Force choice mode (ignored for Rich Text)
         """
         try:
+            # คำแปลเต็มของข้อความที่กำลัง stream - พิมพ์ต่อจากส่วนที่แสดงไปแล้ว
+            self._capture_stream_resume(streaming=False)
+
             # Phase 6: Auto-show TUI เมื่อมีข้อความใหม่
             if text and text.strip():  # ตรวจสอบว่ามีข้อความจริง
                 # logging.info(f"🔄 [AUTO-HIDE DEBUG] New text received, calling show_tui_on_new_translation()")
@@ -2321,6 +2324,43 @@ class Translated_UI(FontObserver):
                 text, is_lore_text=is_lore_text
             )
 
+    def update_text_partial(self, text: str) -> None:
+        """
+        แสดงคำแปลบางส่วนระหว่างที่ translator ยัง stream อยู่ (ประโยคที่จบแล้ว)
+        ส่วนที่พิมพ์ไปแล้วไม่ถูกพิมพ์ซ้ำ - typewriter พิมพ์ต่อจากตำแหน่งเดิม
+        คำแปลเต็มที่ตามมาทาง update_text() อาจต่างจากส่วนที่แสดงไปแล้ว (post-process เช่นศัพท์ lore)
+        ในกรณีนั้น typewriter พิมพ์ใหม่ตั้งแต่ตำแหน่งแรกที่ต่างกัน
+        Args:
+            text: คำแปลบางส่วน (รูปแบบเดียวกับ update_text - "ชื่อ: ข้อความ")
+        """
+        try:
+            self._capture_stream_resume(streaming=True)
+            if text and text.strip():
+                self.show_tui_on_new_translation()
+            self._original_update_text(text)
+        except Exception as e:
+            logging.error(f"Error in partial text update: {e}")
+
+    def _capture_stream_resume(self, streaming: bool) -> None:
+        """จำข้อความที่แสดงอยู่ถ้าข้อความก่อนหน้าเป็นคำแปลบางส่วน (canvas จะถูกล้างก่อนวาดใหม่)"""
+        self._stream_resume_text = None
+        if getattr(self, "_stream_active", False) and self.components.text_container:
+            try:
+                self._stream_resume_text = self.components.canvas.itemcget(
+                    self.components.text_container, "text"
+                )
+            except tk.TclError:
+                pass
+        self._stream_active = streaming
+
+    def _stream_resume_index(self, dialogue: str) -> int:
+        """ตำแหน่งที่ typewriter ควรเริ่ม - ความยาวส่วนที่ตรงกับข้อความที่แสดงไปแล้ว"""
+        shown = getattr(self, "_stream_resume_text", None)
+        self._stream_resume_text = None
+        if not shown:
+            return 0
+        return len(os.path.commonprefix([shown, dialogue]))
+
     def _update_text_with_rich_support(self, text: str, is_lore_text: bool = False) -> None:
         """
         Complete Rich Text processing path with full DB verification
@@ -3693,8 +3733,10 @@ class Translated_UI(FontObserver):
 
             # ENABLE TYPEWRITER EFFECT for Dalamud mode
             # User requested typewriter effect to work with text hook integration
+            # คำแปลที่ stream: เริ่มก่อนส่วนที่แสดงไปแล้วหนึ่งตัวอักษร ให้รอบแรกวาดส่วนนั้นทันที
+            resume_index = self._stream_resume_index(dialogue)
             self.state.is_typing = True
-            self.type_writer_effect(dialogue)
+            self.type_writer_effect(dialogue, max(0, resume_index - 1))
 
         except Exception as e:
             self.logging_manager.log_error(f"Error in handle normal text: {e}")
@@ -0,0 +1,156 @@
+"""
+MBB Translation Batch - แปลหลายบรรทัดใน Gemini request เดียว
+JSON-array batching protocol with per-line recovery
+
+Request ส่งเป็น JSON array ของ object ที่มี id กำกับทุกบรรทัด:
+
+    [{"id": 0, "speaker": "Alphinaud", "text": "..."}, {"id": 1, "text": "..."}]
+
+และขอผลกลับเป็น array ที่อ้าง id เดิม:
+
+    [{"id": 0, "translation": "..."}, {"id": 1, "translation": "..."}]
+
+parse_batch_response() ทนต่อ output ที่ไม่สมบูรณ์: ตัด code fence, ถ้า array ถูกตัดกลางทาง
+(ชน max_output_tokens) จะกู้ object ที่ครบก่อนจุดตัดออกมาได้ - บรรทัดที่หายหรือผิดรูปเท่านั้น
+ที่ถูกส่งซ้ำในรอบถัดไป (ด้วย batch ที่เล็กลง) ส่วนที่ยังไม่ได้หลังรอบสุดท้ายคืนให้ผู้เรียกแปลทีละบรรทัด
+"""
+
+import re
+import json
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+logger = logging.getLogger('TranslationBatch')
+
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_MAX_ROUNDS = 2
+
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+# object ชั้นเดียว (ไม่มี {} ซ้อน) - ใช้กู้รายการจาก array ที่ JSON ไม่ครบ
+_OBJECT_RE = re.compile(r"\{[^{}]*\}")
+
+BATCH_INSTRUCTIONS = (
+    "\n\nBATCH FORMAT:\n"
+    "The input below is a JSON array. Translate the \"text\" of EVERY object independently "
+    "(\"speaker\", if present, is who says the line - use it for tone, do not translate it).\n"
+    "Return ONLY a JSON array with one object per input object, in the same order: "
+    "[{\"id\": <same id>, \"translation\": \"<Thai translation>\"}]\n"
+    "Do not merge, split or skip lines. No markdown, no explanations.\n\n"
+)
+
+
+def format_batch_request(items: Iterable[Dict[str, Any]]) -> str:
+    """JSON array ของบรรทัดที่จะแปล (ensure_ascii=False ประหยัด token กับอักษรไม่ใช่ ASCII)"""
+    payload = []
+    for item in items:
+        entry = {"id": item["id"]}
+        if item.get("speaker"):
+            entry["speaker"] = item["speaker"]
+        entry["text"] = item["text"]
+        payload.append(entry)
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _entry_translation(entry: Any):
+    if not isinstance(entry, dict):
+        return None, None
+    translation = entry.get("translation")
+    if translation is None:
+        translation = entry.get("text")
+    return entry.get("id"), translation
+
+
+def parse_batch_response(raw: str, expected_ids: Iterable[int]) -> Dict[int, str]:
+    """
+    แยกผลของ batch กลับเป็นรายบรรทัด
+
+    Returns:
+        {id: translation} เฉพาะ id ที่คาดไว้และได้ข้อความไม่ว่าง - id ที่ไม่อยู่ใน dict คือบรรทัดที่ต้องขอใหม่
+    """
+    expected = list(expected_ids)
+    wanted = set(expected)
+    text = _FENCE_RE.sub("", (raw or "").strip())
+
+    entries: List[Any] = []
+    start, end = text.find("["), text.rfind("]")
+    if start != -1 and end > start:
+        try:
+            parsed = json.loads(text[start:end + 1])
+            if isinstance(parsed, list):
+                entries = parsed
+        except ValueError:
+            pass
+
+    # model ตอบเป็น array ของ string ล้วน - ใช้ตำแหน่งแทน id ได้เมื่อจำนวนตรงกันเท่านั้น
+    if entries and all(isinstance(entry, str) for entry in entries):
+        if len(entries) != len(expected):
+            return {}
+        entries = [{"id": line_id, "translation": entry} for line_id, entry in zip(expected, entries)]
+
+    if not entries:
+        for match in _OBJECT_RE.finditer(text):
+            try:
+                entries.append(json.loads(match.group(0)))
+            except ValueError:
+                continue
+
+    results: Dict[int, str] = {}
+    for entry in entries:
+        line_id, translation = _entry_translation(entry)
+        if isinstance(line_id, str) and line_id.isdigit():
+            line_id = int(line_id)
+        if line_id not in wanted or line_id in results:
+            continue
+        if isinstance(translation, str) and translation.strip():
+            results[line_id] = translation.strip()
+    return results
+
+
+def translate_in_batches(
+    items: Dict[int, Dict[str, Any]],
+    send: Callable[[List[Dict[str, Any]]], str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_rounds: int = DEFAULT_MAX_ROUNDS,
+) -> Tuple[Dict[int, str], Set[int], Dict[str, int]]:
+    """
+    แปล items ทีละ batch แล้วส่งซ้ำเฉพาะบรรทัดที่หาย/ผิดรูป
+
+    Args:
+        items: {id: {"id", "text", "speaker"?}}
+        send: รับ list ของ item แล้วคืนข้อความดิบจาก model (raise ได้ - ทั้ง batch นับว่าหาย)
+        batch_size: จำนวนบรรทัดต่อ request ในรอบแรก (รอบถัดไปลดลงครึ่งหนึ่ง)
+        max_rounds: จำนวนรอบทั้งหมดรวมรอบแรก
+
+    Returns:
+        (results, missing, stats) - missing คือ id ที่ยังไม่ได้ผลหลังรอบสุดท้าย
+    """
+    results: Dict[int, str] = {}
+    pending = list(items)
+    size = max(1, int(batch_size))
+    stats = {'lines': len(pending), 'requests': 0, 'rerequested': 0, 'failed_requests': 0}
+
+    for round_index in range(max(1, int(max_rounds))):
+        if not pending:
+            break
+        if round_index:
+            stats['rerequested'] += len(pending)
+            logger.info(f"Re-requesting {len(pending)} missing line(s) (round {round_index + 1})")
+
+        missing: List[int] = []
+        for offset in range(0, len(pending), size):
+            chunk_ids = pending[offset:offset + size]
+            stats['requests'] += 1
+            try:
+                raw = send([items[line_id] for line_id in chunk_ids])
+                parsed = parse_batch_response(raw, chunk_ids)
+            except Exception as e:
+                logger.warning(f"Batch request failed ({len(chunk_ids)} lines): {e}")
+                stats['failed_requests'] += 1
+                parsed = {}
+            results.update(parsed)
+            missing.extend(line_id for line_id in chunk_ids if line_id not in parsed)
+
+        pending = missing
+        size = max(1, size // 2)
+
+    return results, set(pending), stats
@@ -0,0 +1,256 @@
+"""
+MBB Translation Cache - cache กลางที่ใช้ร่วมกันระหว่าง Dalamud handler, translator และ Translated_Logs
+Unified tiered translation cache with a shared LRU memory tier
+
+    memory tier -> LRU เดียวสำหรับทุก region จำกัดด้วยขนาดเป็น byte (ไม่ใช่จำนวนรายการ)
+    disk tier   -> PersistentTranslationCache (SQLite) เฉพาะ region "translations"
+
+Region แยก key ของผู้ใช้แต่ละราย:
+
+    translations   -> คำแปลเต็มข้อความของ Dalamud handler (key = stable_cache_key)
+    dialogue       -> TranslatorGemini: บทพูด -> คำแปล
+    speaker_names  -> ชื่อผู้พูดที่ normalize แล้ว -> ชื่อที่ใช้ (ความสม่ำเสมอของชื่อใน session)
+    log_messages   -> Translated_Logs smart replacement
+
+invalidate(reason) เป็นจุดเดียวที่ล้าง cache เมื่อ NPC.json, role_mode หรือ model เปลี่ยน:
+ล้างเฉพาะ region คำแปล (translations, dialogue) ใน memory tier แล้วแจ้ง listener ที่ลงทะเบียนไว้
+- speaker_names และ log_messages (ข้อมูล bubble ของ Translated_Logs) ไม่ใช่คำแปลจึงไม่ถูกล้าง
+ไม่งั้นการแปลบรรทัดล่าสุดซ้ำหลังเปลี่ยน model จะหา bubble เดิมไม่เจอและเพิ่ม bubble ซ้ำ
+disk tier ไม่ต้องล้าง เพราะ key
+ของ region translations รวม model, role_mode และ fingerprint ของ NPC.json อยู่แล้ว
+(รายการเก่าจะไม่ถูก hit และถูก prune ออกตามอายุ)
+"""
+
+import sys
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from translation_store import DEFAULT_STORE_CONFIG, PersistentTranslationCache, create_translation_store
+
+REGION_TRANSLATIONS = "translations"
+REGION_DIALOGUE = "dialogue"
+REGION_SPEAKER_NAMES = "speaker_names"
+REGION_LOG_MESSAGES = "log_messages"
+
+REGIONS = (REGION_TRANSLATIONS, REGION_DIALOGUE, REGION_SPEAKER_NAMES, REGION_LOG_MESSAGES)
+PERSISTENT_REGIONS = frozenset((REGION_TRANSLATIONS,))
+INVALIDATED_REGIONS = (REGION_TRANSLATIONS, REGION_DIALOGUE)  # region ที่ขึ้นกับ model / role_mode / NPC.json
+
+INVALIDATE_NPC_DATA = "npc_data"
+INVALIDATE_ROLE_MODE = "role_mode"
+INVALIDATE_MODEL = "model"
+
+DEFAULT_CACHE_CONFIG = {
+    **DEFAULT_STORE_CONFIG,                     # enabled/path/max_entries ของ disk tier
+    "memory_budget_bytes": 8 * 1024 * 1024,
+}
+
+# ค่าใช้จ่ายคร่าวๆ ของ node ใน OrderedDict + tuple (region, key) + tuple (value, size)
+_ENTRY_OVERHEAD = 200
+
+
+def estimate_size(value: Any) -> int:
+    """ขนาดโดยประมาณ (byte) ของ key/value - dict/tuple นับรวมสมาชิกหนึ่งชั้น"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (tuple, list)):
+        size += sum(sys.getsizeof(v) for v in value)
+    return size
+
+
+class MemoryTier:
+    """LRU ที่จำกัดด้วย byte budget - key เป็น (region, key)"""
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = max(1, int(budget_bytes))
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._region_counts: Dict[str, int] = {region: 0 for region in REGIONS}
+        self.bytes_used = 0
+        self.stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        return {'hits': 0, 'misses': 0, 'evictions': 0, 'writes': 0, 'rejected': 0}
+
+    def get(self, region: str, key: Hashable):
+        entry = self._entries.get((region, key))
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end((region, key))
+        self.stats['hits'] += 1
+        return entry[0]
+
+    def put(self, region: str, key: Hashable, value: Any):
+        size = _ENTRY_OVERHEAD + estimate_size(key) + estimate_size(value)
+        if size > self.budget_bytes:
+            self.stats['rejected'] += 1
+            return
+        self.pop(region, key)
+        self._entries[(region, key)] = (value, size)
+        self._region_counts[region] += 1
+        self.bytes_used += size
+        self.stats['writes'] += 1
+        self._evict()
+
+    def pop(self, region: str, key: Hashable) -> bool:
+        entry = self._entries.pop((region, key), None)
+        if entry is None:
+            return False
+        self.bytes_used -= entry[1]
+        self._region_counts[region] -= 1
+        return True
+
+    def clear(self, region: Optional[str] = None):
+        if region is None:
+            self._entries.clear()
+            self._region_counts = {name: 0 for name in REGIONS}
+            self.bytes_used = 0
+            return
+        for entry_key in [k for k in self._entries if k[0] == region]:
+            self.bytes_used -= self._entries.pop(entry_key)[1]
+        self._region_counts[region] = 0
+
+    def set_budget(self, budget_bytes: int):
+        self.budget_bytes = max(1, int(budget_bytes))
+        self._evict()
+
+    def _evict(self):
+        while self.bytes_used > self.budget_bytes and self._entries:
+            (region, _), (_, size) = self._entries.popitem(last=False)
+            self.bytes_used -= size
+            self._region_counts[region] -= 1
+            self.stats['evictions'] += 1
+
+    def region_size(self, region: str) -> int:
+        return self._region_counts[region]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'entries': len(self._entries),
+            'bytes_used': self.bytes_used,
+            'budget_bytes': self.budget_bytes,
+            'regions': dict(self._region_counts),
+        }
+
+
+class TieredTranslationCache:
+    """Memory tier (LRU, byte budget) + disk tier (optional) พร้อม invalidation hook เดียว"""
+
+    def __init__(self, memory_budget_bytes: int = DEFAULT_CACHE_CONFIG["memory_budget_bytes"],
+                 store: Optional[PersistentTranslationCache] = None):
+        self.logger = logging.getLogger('TranslationCache')
+        self._lock = threading.Lock()
+        self.memory = MemoryTier(memory_budget_bytes)
+        self.store = store
+        self._listeners: List[Callable[[str], None]] = []
+        self.invalidations: Dict[str, int] = {}
+
+    def get(self, region: str, key: Hashable):
+        """หาใน memory ก่อน แล้วค่อย disk (เฉพาะ region ที่ persistent) - เจอใน disk แล้วดึงขึ้น memory"""
+        with self._lock:
+            value = self.memory.get(region, key)
+        if value is None and self.store is not None and region in PERSISTENT_REGIONS:
+            value = self.store.get(key)
+            if value is not None:
+                with self._lock:
+                    self.memory.put(region, key, value)
+        return value
+
+    def put(self, region: str, key: Hashable, value: Any, persist: bool = True,
+            model: str = "", role_mode: str = ""):
+        """
+        เก็บค่าใน memory tier (และ disk tier ถ้า region persistent และ persist=True)
+
+        Args:
+            persist: False สำหรับค่าที่ไม่ควรอยู่ข้าม session (เช่นข้อความ error ของ translator)
+        """
+        with self._lock:
+            self.memory.put(region, key, value)
+        if persist and self.store is not None and region in PERSISTENT_REGIONS:
+            self.store.put(key, value, model, role_mode)
+
+    def delete(self, region: str, key: Hashable):
+        with self._lock:
+            self.memory.pop(region, key)
+        if self.store is not None and region in PERSISTENT_REGIONS:
+            self.store.delete(key)
+
+    def clear_region(self, region: str):
+        """ล้าง region ใน memory tier (disk tier ไม่ถูกแตะ)"""
+        with self._lock:
+            self.memory.clear(region)
+
+    def region_size(self, region: str) -> int:
+        with self._lock:
+            return self.memory.region_size(region)
+
+    def add_invalidation_listener(self, callback: Callable[[str], None]):
+        """callback(reason) ถูกเรียกหลัง invalidate() ล้าง cache แล้ว"""
+        if callback not in self._listeners:
+            self._listeners = self._listeners + [callback]
+
+    def remove_invalidation_listener(self, callback: Callable[[str], None]):
+        self._listeners = [listener for listener in self._listeners if listener != callback]
+
+    def invalidate(self, reason: str):
+        """
+        จุดเดียวที่ล้าง cache เมื่อบริบทการแปลเปลี่ยน
+
+        Args:
+            reason: INVALIDATE_NPC_DATA, INVALIDATE_ROLE_MODE หรือ INVALIDATE_MODEL
+        """
+        with self._lock:
+            for region in INVALIDATED_REGIONS:
+                self.memory.clear(region)
+            self.invalidations[reason] = self.invalidations.get(reason, 0) + 1
+        self.logger.info(f"Translation cache invalidated ({reason})")
+
+        for listener in self._listeners:
+            try:
+                listener(reason)
+            except Exception as e:
+                self.logger.error(f"Invalidation listener error: {e}")
+
+    def configure(self, config: Optional[Dict[str, Any]] = None):
+        """ตั้งค่าจาก setting 'translation_cache' - เปิด disk tier ใหม่ตาม path"""
+        config = {**DEFAULT_CACHE_CONFIG, **(config or {})}
+        with self._lock:
+            self.memory.set_budget(config["memory_budget_bytes"])
+        if self.store is not None:
+            self.store.close()
+        self.store = create_translation_store(config)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """hit/miss/eviction ต่อ tier"""
+        with self._lock:
+            memory = self.memory.get_stats()
+            invalidations = dict(self.invalidations)
+        disk = None
+        if self.store is not None:
+            disk = self.store.get_stats()
+            disk['evictions'] = disk['pruned']
+        return {'memory': memory, 'disk': disk, 'invalidations': invalidations}
+
+
+_cache = TieredTranslationCache()
+
+
+def get_translation_cache() -> TieredTranslationCache:
+    """Cache ที่ใช้ร่วมกันทั้ง handler, translator และ Translated_Logs"""
+    return _cache
+
+
+def configure_translation_cache(config: Optional[Dict[str, Any]] = None) -> TieredTranslationCache:
+    """ตั้งค่า cache กลางจาก setting 'translation_cache'"""
+    _cache.configure(config)
+    return _cache
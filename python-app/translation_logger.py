@@ -199,6 +199,36 @@ class TranslationLogger:
                     
         return logs
 
+    def retranslate_today_logs(self, translator, batch_size=10):
+        """
+        แปล log ภาษาอังกฤษของวันนี้ใหม่ทั้งหมดแล้วเขียนทับ log ภาษาไทย
+        ใช้ translator.batch_translate - หลายบรรทัดต่อหนึ่ง request แทนการแปลทีละบรรทัด
+        Args:
+            translator: TranslatorGemini (หรือ object ที่มี batch_translate)
+            batch_size (int): จำนวนบรรทัดต่อ request
+        Returns:
+            int: จำนวนบรรทัดที่แปลใหม่
+        """
+        en_lines = self.get_today_logs()['en']
+        if not en_lines:
+            return 0
+
+        translations = translator.batch_translate(en_lines, batch_size=batch_size)
+        try:
+            with open(self._get_log_files()['th'], 'w', encoding='utf-8') as f:
+                for original_text, translated_text in zip(en_lines, translations):
+                    en_speaker, _ = self._format_message(original_text)
+                    _, th_content = self._format_message(translated_text or "")
+                    if en_speaker:
+                        f.write(f"{en_speaker}: {th_content}\n\n")
+                    else:
+                        f.write(f"{th_content}\n\n")
+            logging.info(f"Re-translated {len(en_lines)} logged lines")
+        except Exception as e:
+            logging.error(f"Error writing re-translated log: {e}")
+            raise
+        return len(en_lines)
+
     def clear_today_logs(self):
         """Clear log files for today"""
         try:
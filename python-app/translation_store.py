@@ -0,0 +1,192 @@
+"""
+MBB Translation Store - cache คำแปลแบบถาวรบนดิสก์ (SQLite)
+Persistent translation cache keyed by a stable content digest
+
+Key คือ blake2b ของ (ข้อความที่ normalize แล้ว, speaker, model, role_mode, prompt version,
+fingerprint ของ NPC.json)
+จึงเหมือนเดิมทุกครั้งที่เปิดโปรแกรม (ต่างจาก hash() ของ Python ที่สุ่มต่อ process)
+
+ตอนเปิด store ข้อมูลทั้งหมดถูกโหลดเข้า dict ครั้งเดียว - get() จึงเป็นแค่ dict lookup
+put() เขียนลง SQLite ทันที (WAL) เพื่อให้คำแปลไม่หายถ้าโปรแกรมปิดกะทันหัน
+
+จำนวนรายการจำกัดที่ max_entries ทั้งตอนโหลดและระหว่างใช้งาน - put() ปล่อยให้เกินได้ 5%
+แล้วลบรายการเก่าสุดทีเดียวจนเหลือ max_entries (ไม่ต้อง DELETE ทุกครั้งที่เขียน)
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import Any, Dict, Optional
+
+DEFAULT_STORE_CONFIG = {
+    "enabled": True,
+    "path": "cache/translation_cache.sqlite3",
+    "max_entries": 50000,
+}
+
+_KEY_SEPARATOR = "\x1f"
+
+# put() ยอมให้เกิน max_entries ได้สัดส่วนนี้ก่อน prune (ลดจำนวนครั้งที่ต้อง DELETE)
+PRUNE_SLACK = 0.05
+
+
+def normalize_text(text: str) -> str:
+    """NFC + ยุบ whitespace - ข้อความที่ต่างกันแค่ช่องว่างได้ key เดียวกัน"""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def stable_cache_key(text: str, speaker: str = "", model: str = "", role_mode: str = "",
+                     prompt_version: str = "", data_version: str = "") -> str:
+    """Digest ที่คงที่ข้าม process ของข้อความ + บริบทการแปล"""
+    material = _KEY_SEPARATOR.join((
+        normalize_text(text),
+        normalize_text(speaker),
+        model or "",
+        role_mode or "",
+        str(prompt_version or ""),
+        data_version or "",
+    ))
+    return hashlib.blake2b(material.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class PersistentTranslationCache:
+    """SQLite-backed cache พร้อม index ใน memory"""
+
+    def __init__(self, path: str = DEFAULT_STORE_CONFIG["path"],
+                 max_entries: int = DEFAULT_STORE_CONFIG["max_entries"]):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self._prune_above = self.max_entries + max(1, int(self.max_entries * PRUNE_SLACK))
+        self._closed = False
+        self.logger = logging.getLogger('TranslationStore')
+        self._lock = threading.Lock()
+        self._index: Dict[str, str] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'write_errors': 0,
+            'loaded': 0,
+            'pruned': 0,
+            'writes_after_close': 0,
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " translated TEXT NOT NULL,"
+            " model TEXT,"
+            " role_mode TEXT,"
+            " created REAL NOT NULL"
+            ")"
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        start = time.perf_counter()
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            if rows > self.max_entries:
+                self._prune_locked()
+            self._index = dict(self._conn.execute("SELECT key, translated FROM translations"))
+            self.stats['loaded'] = len(self._index)
+        self.logger.info(f"Loaded {len(self._index)} cached translations from {self.path} "
+                         f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def _prune_locked(self) -> int:
+        """เก็บเฉพาะรายการใหม่สุด max_entries รายการ (เรียกขณะถือ _lock) - คืนจำนวนที่ลบ"""
+        stale = [row[0] for row in self._conn.execute(
+            "SELECT key FROM translations ORDER BY created DESC LIMIT -1 OFFSET ?",
+            (self.max_entries,),
+        )]
+        if not stale:
+            return 0
+        self._conn.executemany("DELETE FROM translations WHERE key = ?", ((key,) for key in stale))
+        self._conn.commit()
+        for key in stale:
+            self._index.pop(key, None)
+        self.stats['pruned'] += len(stale)
+        return len(stale)
+
+    def get(self, key: str) -> Optional[str]:
+        translated = self._index.get(key)
+        if translated is None:
+            self.stats['misses'] += 1
+        else:
+            self.stats['hits'] += 1
+        return translated
+
+    def put(self, key: str, translated: str, model: str = "", role_mode: str = ""):
+        if not translated:
+            return
+        with self._lock:
+            if self._closed:
+                # งานแปลที่จบหลังปิดโปรแกรม - ไม่มีที่เขียนแล้ว
+                self.stats['writes_after_close'] += 1
+                return
+            self._index[key] = translated
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO translations (key, translated, model, role_mode, created) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, translated, model, role_mode, time.time()),
+                )
+                self._conn.commit()
+                self.stats['writes'] += 1
+                if len(self._index) > self._prune_above:
+                    self._prune_locked()
+            except sqlite3.Error as e:
+                self.stats['write_errors'] += 1
+                self.logger.error(f"Cannot write translation cache: {e}")
+
+    def delete(self, key: str):
+        with self._lock:
+            self._index.pop(key, None)
+            if self._closed:
+                return
+            self._conn.execute("DELETE FROM translations WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._index.clear()
+            if self._closed:
+                return
+            self._conn.execute("DELETE FROM translations")
+            self._conn.commit()
+        self.logger.info("Persistent translation cache cleared")
+
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._conn.close()
+
+    def __len__(self):
+        return len(self._index)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'entries': len(self._index), 'path': self.path}
+
+
+def create_translation_store(config: Optional[Dict[str, Any]] = None) -> Optional[PersistentTranslationCache]:
+    """สร้าง store จาก setting 'translation_cache' (None ถ้าปิดไว้หรือเปิดไฟล์ไม่ได้)"""
+    config = {**DEFAULT_STORE_CONFIG, **(config or {})}
+    if not config["enabled"]:
+        return None
+    try:
+        return PersistentTranslationCache(config["path"], config["max_entries"])
+    except (sqlite3.Error, OSError) as e:
+        logging.getLogger('TranslationStore').error(f"Persistent translation cache disabled: {e}")
+        return None
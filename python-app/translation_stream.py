@@ -0,0 +1,76 @@
+"""
+MBB Translation Stream - ส่งคำแปลบางส่วนไปแสดงบน TUI ระหว่างที่ model ยังสร้างไม่เสร็จ
+Progressive (streamed) translation output
+
+translator ไม่ต้องรู้จัก UI โดยตรง: handler activate partial sink ใน context ก่อนเรียก translate()
+(แบบเดียวกับ dalamud_trace) translator ที่รองรับ streaming ตรวจ has_partial_sink() แล้วใช้
+generate_content(stream=True) และเรียก emit_partial() ทุกครั้งที่ได้ประโยคที่จบแล้ว
+
+คำแปลบางส่วนเป็นเพียงตัวอย่างก่อนคำแปลจริง - post-process ที่ต้องเห็นข้อความทั้งหมด
+(เช่นแก้ศัพท์ lore) ทำกับคำแปลเต็มเท่านั้น แล้ว TUI พิมพ์ต่อจากส่วนที่ยังตรงกับคำแปลเต็ม
+"""
+
+import re
+import logging
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+logger = logging.getLogger('TranslationStream')
+
+# ปล่อยให้ UI เฉพาะข้อความที่จบประโยค/วลีแล้ว - ไม่แสดงคำที่ยังสร้างไม่ครบ
+# จบประโยค: . ! ? … (ตามด้วย quote/วงเล็บปิดได้) แล้วเว้นวรรค, ขึ้นบรรทัดใหม่
+# หรือเว้นวรรคระหว่างอักษรไทย (ภาษาไทยใช้ช่องว่างคั่นประโยค)
+_BOUNDARY_RE = re.compile(
+    r"[.!?…]+[\"'”’」』)]*\s|\n|(?<=[\u0E00-\u0E7F])\s+(?=[\u0E00-\u0E7F])"
+)
+
+DEFAULT_MIN_PARTIAL_CHARS = 12
+
+_partial_sink: ContextVar[Optional[Callable[[str], None]]] = ContextVar("mbb_partial_sink", default=None)
+
+
+def activate(callback: Optional[Callable[[str], None]]):
+    """ตั้ง partial sink ของ thread/task นี้ - คืน token สำหรับ deactivate()"""
+    return _partial_sink.set(callback)
+
+
+def deactivate(token):
+    _partial_sink.reset(token)
+
+
+def has_partial_sink() -> bool:
+    return _partial_sink.get() is not None
+
+
+def emit_partial(text: str):
+    """ส่งคำแปลบางส่วนให้ sink ที่ active (ไม่ทำอะไรถ้าไม่มี) - error ของ UI ไม่ทำให้การแปลล้ม"""
+    sink = _partial_sink.get()
+    if sink is None or not text:
+        return
+    try:
+        sink(text)
+    except Exception as e:
+        logger.error(f"Partial sink error: {e}")
+
+
+class SentenceStream:
+    """สะสม text delta จาก stream แล้วคืน prefix ที่จบประโยคล่าสุด (ถ้ายาวขึ้นพอ)"""
+
+    def __init__(self, min_chars: int = DEFAULT_MIN_PARTIAL_CHARS):
+        self.min_chars = max(1, int(min_chars))
+        self.text = ""
+        self._emitted = 0
+
+    def feed(self, delta: str) -> Optional[str]:
+        """เพิ่ม delta - คืน prefix ใหม่ที่ควรแสดง หรือ None ถ้ายังไม่มีประโยคใหม่ที่จบ"""
+        if not delta:
+            return None
+        self.text += delta
+
+        boundary = None
+        for match in _BOUNDARY_RE.finditer(self.text, self._emitted):
+            boundary = match.start() if match.group(0).isspace() else match.end()
+        if boundary is None or boundary - self._emitted < self.min_chars:
+            return None
+        self._emitted = boundary
+        return self.text[:boundary].rstrip()
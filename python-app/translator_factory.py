@@ -1,5 +1,6 @@
 import logging
 from translator_gemini import TranslatorGemini
+from model_router import create_model_router
 
 
 class TranslatorFactory:
@@ -27,9 +28,15 @@ class TranslatorFactory:
 
             logging.info(f"Validated model type: {model_type} for model: {model}")
 
+            # router เลือก model ต่อบรรทัด (บรรทัดสั้น/ต่อสู้ -> model เร็ว, เนื้อเรื่องยาว -> model ที่ตั้งไว้)
+            router = create_model_router(settings.get("model_routing"))
+            if router is not None:
+                routes = ", ".join(f"{route.name}->{route.model}" for route in router.routes)
+                logging.info(f"Model routing enabled: {routes} (default -> {model})")
+
             # สร้าง Gemini translator เท่านั้น
             logging.info(f"Creating Gemini Translator with model: {model}")
-            translator = TranslatorGemini(settings)
+            translator = TranslatorGemini(settings, router=router)
             logging.info(
                 f"Successfully created TranslatorGemini instance: {type(translator).__name__}"
             )
@@ -5,6 +5,7 @@ import re
 import tkinter as tk
 from tkinter import messagebox
 import json
+import hashlib
 import difflib
 import time
 import logging
@@ -13,6 +14,42 @@ import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from text_corrector import TextCorrector, DialogueType
 from dialogue_cache import DialogueCache
+from dalamud_trace import (
+    mark as trace_mark,
+    STAGE_SPEAKER_SPLIT,
+    STAGE_PROMPT_BUILT,
+    STAGE_API_START,
+    STAGE_API_END,
+    STAGE_POST_PROCESS,
+)
+from translation_cache import (
+    get_translation_cache,
+    REGION_TRANSLATIONS,
+    REGION_DIALOGUE,
+    REGION_SPEAKER_NAMES,
+    INVALIDATE_MODEL,
+    INVALIDATE_NPC_DATA,
+    INVALIDATE_ROLE_MODE,
+)
+from translation_store import stable_cache_key
+from keyword_index import KeywordIndex
+from prompt_budget import create_prompt_assembler, usage_tokens
+from gemini_guard import ERROR_FATAL, GuardedModel, classify_error
+from gemini_hedge import (
+    DEFAULT_HEDGING_CONFIG,
+    HedgedModel,
+    create_hedge_tracker,
+    hedge_cache_key,
+    served_model_scope,
+)
+from model_router import CLASS_CHOICE, RoutingModel, current_message_class, route_scope
+from translation_stream import SentenceStream, emit_partial, has_partial_sink
+from translation_batch import (
+    BATCH_INSTRUCTIONS,
+    DEFAULT_BATCH_SIZE,
+    format_batch_request,
+    translate_in_batches,
+)
 
 # เพิ่มการ import EnhancedNameDetector ถ้ามี
 try:
@@ -24,9 +61,47 @@ except ImportError:
 
 load_dotenv()
 
+# ผู้พูดที่ยังไม่เปิดเผยตัว (??? หรือชื่อที่ OCR/hook อ่านเป็นเลข 2)
+_MYSTERY_NAME_RE = re.compile(r"^(?:\?\?\?|2+)$")
+MYSTERY_CHARACTER = {
+    "firstName": "???",
+    "gender": "unknown",
+    "role": "Mystery character",
+    "relationship": "Unknown/Mysterious",
+    "pronouns": {"subject": "ฉัน", "object": "ฉัน", "possessive": "ของฉัน"},
+}
+MYSTERY_STYLE = (
+    "พูดจาลึกลับและสร้างความสงสัย ใช้คำพูดแบบไม่ระบุเพศ หลีกเลี่ยงคำสรรพนามที่บ่งบอกเพศ "
+    "ใช้น้ำเสียงที่ปริศนาและทำให้คนฟังสงสัยในตัวตน เช่น 'เรา' แทน 'ฉัน' หรือ 'ข้า' "
+    "และใช้คำพูดที่กำกวม สร้างบรรยากาศลึกลับ"
+)
+
+
+def format_character_fragment(info, style=""):
+    """ส่วน prompt ของตัวละครหนึ่งตัว: Context / Character's style / Pronouns (ถ้ามี)"""
+    context = ""
+    if info:
+        context = (
+            f"Character: {info.get('firstName', '')}, "
+            f"Gender: {info.get('gender', '')}, "
+            f"Role: {info.get('role', '')}, "
+            f"Relationship: {info.get('relationship', '')}"
+        )
+    fragment = f"Context: {context}\nCharacter's style: {style}\n"
+    pronouns = info.get("pronouns") if info else None
+    if pronouns:
+        fragment += "Pronouns: " + ", ".join(f"{form} '{word}'" for form, word in pronouns.items()) + "\n"
+    return fragment
+
+
+EMPTY_CHARACTER_FRAGMENT = format_character_fragment(None)
+
 
 class TranslatorGemini:
-    def __init__(self, settings=None):
+    # เปลี่ยนเมื่อแก้ prompt แปล - cache คำแปลถาวรจะไม่ใช้ผลจาก prompt เวอร์ชันเก่า
+    PROMPT_VERSION = "2"
+
+    def __init__(self, settings=None, router=None):
         self.api_key = os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             # เพิ่มการแจ้งเตือนที่ชัดเจนเมื่อไม่พบ API Key
@@ -38,7 +113,17 @@ class TranslatorGemini:
             raise ValueError(error_msg)
 
         # Initialize Gemini API
-        genai.configure(api_key=self.api_key)
+        # GEMINI_API_ENDPOINT ชี้ไป endpoint อื่น (เช่น fake_gemini_server.py) ผ่าน REST transport
+        api_endpoint = os.getenv("GEMINI_API_ENDPOINT")
+        if api_endpoint:
+            logging.warning(f"Using Gemini API endpoint: {api_endpoint}")
+            genai.configure(
+                api_key=self.api_key,
+                transport="rest",
+                client_options={"api_endpoint": api_endpoint},
+            )
+        else:
+            genai.configure(api_key=self.api_key)
 
         # Initialize default values first
         self.model_name = "gemini-2.0-flash-lite"
@@ -46,6 +131,16 @@ class TranslatorGemini:
         self.temperature = 0.7
         self.top_p = 0.9
         self.current_role_mode = "rpg_general"
+        # งบ token ต่อ request + ตัวนับ token ที่ปรับเทียบกับ usage_metadata
+        self.prompt_assembler = create_prompt_assembler(
+            settings.get("prompt_budget") if settings else None
+        )
+        # hedged request ไป model ที่เร็วกว่าเมื่อ model หลักช้ากว่า p90 (ปิดไว้ถ้าไม่ได้ตั้ง)
+        hedging_config = {**DEFAULT_HEDGING_CONFIG, **((settings.get("gemini_hedging") if settings else None) or {})}
+        self.hedge_tracker = create_hedge_tracker(hedging_config)
+        self.hedge_model_name = hedging_config["model"] if self.hedge_tracker else None
+        # เลือก model ต่อบรรทัดตามความยาว/ประเภทข้อความ (TranslatorFactory สร้างจาก 'model_routing')
+        self.router = router
 
         # ใช้ settings object ถ้ามี
         if settings:
@@ -95,28 +190,26 @@ class TranslatorGemini:
         ]
 
         # Initialize Gemini model
-        genai_model = genai.GenerativeModel(
-            model_name=self.model_name,
-            generation_config={
-                "max_output_tokens": self.max_tokens,
-                "temperature": self.temperature,
-                "top_p": self.top_p,
-            },
-            safety_settings=self.safety_settings,
-        )
-        self.model = genai_model
+        self.model = self._create_model()
 
         self.cache = DialogueCache()
-        self.last_translations = {}
+        # cache กลาง: region dialogue (บทพูด -> คำแปล) และ speaker_names (ชื่อผู้พูดใน session)
+        self.translation_cache = get_translation_cache()
         self.character_names_cache = set()
+        # automaton ของชื่อ/ศัพท์ lore - สร้างใน load_npc_data เมื่อ NPC.json เปลี่ยนเท่านั้น
+        self.name_index = KeywordIndex(())
+        self.lore_index = KeywordIndex(())
+        self.keyword_index_version = None
+        # ชื่อ/alias ตัวละคร -> ส่วน prompt (context + style + สรรพนาม) ที่ประกอบไว้แล้ว
+        self.character_by_alias = {}
+        self.character_fragments = {}
+        self._mystery_fragment = format_character_fragment(MYSTERY_CHARACTER)
         self.text_corrector = TextCorrector()
         self.load_npc_data()
         self.load_example_translations()
 
-        # Session-based character name cache for consistency
-        self.session_character_names = {}  # {original_name: translated_name}
+        # Session-based character name cache for consistency (REGION_SPEAKER_NAMES ใน cache กลาง)
         self.session_speaker_count = 0     # Track session activity
-        self.max_session_names = 50        # Prevent memory growth
         self.cache_hits = 0                # Track cache performance
         self.cache_misses = 0              # Track cache performance
 
@@ -132,6 +225,32 @@ class TranslatorGemini:
                 logging.warning(f"Failed to initialize EnhancedNameDetector: {e}")
                 self.enhanced_detector = None
 
+    def _create_model(self):
+        """
+        GenerativeModel ของ model_name ปัจจุบัน - ทุก call ผ่าน rate limit / retry / circuit breaker กลาง
+        hedge ไป hedge_model_name ถ้าเปิด gemini_hedging และส่งไป model ของ route ถ้ามี router
+        """
+
+        def guarded(model_name):
+            return GuardedModel(
+                genai.GenerativeModel(
+                    model_name=model_name,
+                    generation_config={
+                        "max_output_tokens": self.max_tokens,
+                        "temperature": self.temperature,
+                        "top_p": self.top_p,
+                    },
+                    safety_settings=self.safety_settings,
+                )
+            )
+
+        model = guarded(self.model_name)
+        if self.hedge_tracker is not None and self.hedge_model_name != self.model_name:
+            model = HedgedModel(model, guarded(self.hedge_model_name), self.hedge_model_name, self.hedge_tracker)
+        if self.router is not None:
+            model = RoutingModel(model, self.model_name, self.router, guarded)
+        return model
+
     def get_current_parameters(self):
         """Return current translation parameters"""
         # สำหรับ Gemini จะแสดงชื่อรุ่นที่ง่ายต่อการอ่าน
@@ -153,7 +272,12 @@ class TranslatorGemini:
         """Load character data, lore, styles, and specific H-game terms from NPC.json."""
         try:
             with open("NPC.json", "r", encoding="utf-8") as file:
-                npc_data = json.load(file)
+                raw_npc_data = file.read()
+                npc_data = json.loads(raw_npc_data)
+                # fingerprint ของ NPC.json - เป็นส่วนหนึ่งของ cache key คำแปล
+                self.npc_data_version = hashlib.blake2b(
+                    raw_npc_data.encode("utf-8"), digest_size=8
+                ).hexdigest()
                 self.character_data = npc_data["main_characters"]
                 self.context_data = npc_data["lore"]
                 self.character_styles = npc_data["character_roles"]
@@ -183,6 +307,16 @@ class TranslatorGemini:
                 for npc in npc_data["npcs"]:
                     self.character_names_cache.add(npc["name"])
 
+                # สร้าง automaton ใหม่เฉพาะเมื่อเนื้อหา NPC.json เปลี่ยน (reload ซ้ำไม่เสียเวลา)
+                if self.keyword_index_version != self.npc_data_version:
+                    self.name_index = KeywordIndex(self.character_names_cache)
+                    self.lore_index = KeywordIndex(self.context_data)
+                    self.keyword_index_version = self.npc_data_version
+                    logging.info(
+                        f"Built keyword index: {len(self.name_index)} names, {len(self.lore_index)} lore terms"
+                    )
+                    self._build_character_fragments()
+
                 logging.info("TranslatorGemini: Loaded NPC.json successfully")
 
         except FileNotFoundError:
@@ -269,16 +403,11 @@ class TranslatorGemini:
             logging.info(
                 f"Recreating Gemini model with parameters: {self.model_name}, max_tokens={self.max_tokens}, temp={self.temperature}"
             )
-            self.model = genai.GenerativeModel(
-                model_name=self.model_name,
-                generation_config={
-                    "max_output_tokens": self.max_tokens,
-                    "temperature": self.temperature,
-                    "top_p": self.top_p,
-                },
-                safety_settings=self.safety_settings,
-            )
-            logging.info(f"Successfully recreated Gemini model: {self.model}")
+            self.model = self._create_model()
+            logging.info(f"Successfully recreated Gemini model: {self.model_name}")
+
+            if self.model_name != old_params["model"]:
+                self.translation_cache.invalidate(INVALIDATE_MODEL)
 
             if changes:
                 logging.info("\n=== Gemini Parameters Updated ===")
@@ -298,7 +427,10 @@ class TranslatorGemini:
         """Set the current role mode for translation"""
         valid_roles = ["rpg_general", "adult_enhanced"]
         if role_mode in valid_roles:
+            changed = role_mode != self.current_role_mode
             self.current_role_mode = role_mode
+            if changed:
+                self.translation_cache.invalidate(INVALIDATE_ROLE_MODE)
             logging.info(f"Role mode set to: {role_mode}")
         else:
             logging.warning(
@@ -307,13 +439,8 @@ class TranslatorGemini:
 
     def get_relevant_names(self, text):
         """Extract only character names mentioned in the current text (OPTIMIZATION)"""
-        relevant_names = set()
-        text_lower = text.lower()
-
-        # Check for names that appear in the text
-        for name in self.character_names_cache:
-            if name.lower() in text_lower:
-                relevant_names.add(name)
+        # Check for names that appear in the text (one pass over the text - see keyword_index)
+        relevant_names = set(self.name_index.find(text))
 
         # Always include essential names that might appear frequently
         essential_names = {
@@ -338,12 +465,10 @@ class TranslatorGemini:
     def get_relevant_lore_terms(self, text, speaker=None):
         """Extract only lore terms that might be relevant to current text (OPTIMIZATION)"""
         relevant_terms = {}
-        text_lower = text.lower()
 
         # Priority 1: Direct keyword matches
-        for term, explanation in self.context_data.items():
-            if term.lower() in text_lower:
-                relevant_terms[term] = explanation
+        for term in self.lore_index.find(text):
+            relevant_terms[term] = self.context_data[term]
 
         # Priority 2: Character-specific lore (if we know the speaker)
         if speaker and len(relevant_terms) < 5:
@@ -365,9 +490,8 @@ class TranslatorGemini:
         return relevant_terms
 
     def count_tokens_estimate(self, text):
-        """Rough token estimation for monitoring (OPTIMIZATION)"""
-        # Rough estimate: 1 token ≈ 4 characters for mixed EN/TH
-        return len(text) // 4
+        """จำนวน token โดยประมาณ (ตัวนับในเครื่องที่ปรับเทียบกับ usage_metadata แล้ว)"""
+        return self.prompt_assembler.counter.count(text)
 
     def get_system_prompt(self, role_mode=None):
         """Get system prompt based on current role mode"""
@@ -528,6 +652,18 @@ class TranslatorGemini:
         Returns:
             str: ข้อความที่แปลแล้ว
         """
+        # served.model = model ที่ตอบจริงถ้าไม่ใช่ model หลัก (hedge ชนะ / route) - ใช้เป็นส่วนหนึ่งของ cache key
+        with served_model_scope() as served, route_scope(self._choose_route(text, is_choice_option)):
+            return self._translate(text, is_choice_option, served)
+
+    def _choose_route(self, text, is_choice_option=False):
+        """route ของบรรทัดนี้จากความยาวและประเภทข้อความที่ handler ตั้งไว้ (None = model หลัก)"""
+        if self.router is None or not text:
+            return None
+        message_class = CLASS_CHOICE if is_choice_option else current_message_class()
+        return self.router.choose(text, message_class, self.model_name)
+
+    def _translate(self, text, is_choice_option, served):
         try:
             if not text:
                 logging.warning("Empty text received for translation")
@@ -547,6 +683,7 @@ class TranslatorGemini:
                 speaker = None
                 content = text
                 dialogue_type = None
+            trace_mark(STAGE_SPEAKER_SPLIT)
 
             # ตรวจสอบ word_fixes สำหรับข้อความทั้งหมด
             if hasattr(self, "word_fixes") and text.strip() in self.word_fixes:
@@ -605,8 +742,9 @@ class TranslatorGemini:
                     normalized_speaker = speaker.lower().strip()
 
                     # CRITICAL: Use exact string match to prevent "Gulool Ja" vs "Gulool Ja Ja" conflicts
-                    if normalized_speaker in self.session_character_names:
-                        character_name = self.session_character_names[normalized_speaker]
+                    cached_name = self.translation_cache.get(REGION_SPEAKER_NAMES, normalized_speaker)
+                    if cached_name is not None:
+                        character_name = cached_name
                         self.cache_hits += 1
                         logging.debug(f"[NAME CACHE] Cache HIT: {speaker} -> {character_name}")
                     else:
@@ -618,35 +756,13 @@ class TranslatorGemini:
                     character_name = speaker  # Fallback to original behavior
                 dialogue = content
 
-                # ตรวจสอบ cache สำหรับการแปล
-                if (
-                    dialogue in self.last_translations
-                    and character_name == self.cache.get_last_speaker()
-                ):
-                    translated_dialogue = self.last_translations[dialogue]
+                # ตรวจสอบ cache สำหรับการแปล (key รวมชื่อผู้พูด model และ role_mode)
+                translated_dialogue = self._cached_dialogue(dialogue, character_name)
+                if translated_dialogue is not None:
                     return f"{character_name}: {translated_dialogue}"
 
-                # 1. ดึงข้อมูลพื้นฐานของตัวละคร
-                character_info = self.get_character_info(character_name)
-                context = ""
-                if character_info:
-                    context = (
-                        f"Character: {character_info['firstName']}, "
-                        f"Gender: {character_info['gender']}, "
-                        f"Role: {character_info['role']}, "
-                        f"Relationship: {character_info['relationship']}"
-                    )
-                elif character_name == "???":
-                    context = "Character: Unknown, Role: Mystery character"
-
-                # 2. ดึงรูปแบบการพูด
-                character_style = self.character_styles.get(character_name, "")
-                if not character_style and character_name == "???":
-                    character_style = (
-                        "พูดจาลึกลับและสร้างความสงสัย ใช้คำพูดแบบไม่ระบุเพศ หลีกเลี่ยงคำสรรพนามที่บ่งบอกเพศ "
-                        "ใช้น้ำเสียงที่ปริศนาและทำให้คนฟังสงสัยในตัวตน เช่น 'เรา' แทน 'ฉัน' หรือ 'ข้า' "
-                        "และใช้คำพูดที่กำกวม สร้างบรรยากาศลึกลับ"
-                    )
+                # ข้อมูลตัวละคร + รูปแบบการพูด (ประกอบไว้แล้วตอนโหลด NPC.json)
+                character_fragment = self.get_character_fragment(character_name)
 
                 self.cache.add_speaker(character_name)
 
@@ -654,8 +770,7 @@ class TranslatorGemini:
                 # กรณีข้อความทั่วไป
                 dialogue = text
                 character_name = ""
-                context = ""
-                character_style = ""
+                character_fragment = EMPTY_CHARACTER_FRAGMENT
 
             # สร้าง prompt และแปล
             # Use role-specific system prompt
@@ -663,31 +778,23 @@ class TranslatorGemini:
             # OPTIMIZATION: Use smart lore filtering instead of all terms
             relevant_lore_terms = self.get_relevant_lore_terms(dialogue, character_name)
 
-            prompt = (
-                base_prompt + f"Context: {context}\n"
-                f"Character's style: {character_style}\n"
-                f"Preserve names: {', '.join(self.get_relevant_names(dialogue))}\n\n"
-                "Special Terms (Strongly prefer using these Thai translations):\n"
+            # ประกอบ prompt ภายใต้งบ token: style > ชื่อ > ศัพท์ lore (ส่วนที่ไม่พอถูกตัด)
+            assembled = self.prompt_assembler.assemble(
+                base_prompt,
+                f"\n\nText to translate: {dialogue}",
+                style=character_fragment,
+                names=self.get_relevant_names(dialogue),
+                lore=relevant_lore_terms.items(),
             )
+            prompt = assembled.text
+            trace_mark(STAGE_PROMPT_BUILT)
 
-            for term, explanation in relevant_lore_terms.items():
-                prompt += f"{term}: {explanation}\n"
-
-            prompt += f"\n\nText to translate: {dialogue}"
-
-            # OPTIMIZATION: Monitor token usage
-            estimated_tokens = self.count_tokens_estimate(prompt)
+            dropped = {part: count for part, count in assembled.dropped.items() if count}
             logging.info(
-                f"🔍 Estimated prompt tokens: {estimated_tokens} (Target: <600)"
+                f"🔍 Prompt tokens: ~{assembled.estimated_tokens} (budget {assembled.budget})"
+                + (f", dropped {dropped}" if dropped else "")
             )
 
-            if estimated_tokens > 800:
-                logging.warning(
-                    f"⚠️ High token usage detected: {estimated_tokens} tokens"
-                )
-            elif estimated_tokens < 500:
-                logging.info(f"✅ Optimized token usage: {estimated_tokens} tokens")
-
             try:
                 # สร้าง Content สำหรับ Gemini API
                 generation_config = {
@@ -706,63 +813,57 @@ class TranslatorGemini:
                 start_time = time.time()
 
                 # แก้ไขวิธีการเรียก API - ส่งเฉพาะ prompt (ไม่ส่ง dialogue แยก)
-                response = self.model.generate_content(
-                    prompt,  # ส่งเฉพาะ prompt เต็มๆ ไม่ต้องส่ง dialogue แยก
-                    generation_config=generation_config,
-                    safety_settings=self.safety_settings,
-                )
+                trace_mark(STAGE_API_START)
+                if has_partial_sink():
+                    # handler ขอคำแปลบางส่วน - stream แล้วส่งทีละประโยคให้ TUI
+                    response_text, usage_metadata = self._generate_streamed(
+                        prompt, generation_config, character_name
+                    )
+                else:
+                    response = self.model.generate_content(
+                        prompt,  # ส่งเฉพาะ prompt เต็มๆ ไม่ต้องส่ง dialogue แยก
+                        generation_config=generation_config,
+                        safety_settings=self.safety_settings,
+                    )
+                    response_text = response.text if hasattr(response, "text") else ""
+                    usage_metadata = getattr(response, "usage_metadata", None)
+                trace_mark(STAGE_API_END)
 
                 # คำนวณเวลาที่ใช้
                 elapsed_time = time.time() - start_time
 
-                # สำหรับ Gemini เราไม่มีจำนวน token ที่แน่นอน ให้ประมาณจากจำนวนคำ
-                input_words = len(prompt.split())
-                output_words = (
-                    len(response.text.split()) if hasattr(response, "text") else 0
-                )
-                # ประมาณ token โดยเฉลี่ย 1 คำ = 1.3 token
-                input_tokens = int(input_words * 1.3)
-                output_tokens = int(output_words * 1.3)
+                # token จริงจาก usage_metadata (ปรับเทียบตัวนับด้วย) - ไม่มีก็ใช้ค่าประมาณ
+                input_tokens = self.prompt_assembler.record(assembled, usage_metadata)
+                output_tokens = usage_tokens(usage_metadata)[1]
+                measured = input_tokens is not None
+                if input_tokens is None:
+                    input_tokens = assembled.estimated_tokens
+                if output_tokens is None:
+                    output_tokens = self.count_tokens_estimate(response_text or "")
                 total_tokens = input_tokens + output_tokens
+                approx = "" if measured else "~"
 
                 # แสดงข้อมูลในคอนโซล
-                short_model = (
+                short_model = served.model or (
                     self.model_name if hasattr(self, "model_name") else "gemini"
                 )
                 # แสดงชื่อเต็มของโมเดลให้ชัดเจน
                 print(f"[Gemini API] Translation complete                ", end="\r")
                 print(
-                    f"[{short_model.upper()}] : {dialogue[:30]}... -> ~{total_tokens} tokens ({elapsed_time:.2f}s)"
+                    f"[{short_model.upper()}] : {dialogue[:30]}... -> {approx}{total_tokens} tokens ({elapsed_time:.2f}s)"
                 )
                 logging.info(
-                    f"[Gemini API] Estimated tokens: ~{input_tokens} (input) + ~{output_tokens} (output) = ~{total_tokens} tokens in {elapsed_time:.2f}s"
+                    f"[Gemini API] Tokens: {approx}{input_tokens} (input, budget {assembled.budget}) + {approx}{output_tokens} (output) = {approx}{total_tokens} tokens in {elapsed_time:.2f}s"
                 )
 
                 # ดึงข้อความจาก response และตรวจสอบอย่างปลอดภัย
-                if hasattr(response, "text") and response.text:
-                    translated_dialogue = response.text.strip()
-                else:
+                if not response_text:
                     raise ValueError("No response text from Gemini API")
 
-                # ทำความสะอาดข้อความแปล
-                translated_dialogue = re.sub(
-                    r"\b(ครับ|ค่ะ|ครับ/ค่ะ)\b", "", translated_dialogue
-                ).strip()
-                for term in relevant_lore_terms:
-                    translated_dialogue = re.sub(
-                        r"\b" + re.escape(term) + r"\b",
-                        term,
-                        translated_dialogue,
-                        flags=re.IGNORECASE,
-                    )
-
-                # ตรวจสอบและแทนที่กรณีพิเศษสำหรับเลข 2 และ ???
-                if re.match(r"^2+\??$", dialogue.strip()) or dialogue.strip() == "???":
-                    translated_dialogue = "???"
-
-                # ตรวจสอบกรณีเลข 2 เป็นส่วนหนึ่งของประโยค
-                if dialogue.strip() and re.match(r"^\s*2+\s*$", dialogue.strip()):
-                    translated_dialogue = "???"
+                # ทำความสะอาดข้อความแปล (ขั้นตอนเดียวกับ batch - ผลเก็บ key เดียวกัน)
+                translated_dialogue = self._postprocess_dialogue(
+                    dialogue, response_text, relevant_lore_terms
+                )
 
                 # สร้างข้อความผลลัพธ์สุดท้าย
                 if character_name:
@@ -814,12 +915,9 @@ class TranslatorGemini:
                         )
 
                         if hasattr(retry_response, "text") and retry_response.text:
-                            retry_translation = retry_response.text.strip()
-
-                            # ทำความสะอาดข้อความแปล
-                            retry_translation = re.sub(
-                                r"\b(ครับ|ค่ะ|ครับ/ค่ะ)\b", "", retry_translation
-                            ).strip()
+                            retry_translation = self._postprocess_dialogue(
+                                dialogue, retry_response.text, relevant_lore_terms
+                            )
 
                             # เปรียบเทียบความยาวและคุณภาพ - ถ้าแปลใหม่ยาวกว่ามากๆ ถึงจะเอามาใช้
                             if len(retry_translation) > len(translated_dialogue) * 1.3:
@@ -833,7 +931,11 @@ class TranslatorGemini:
                                     final_translation = translated_dialogue
 
                 # บันทึกลง cache เฉพาะคำแปลที่สมบูรณ์
-                self.last_translations[dialogue] = translated_dialogue
+                self.translation_cache.put(
+                    REGION_DIALOGUE,
+                    self._dialogue_cache_key(dialogue, character_name, served.model),
+                    translated_dialogue,
+                )
                 if character_name:
                     self.cache.add_validated_name(character_name)  # เพิ่มชื่อเข้า cache
 
@@ -845,28 +947,23 @@ class TranslatorGemini:
 
                         # Only store if translation actually occurred or if it's a new entry
                         # CRITICAL: This prevents substring conflicts by using exact string matches
-                        if (normalized_speaker not in self.session_character_names or
-                            self.session_character_names[normalized_speaker] != character_name):
-
-                            self.session_character_names[normalized_speaker] = character_name
+                        # Memory management - LRU eviction อยู่ใน cache กลาง
+                        if self.translation_cache.get(REGION_SPEAKER_NAMES, normalized_speaker) != character_name:
+                            self.translation_cache.put(REGION_SPEAKER_NAMES, normalized_speaker, character_name)
                             self.session_speaker_count += 1
 
-                            # Memory management - cleanup old entries using FIFO
-                            if len(self.session_character_names) > self.max_session_names:
-                                # Remove oldest entries (FIFO approach)
-                                keys_to_remove = list(self.session_character_names.keys())[:len(self.session_character_names) // 4]
-                                for key in keys_to_remove:
-                                    del self.session_character_names[key]
-                                logging.debug(f"[NAME CACHE] Cleaned {len(keys_to_remove)} old entries")
-
                             logging.debug(f"[NAME CACHE] Stored: {speaker} -> {character_name} (normalized: {normalized_speaker})")
                 except Exception as e:
                     logging.warning(f"Cache storage error: {e}")
 
+                trace_mark(STAGE_POST_PROCESS)
                 return final_translation
 
             except Exception as api_error:
                 logging.error(f"Gemini API error: {str(api_error)}")
+                # quota / error ชั่วคราวถูก retry ใน GeminiGuard แล้ว - ยิงซ้ำอีกแบบไม่ช่วย
+                if classify_error(api_error) != ERROR_FATAL:
+                    return f"[Error: {str(api_error)}]"
                 # ลองใช้วิธีเรียก API อีกแบบหนึ่ง (กรณี model เก่า)
                 try:
                     response = self.model.generate_content(
@@ -896,6 +993,34 @@ class TranslatorGemini:
             logging.error(f"Unexpected error in translation: {str(e)}")
             return f"[Error: {str(e)}]"
 
+    def _generate_streamed(self, prompt, generation_config, character_name):
+        """
+        generate_content(stream=True) - ส่งประโยคที่จบแล้วให้ TUI ระหว่างที่ model ยังสร้างต่อ
+        คำแปลบางส่วนผ่านแค่การลบ ครับ/ค่ะ; การแก้ศัพท์ lore ทำกับคำแปลเต็มใน translate()
+        ถ้า stream ล้มกลางทาง exception ถูกส่งต่อให้ translate() ลองเรียกแบบไม่ stream
+
+        Returns:
+            (ข้อความเต็ม, usage_metadata ของ stream)
+        """
+        sentences = SentenceStream()
+        response = self.model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            safety_settings=self.safety_settings,
+            stream=True,
+        )
+        for chunk in response:
+            try:
+                delta = chunk.text
+            except (ValueError, AttributeError):
+                continue  # chunk ที่ไม่มีข้อความ (เช่นมีแค่ finish_reason)
+            ready = sentences.feed(delta)
+            if ready:
+                emit_partial(
+                    self._join_speaker(character_name, self._clean_translation(ready))
+                )
+        return sentences.text, getattr(response, "usage_metadata", None)
+
     def is_similar_to_choice_prompt(self, text, threshold=0.7):
         """ตรวจสอบและแยกส่วนประกอบของ choice dialogue
 
@@ -1201,8 +1326,6 @@ class TranslatorGemini:
             # แยกตัวเลือกถ้าไม่มี newlines (เผื่อ OCR รวมประโยคเป็นบรรทัดเดียว)
             if "\n" not in choices_text:
                 # ลองแยกประโยคตาม punctuation
-                import re
-
                 # แยกตาม ! ? . ที่ตามด้วยช่องว่างและตัวอักษรใหญ่
                 sentence_splits = re.split(r"([.!?])\s+(?=[A-Z])", choices_text)
                 if len(sentence_splits) > 1:
@@ -1223,150 +1346,42 @@ class TranslatorGemini:
                             f"Auto-separated choices into {len(sentences)} sentences"
                         )
 
-            # 4. สร้าง Prompt ใหม่สำหรับแปล Choices ทั้งก้อน
-            try:
-                choices_block_prompt = (
-                    "You are translating game dialogue choices from English to Thai. "
-                    "Translate the following block of text containing ONLY the choice options, preserving the meaning and tone of each option. "
-                    "Each line represents a separate dialogue choice option. "
-                    "DO NOT add any extra information, context, questions like 'What will you say?', or bullet points.\n\n"
-                    f'CHOICE OPTIONS BLOCK:\n"""\n{choices_text}\n"""\n\n'
-                    "RULES:\n"
-                    "1. Translate EACH choice option on its own line.\n"
-                    "2. Each line should be a separate, complete choice.\n"
-                    "3. Keep translations concise and natural for game choices.\n"
-                    "4. Preserve proper names.\n"
-                    "5. Return ONLY the Thai translations, one per line.\n"
-                )
-
-                # ใช้ Generation Config เดิม หรือปรับเล็กน้อย
-                choice_gen_config = {
-                    "max_output_tokens": self.max_tokens,  # ให้ token เพียงพอสำหรับทุกตัวเลือก
-                    "temperature": max(0.2, self.temperature - 0.2),  # ลด temp ลงอีกนิด
-                    "top_p": self.top_p,
-                }
-
-                logging.debug("Sending choices block to Gemini for translation...")
-                choice_response = self.model.generate_content(
-                    choices_block_prompt,
-                    generation_config=choice_gen_config,
-                    safety_settings=self.safety_settings,
+            # 4. แปลทุกตัวเลือกใน request เดียว (JSON array - หนึ่ง id ต่อหนึ่งตัวเลือก)
+            choice_lines = [
+                line.strip() for line in choices_text.split("\n") if line.strip()
+            ]
+            items = {
+                index: {"id": index, "text": line}
+                for index, line in enumerate(choice_lines)
+            }
+            logging.debug(f"Sending {len(items)} choices to Gemini as one batch...")
+            translated, missing, _ = translate_in_batches(
+                items,
+                lambda batch: self._send_batch(batch, is_choice=True),
+                batch_size=len(items),
+            )
+            if missing:
+                # แปลทีละตัวเลือกเฉพาะตัวที่ batch คืนมาไม่ครบ/ผิดรูป
+                logging.warning(
+                    f"Falling back to translating {len(missing)} choice(s) individually."
                 )
 
-                if hasattr(choice_response, "text") and choice_response.text:
-                    translated_choices_block = choice_response.text.strip()
-                    logging.debug(
-                        f"Raw translated choices block: '{translated_choices_block}'"
-                    )
-
-                    # 5. นำผลลัพธ์มาประกอบร่างและทำความสะอาด
-                    # แยกบรรทัดผลลัพธ์
-                    translated_lines = [
-                        line.strip()
-                        for line in translated_choices_block.split("\n")
-                        if line.strip()
-                    ]
-
-                    translated_choices_final = []
-                    for line in translated_lines:
-                        # ทำความสะอาดแต่ละบรรทัด (เผื่อ AI ยังใส่ prefix มา)
-                        patterns_to_remove_prefix = [
-                            r"^(คุณจะพูดว่าอย่างไร\??[:：]?)\s*",
-                            r"^(What will you say\??[:：]?)\s*",
-                            r"^[•\-*◦]\s*",  # ลบ bullet point ที่อาจติดมา
-                        ]
-                        cleaned_line = line
-                        for pattern in patterns_to_remove_prefix:
-                            cleaned_line = re.sub(
-                                pattern, "", cleaned_line, count=1, flags=re.IGNORECASE
-                            ).strip()
-
-                        # เพิ่ม bullet point
-                        if cleaned_line:
-                            translated_choices_final.append("• " + cleaned_line)
-
-                    if translated_choices_final:
-                        # เพิ่มหัวข้อภาษาไทยกลับมา (ตาม V9 approach)
-                        result = f"{translated_header}\n" + "\n".join(
-                            translated_choices_final
-                        )
-                        logging.debug(f"Final Choice translation result:\n{result}")
-                        return result
-                    else:
-                        # ถ้าหลังจากการแปลและ clean แล้วไม่มีตัวเลือกเหลือเลย
-                        logging.warning(
-                            "Translated choices block resulted in empty options."
-                        )
-                        return translated_header  # คืนแค่ header
-
+            # 5. ประกอบผลตามลำดับเดิมและทำความสะอาด
+            translated_choices_final = []
+            for index, choice in enumerate(choice_lines):
+                cleaned_line = ""
+                if index in translated:
+                    cleaned_line = self._clean_choice_line(translated[index])
+                if cleaned_line:
+                    translated_choices_final.append("• " + cleaned_line)
                 else:
-                    logging.warning(f"Failed to translate choices block.")
-                    # Fallback: ลองแปลทีละตัวเลือกแบบเดิม (เผื่อวิธีใหม่ใช้ไม่ได้ผล)
-                    logging.warning("Falling back to translating choices individually.")
-                    translated_choices = []
-                    for choice in choices_raw_list:  # ใช้ choices_raw_list ที่แยกไว้ตอนแรก
-                        choice = choice.strip()
-                        if not choice:
-                            continue
-                        try:
-                            # ใช้ Prompt เดิมสำหรับแปลทีละตัวเลือก
-                            choice_prompt_individual = (
-                                "You are translating ONLY a single game dialogue choice OPTION provided below from English to Thai. "
-                                "Translate ONLY this specific option concisely and naturally.\n\n"
-                                f'OPTION TO TRANSLATE: "{choice}"\n\n'
-                                "Rules:\n"
-                                "1. Translate ONLY the option text provided above.\n"
-                                "2. DO NOT include the question or context like 'What will you say?' or '\u0e04\u0e38\u0e13\u0e08\u0e30\u0e1e\u0e39\u0e14\u0e27\u0e48\u0e32\u0e2d\u0e22\u0e48\u0e32\u0e07\u0e44\u0e23?'.\n"
-                                "3. Keep the translation concise.\n"
-                                "4. Preserve proper names exactly.\n"
-                                "5. Return ONLY the Thai translation of the option.\n"
-                            )
-                            choice_response_fb = self.model.generate_content(
-                                choice_prompt_individual
-                            )
-                            if (
-                                hasattr(choice_response_fb, "text")
-                                and choice_response_fb.text
-                            ):
-                                tc = choice_response_fb.text.strip()
-                                # Clean fallback result
-                                for pattern in [
-                                    r"^(คุณจะพูดว่าอย่างไร\??[:：]?)\s*",
-                                    r"^[•\-*◦]\s*",
-                                ]:
-                                    tc = re.sub(
-                                        pattern, "", tc, count=1, flags=re.IGNORECASE
-                                    ).strip()
-                                if tc:
-                                    translated_choices.append("• " + tc)
-                                else:
-                                    translated_choices.append(
-                                        f"• {choice} [NC/FB]"
-                                    )  # Fallback Clean failed
-                            else:
-                                translated_choices.append(
-                                    f"• {choice} [NT/FB]"
-                                )  # Fallback Translate failed
-                        except Exception as fb_err:
-                            logging.error(
-                                f"Error during fallback choice translation for '{choice}': {fb_err}"
-                            )
-                            translated_choices.append(f"• {choice} [ERR/FB]")
+                    translated_choices_final.append(self._translate_choice_option(choice))
 
-                    if translated_choices:
-                        result = f"{translated_header}\n" + "\n".join(
-                            translated_choices
-                        )
-                        return result
-                    else:
-                        return translated_header  # ถ้า fallback ก็ยังไม่ได้
-
-            except Exception as translate_block_error:
-                logging.error(
-                    f"Error translating choices block: {translate_block_error}"
-                )
-                # ถ้าการแปลทั้งก้อนล้มเหลว อาจคืนค่า Error หรือลอง Fallback แปลทีละอัน
-                return f"[Error translating choices: {translate_block_error}]"
+            # เพิ่มหัวข้อภาษาไทยกลับมา (ตาม V9 approach)
+            result = f"{translated_header}\n" + "\n".join(translated_choices_final)
+            logging.debug(f"Final Choice translation result:\n{result}")
+            trace_mark(STAGE_POST_PROCESS)
+            return result
 
         except Exception as e:
             logging.error(f"General error in translate_choice: {str(e)}")
@@ -1375,55 +1390,312 @@ class TranslatorGemini:
             logging.error(traceback.format_exc())
             return f"[Error: {str(e)}]"
 
+    @staticmethod
+    def _clean_choice_line(line):
+        """ลบ prefix ที่ AI อาจใส่มากับตัวเลือก (หัวข้อคำถาม, bullet point)"""
+        patterns_to_remove_prefix = [
+            r"^(คุณจะพูดว่าอย่างไร\??[:：]?)\s*",
+            r"^(What will you say\??[:：]?)\s*",
+            r"^[•\-*◦]\s*",  # ลบ bullet point ที่อาจติดมา
+        ]
+        cleaned_line = line.strip()
+        for pattern in patterns_to_remove_prefix:
+            cleaned_line = re.sub(
+                pattern, "", cleaned_line, count=1, flags=re.IGNORECASE
+            ).strip()
+        return cleaned_line
+
+    def _translate_choice_option(self, choice):
+        """แปลตัวเลือกเดียว - fallback เมื่อ batch ไม่คืนผลของตัวเลือกนี้"""
+        try:
+            choice_prompt_individual = (
+                "You are translating ONLY a single game dialogue choice OPTION provided below from English to Thai. "
+                "Translate ONLY this specific option concisely and naturally.\n\n"
+                f'OPTION TO TRANSLATE: "{choice}"\n\n'
+                "Rules:\n"
+                "1. Translate ONLY the option text provided above.\n"
+                "2. DO NOT include the question or context like 'What will you say?' or 'คุณจะพูดว่าอย่างไร?'.\n"
+                "3. Keep the translation concise.\n"
+                "4. Preserve proper names exactly.\n"
+                "5. Return ONLY the Thai translation of the option.\n"
+            )
+            choice_response_fb = self.model.generate_content(choice_prompt_individual)
+            if hasattr(choice_response_fb, "text") and choice_response_fb.text:
+                tc = self._clean_choice_line(choice_response_fb.text)
+                if tc:
+                    return "• " + tc
+                return f"• {choice} [NC/FB]"  # Fallback Clean failed
+            return f"• {choice} [NT/FB]"  # Fallback Translate failed
+        except Exception as fb_err:
+            logging.error(
+                f"Error during fallback choice translation for '{choice}': {fb_err}"
+            )
+            return f"• {choice} [ERR/FB]"
+
     def get_character_info(self, character_name):
         # จัดการกับกรณีพิเศษสำหรับ ??? และ เลข 2
-        if character_name in ["???", "2", "22", "222"] or re.match(
-            r"^2+$", character_name
-        ):
-            return {
-                "firstName": "???",
-                "gender": "unknown",
-                "role": "Mystery character",
-                "relationship": "Unknown/Mysterious",
-                "pronouns": {"subject": "ฉัน", "object": "ฉัน", "possessive": "ของฉัน"},
-            }
+        if _MYSTERY_NAME_RE.match(character_name):
+            return MYSTERY_CHARACTER
 
         # ตรวจสอบเพิ่มเติมด้วย EnhancedNameDetector
-        if self.enhanced_detector:
-            try:
-                # ถ้าชื่อเป็นตัวเลขหรือมีรูปแบบคล้าย ??? ให้แก้ไขเป็น ???
-                if re.match(r"^[2\?]+\??$", character_name):
-                    return {
-                        "firstName": "???",
-                        "gender": "unknown",
-                        "role": "Mystery character",
-                        "relationship": "Unknown/Mysterious",
-                        "pronouns": {
-                            "subject": "ฉัน",
-                            "object": "ฉัน",
-                            "possessive": "ของฉัน",
-                        },
-                    }
-            except Exception as e:
-                logging.warning(f"Error in enhanced checking for character name: {e}")
-
-        # ค้นหาข้อมูลตัวละครตามปกติ
+        # ถ้าชื่อเป็นตัวเลขหรือมีรูปแบบคล้าย ??? ให้แก้ไขเป็น ???
+        if self.enhanced_detector and re.match(r"^[2\?]+\??$", character_name):
+            return MYSTERY_CHARACTER
+
+        # ค้นหาจาก index ชื่อ/ชื่อเต็ม (สร้างตอนโหลด NPC.json)
+        return self.character_by_alias.get(character_name)
+
+    def get_character_fragment(self, character_name):
+        """ส่วน prompt ของผู้พูด - dict lookup เดียวสำหรับชื่อที่อยู่ใน NPC.json"""
+        fragment = self.character_fragments.get(character_name)
+        if fragment is not None:
+            return fragment
+        if self.get_character_info(character_name) is MYSTERY_CHARACTER:
+            return self._mystery_fragment
+        return EMPTY_CHARACTER_FRAGMENT
+
+    def _build_character_fragments(self):
+        """
+        ประกอบส่วน prompt ของทุกชื่อ/alias ล่วงหน้า (ครั้งเดียวต่อเวอร์ชันของ NPC.json)
+        alias ที่ได้ข้อความเหมือนกันใช้ string object เดียวกัน
+        """
+        by_alias = {}
         for char in self.character_data:
-            if (
-                character_name == char["firstName"]
-                or character_name == f"{char['firstName']} {char['lastName']}".strip()
-            ):
-                return char
-        return None
-
-    def batch_translate(self, texts, batch_size=10):
-        """แปลข้อความเป็นชุด"""
-        translated_texts = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i : i + batch_size]
-            translated_batch = [self.translate(text) for text in batch]
-            translated_texts.extend(translated_batch)
-        return translated_texts
+            first_name = char["firstName"]
+            by_alias.setdefault(first_name, char)
+            by_alias.setdefault(f"{first_name} {char.get('lastName', '')}".strip(), char)
+
+        shared = {}
+        fragments = {}
+        for alias in list(by_alias) + [name for name in self.character_styles if name not in by_alias]:
+            fragment = format_character_fragment(by_alias.get(alias), self.character_styles.get(alias, ""))
+            fragments[alias] = shared.setdefault(fragment, fragment)
+        fragments["???"] = format_character_fragment(
+            MYSTERY_CHARACTER, self.character_styles.get("???") or MYSTERY_STYLE
+        )
+
+        self.character_by_alias = by_alias
+        self.character_fragments = fragments
+        # ชื่อแบบ 2/22 ได้เฉพาะ context ของ ??? (style ผูกกับชื่อ ??? เท่านั้น)
+        self._mystery_fragment = format_character_fragment(MYSTERY_CHARACTER)
+        logging.info(
+            f"Built {len(fragments)} character prompt fragments ({len(shared)} distinct)"
+        )
+
+    def batch_translate(self, texts, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        แปลข้อความเป็นชุด - หลายบรรทัดต่อหนึ่ง request (ดู translation_batch)
+        บรรทัดที่ batch คืนมาไม่ครบหลังส่งซ้ำแล้วจะแปลทีละบรรทัดด้วย translate()
+
+        Returns:
+            list: คำแปลเรียงตาม texts (รูปแบบเดียวกับ translate() - "ชื่อ: คำแปล")
+        """
+        return self._batch_translate(texts, batch_size)[0]
+
+    def _batch_translate(self, texts, batch_size):
+        """
+        Returns:
+            (คำแปลเรียงตาม texts, model ที่ตอบแต่ละบรรทัด - None = model หลัก)
+        """
+        results = [None] * len(texts)
+        served_models = [None] * len(texts)
+        items = {}
+        for index, text in enumerate(texts):
+            stripped = (text or "").strip()
+            if not stripped:
+                results[index] = ""
+                continue
+            if stripped == "???" or re.match(r"^2+\??$", stripped):
+                results[index] = "???"
+                continue
+
+            character_name, dialogue = self._split_for_batch(stripped)
+            cached, served_models[index] = self._lookup_dialogue(dialogue, character_name)
+            if cached is not None:
+                results[index] = self._join_speaker(character_name, cached)
+                continue
+            items[index] = {"id": index, "speaker": character_name, "text": dialogue}
+
+        if items:
+            # model ที่ตอบนับแยกต่อ request - batch ที่ถูก hedge/route ไม่ทำให้บรรทัดของ batch อื่นผิด key
+            def send(batch, is_choice=False):
+                with served_model_scope() as served:
+                    raw = self._send_batch(batch, is_choice)
+                for item in batch:
+                    served_models[item["id"]] = served.model
+                return raw
+
+            translated, missing, stats = translate_in_batches(items, send, batch_size)
+            logging.info(
+                f"[BATCH] {len(translated)}/{stats['lines']} lines in {stats['requests']} request(s), "
+                f"{len(missing)} left for single-line translation"
+            )
+            for index, translation in translated.items():
+                item = items[index]
+                translation = self._postprocess_dialogue(
+                    item["text"],
+                    translation,
+                    self.get_relevant_lore_terms(item["text"], item["speaker"]),
+                )
+                self.translation_cache.put(
+                    REGION_DIALOGUE,
+                    self._dialogue_cache_key(item["text"], item["speaker"], served_models[index]),
+                    translation,
+                )
+                results[index] = self._join_speaker(item["speaker"], translation)
+            for index in sorted(missing):
+                with served_model_scope() as served:
+                    results[index] = self.translate(texts[index])
+                served_models[index] = served.model
+
+        return results, served_models
+
+    def warm_cache(self, lines, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        แปลล่วงหน้าแล้วเก็บลง region translations (key เดียวกับ Dalamud handler)
+        ใช้กับบทพูดที่บันทึกไว้ - เล่นซ้ำฉากเดิมจะได้คำแปลจาก cache ทันที
+
+        Args:
+            lines: iterable ของ (speaker, message)
+
+        Returns:
+            int: จำนวนบรรทัดที่แปลและเก็บใหม่
+        """
+        pending = {}
+        for speaker, message in lines:
+            speaker = (speaker or "")[:100]
+            message = (message or "")[:5000]
+            if not message.strip():
+                continue
+            cache_key = stable_cache_key(
+                message,
+                speaker,
+                self.model_name,
+                self.current_role_mode,
+                self.PROMPT_VERSION,
+                self.npc_data_version,
+            )
+            if cache_key in pending or self.translation_cache.get(REGION_TRANSLATIONS, cache_key) is not None:
+                continue
+            pending[cache_key] = f"{speaker}: {message}" if speaker else message
+
+        keys = list(pending)
+        translations, served_models = self._batch_translate([pending[key] for key in keys], batch_size)
+        stored = 0
+        for cache_key, translated_text, served_model in zip(keys, translations, served_models):
+            if not translated_text or translated_text.startswith("[Error"):
+                continue
+            # บรรทัดที่ model อื่นตอบ (hedge / route) เก็บด้วย key ของ model นั้น
+            self.translation_cache.put(
+                REGION_TRANSLATIONS,
+                hedge_cache_key(cache_key, served_model) if served_model else cache_key,
+                translated_text,
+                model=served_model or self.model_name,
+                role_mode=self.current_role_mode,
+            )
+            stored += 1
+        return stored
+
+    def _split_for_batch(self, text):
+        """(ชื่อผู้พูด, บทพูด) - ชื่อว่างถ้าไม่ใช่บทพูดของตัวละคร"""
+        try:
+            speaker, content, dialogue_type = self.text_corrector.split_speaker_and_content(text)
+        except (TypeError, ValueError, AttributeError):
+            return "", text
+        if dialogue_type != DialogueType.CHARACTER or not speaker:
+            return "", text
+        if speaker.startswith("?") or re.match(r"^2+$", speaker):
+            speaker = "???"
+        return speaker, content
+
+    @staticmethod
+    def _join_speaker(character_name, translation):
+        return f"{character_name}: {translation}" if character_name else translation
+
+    @staticmethod
+    def _clean_translation(translation):
+        return re.sub(r"\b(ครับ|ค่ะ|ครับ/ค่ะ)\b", "", translation).strip()
+
+    def _postprocess_dialogue(self, dialogue, translation, lore_terms):
+        """
+        ทำความสะอาดคำแปลของบทพูดหนึ่งบรรทัด - translate() และ batch_translate ใช้ร่วมกัน
+        เพราะผลของทั้งสองทางเก็บใน region dialogue ด้วย key เดียวกัน
+        """
+        translation = self._clean_translation(translation)
+        for term in lore_terms:
+            translation = re.sub(
+                r"\b" + re.escape(term) + r"\b", term, translation, flags=re.IGNORECASE
+            )
+
+        # กรณีพิเศษสำหรับเลข 2 และ ???
+        stripped = dialogue.strip()
+        if re.match(r"^2+\??$", stripped) or stripped == "???":
+            return "???"
+        return translation
+
+    def _build_batch_prompt(self, items, is_choice=False):
+        """
+        Prompt ของหนึ่ง batch ภายใต้งบ token เดียวกับ translate()
+        ส่วนบังคับคือ system prompt + รายการบรรทัด - style ของทุกผู้พูด > ชื่อ > ศัพท์ lore เติมตามงบ
+
+        Returns:
+            AssembledPrompt (ส่งคืนให้ prompt_assembler.record หลัง call)
+        """
+        combined_text = "\n".join(item["text"] for item in items)
+        if is_choice:
+            head = (
+                "You are translating game dialogue choices from English to Thai. "
+                "Each line is a separate dialogue choice option - preserve the meaning and tone of each option, "
+                "keep it concise and natural, and DO NOT add bullet points or questions like 'What will you say?'.\n"
+            )
+        else:
+            head = self.get_system_prompt()
+
+        # ส่วน prompt ของผู้พูดที่ประกอบไว้ตอนโหลด NPC.json (alias ที่ได้ fragment เดียวกันใส่ครั้งเดียว)
+        fragments = []
+        for item in items:
+            speaker = item.get("speaker")
+            if not speaker:
+                continue
+            fragment = self.get_character_fragment(speaker)
+            if fragment is not EMPTY_CHARACTER_FRAGMENT and fragment not in fragments:
+                fragments.append(fragment)
+
+        return self.prompt_assembler.assemble(
+            head,
+            BATCH_INSTRUCTIONS + format_batch_request(items),
+            style="".join(fragments),
+            names=self.get_relevant_names(combined_text),
+            lore=self.get_relevant_lore_terms(combined_text).items(),
+        )
+
+    def _send_batch(self, items, is_choice=False):
+        """ส่งหนึ่ง batch ไป Gemini แล้วคืนข้อความดิบ (translate_in_batches เป็นผู้ parse)"""
+        assembled = self._build_batch_prompt(items, is_choice)
+        temperature = max(0.2, self.temperature - 0.2) if is_choice else self.temperature
+        generation_config = {
+            # output ของ batch ยาวตามจำนวนบรรทัด - ขยาย budget ตามขนาด batch
+            "max_output_tokens": min(8192, self.max_tokens * max(1, len(items))),
+            "temperature": temperature,
+            "top_p": self.top_p,
+        }
+        trace_mark(STAGE_PROMPT_BUILT)
+        dropped = {part: count for part, count in assembled.dropped.items() if count}
+        logging.info(
+            f"🔍 Batch prompt tokens ({len(items)} lines): ~{assembled.estimated_tokens} "
+            f"(budget {assembled.budget})" + (f", dropped {dropped}" if dropped else "")
+        )
+
+        trace_mark(STAGE_API_START)
+        response = self.model.generate_content(
+            assembled.text,
+            generation_config=generation_config,
+            safety_settings=self.safety_settings,
+        )
+        trace_mark(STAGE_API_END)
+        # token จริงต่อ batch - ปรับเทียบตัวนับและนับเข้า actual-vs-budget เหมือน translate()
+        self.prompt_assembler.record(assembled, getattr(response, "usage_metadata", None))
+        return response.text if hasattr(response, "text") else ""
 
     def analyze_translation_quality(self, original_text, translated_text):
         """วิเคราะห์คุณภาพการแปล"""
@@ -1452,7 +1724,7 @@ class TranslatorGemini:
         self.load_npc_data()
         self.load_example_translations()
         self.cache.clear_session()
-        self.last_translations.clear()
+        self.translation_cache.invalidate(INVALIDATE_NPC_DATA)
         print("TranslatorGemini: Data reloaded successfully")
 
     def analyze_custom_prompt(self, prompt_with_text):
@@ -1474,17 +1746,67 @@ class TranslatorGemini:
             raise ValueError(f"Failed to process text with AI: {str(e)}")
 
 
+    def _dialogue_cache_key(self, dialogue, character_name, served_model=None):
+        cache_key = stable_cache_key(
+            dialogue,
+            character_name,
+            self.model_name,
+            self.current_role_mode,
+            self.PROMPT_VERSION,
+            self.npc_data_version,
+        )
+        return hedge_cache_key(cache_key, served_model) if served_model else cache_key
+
+    @property
+    def alternate_models(self):
+        """model อื่นที่อาจเคยให้คำแปล (hedge / route) - cache เก็บผลของแต่ละตัวแยก key"""
+        models = [self.hedge_model_name] if self.hedge_model_name else []
+        if self.router is not None:
+            models.extend(self.router.models())
+        return tuple(model for model in dict.fromkeys(models) if model != self.model_name)
+
+    def _cached_dialogue(self, dialogue, character_name):
+        """คำแปลใน cache - ของ model หลักก่อน แล้วผลที่ model อื่นเคยตอบแทน"""
+        return self._lookup_dialogue(dialogue, character_name)[0]
+
+    def _lookup_dialogue(self, dialogue, character_name):
+        """(คำแปลใน cache, model ที่ตอบ - None = model หลัก)"""
+        cached = self.translation_cache.get(
+            REGION_DIALOGUE, self._dialogue_cache_key(dialogue, character_name)
+        )
+        if cached is not None:
+            return cached, None
+        for model_name in self.alternate_models:
+            cached = self.translation_cache.get(
+                REGION_DIALOGUE,
+                self._dialogue_cache_key(dialogue, character_name, model_name),
+            )
+            if cached is not None:
+                return cached, model_name
+        return None, None
+
+    def get_hedge_stats(self):
+        """p50/p90/p99 ของ model หลักเทียบกับที่ผู้ใช้รอจริง + สัดส่วน request ที่เพิ่มจากการ hedge"""
+        return self.hedge_tracker.get_stats() if self.hedge_tracker is not None else None
+
+    def get_routing_stats(self):
+        """จำนวนบรรทัดต่อ route และ error rate / p90 ล่าสุดต่อ model (None ถ้าไม่ได้เปิด routing)"""
+        return self.router.get_stats() if self.router is not None else None
+
+    def get_token_budget_stats(self):
+        """token จริงเทียบกับงบต่อ request และอัตราปรับเทียบของตัวนับ"""
+        return self.prompt_assembler.get_stats()
+
     def get_name_cache_stats(self):
         """Return cache statistics for monitoring character name consistency"""
         total_requests = self.cache_hits + self.cache_misses
         hit_ratio = (self.cache_hits / total_requests * 100) if total_requests > 0 else 0
 
         return {
-            "cached_names": len(self.session_character_names),
+            "cached_names": self.translation_cache.region_size(REGION_SPEAKER_NAMES),
             "session_speakers": self.session_speaker_count,
             "cache_hits": self.cache_hits,
             "cache_misses": self.cache_misses,
             "hit_ratio_percent": round(hit_ratio, 2),
-            "memory_usage_kb": len(str(self.session_character_names)) // 1024,
-            "cache_entries": list(self.session_character_names.items())[:5] if self.session_character_names else []
+            "cache_tiers": self.translation_cache.get_stats(),
         }